@@ -1,9 +1,28 @@
 #api_clients.py
 import time
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from config import bybit_session
+import clock
+import metrics
+from bar_service import BASE_INTERVAL, BASE_INTERVAL_MS, BarService, bars_to_frame, interval_minutes
+from config import get_bybit_session
+from market_store import MarketDataStore
+
+# --- Cache K-line ---
+KLINE_BUFFER_CAPACITY = 100  # jumlah bar maksimum yang disimpan per simbol/interval
+KLINE_FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+KLINE_PAGE_LIMIT = 1000       # bar maksimum per request kline Bybit
+RESAMPLED_MAX_BARS = 1000     # bar agregat maksimum yang disimpan per simbol/interval (jalur live)
+
+# --- Endpoint (label metrik) ---
+KLINE_ENDPOINT = "/v5/market/kline"
+TICKERS_ENDPOINT = "/v5/market/tickers"
+
+# --- Snapshot Harga ---
+PRICE_SNAPSHOT_MAX_AGE = 15.0  # detik; lebih tua dari ini → ambil harga per simbol
 
 def _process_kline_data(kline_list: List[list]) -> pd.DataFrame:
     """Mengubah list data k-line mentah dari Bybit menjadi DataFrame yang bersih."""
@@ -20,10 +39,128 @@ def _process_kline_data(kline_list: List[list]) -> pd.DataFrame:
     
     return df.iloc[::-1].reset_index(drop=True)
 
+def _kline_list_to_array(kline_list: List[list]) -> np.ndarray:
+    """Mengubah list k-line mentah (terbaru di depan) menjadi array (n, 7) urut waktu naik."""
+    if not kline_list:
+        return np.empty((0, len(KLINE_FIELDS)))
+    bars = np.array(kline_list, dtype=float)
+    return bars[np.argsort(bars[:, 0], kind='stable')]
+
+def interval_to_ms(interval: str) -> int:
+    """Mengonversi interval k-line Bybit dalam menit (mis. '1', '15') ke milidetik."""
+    return int(interval) * 60 * 1000
+
+class KlineRingBuffer:
+    """
+    Ring buffer berukuran tetap untuk k-line satu simbol/interval.
+    Setiap bar ditulis dua kali (slot i dan i + capacity) sehingga jendela
+    kronologis selalu bisa diambil sebagai slice kontigu tanpa menyalin data.
+    """
+
+    def __init__(self, capacity: int = KLINE_BUFFER_CAPACITY):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._data = np.full((2 * capacity, len(KLINE_FIELDS)), np.nan)
+        self._head = 0  # slot yang akan ditulis berikutnya
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return int(self._data[self._head - 1 + self.capacity, 0])
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def _write(self, slots: np.ndarray, bars: np.ndarray):
+        self._data[slots] = bars
+        self._data[slots + self.capacity] = bars
+
+    def extend(self, bars: np.ndarray):
+        """Menambahkan bar (urut waktu naik); bar dengan timestamp terakhir ditimpa."""
+        last_ts = self.last_timestamp
+        if last_ts is not None and len(bars):
+            same = bars[:, 0] == last_ts
+            if same.any():
+                self._write(np.array([(self._head - 1) % self.capacity]), bars[same][-1:])
+            bars = bars[bars[:, 0] > last_ts]
+        bars = bars[-self.capacity:]
+        if not len(bars):
+            return
+        slots = (self._head + np.arange(len(bars))) % self.capacity
+        self._write(slots, bars)
+        self._head = (self._head + len(bars)) % self.capacity
+        self._size = min(self.capacity, self._size + len(bars))
+
+    def view(self, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Mengembalikan view (tanpa salinan) atas `limit` bar terakhir, urut waktu naik.
+        View hanya valid sampai buffer diperbarui lagi.
+        """
+        n = self._size if limit is None else min(limit, self._size)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    def plan_fetch(self, interval: str, limit: int, now_ms: Optional[int] = None) -> Tuple[Optional[int], int]:
+        """
+        Menentukan parameter (start, limit) untuk request k-line berikutnya.
+        Jika buffer kosong atau tertinggal terlalu jauh, minta jendela penuh (start=None).
+        """
+        last_ts = self.last_timestamp
+        if last_ts is None or self._size < min(limit, self.capacity):
+            return None, limit
+        now_ms = int(clock.time() * 1000) if now_ms is None else now_ms
+        missing = (now_ms - last_ts) // interval_to_ms(interval) + 2  # bar terakhir + bar baru
+        if missing >= self.capacity:
+            return None, limit
+        return last_ts, int(max(missing, 1))
+
+_kline_buffers: Dict[Tuple[str, str], KlineRingBuffer] = {}
+_kline_buffers_lock = threading.Lock()
+
+def get_kline_buffer(symbol: str, interval: str) -> KlineRingBuffer:
+    """Mengambil (atau membuat) ring buffer k-line untuk simbol/interval tertentu."""
+    key = (symbol, interval)
+    buffer = _kline_buffers.get(key)
+    if buffer is None:
+        with _kline_buffers_lock:
+            buffer = _kline_buffers.setdefault(key, KlineRingBuffer())
+    return buffer
+
+def _bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """
+    Menyalin array bar menjadi DataFrame dengan kolom yang sama seperti _process_kline_data.
+    Selalu salinan: bars biasanya view ring buffer yang ditimpa thread stream begitu lock dilepas.
+    """
+    df = pd.DataFrame(bars[:, 1:], columns=KLINE_FIELDS[1:], copy=True)
+    df.insert(0, 'timestamp', pd.to_datetime(bars[:, 0].astype('int64'), unit='ms'))
+    return df
+
+def _timed_request(endpoint: str, method: Callable[..., Dict[str, Any]], **params) -> Dict[str, Any]:
+    """Memanggil metode pybit dan mencatat latensi serta error per endpoint (jika metrik aktif)."""
+    if not metrics.ENABLED:
+        return method(**params)
+    started = time.perf_counter()
+    try:
+        response = method(**params)
+    except Exception:
+        metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        metrics.API_ERRORS.inc(endpoint=endpoint, kind="exception")
+        raise
+    metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    if not response or response.get('retCode') != 0:
+        metrics.API_ERRORS.inc(endpoint=endpoint, kind=f"retcode_{(response or {}).get('retCode')}")
+    return response
+
 def get_latest_price(symbol: str) -> Optional[float]:
     """Mengambil harga pasar terakhir untuk simbol futures."""
     try:
-        response = bybit_session.get_tickers(category="linear", symbol=symbol)
+        response = _timed_request(TICKERS_ENDPOINT, get_bybit_session().get_tickers, category="linear", symbol=symbol)
         if response and response.get('retCode') == 0:
             result_list = response['result']['list']
             if result_list:
@@ -35,7 +172,8 @@ def get_latest_price(symbol: str) -> Optional[float]:
 def get_historical_data(symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
     """Mengambil data k-line historis dari Bybit."""
     try:
-        response = bybit_session.get_kline(
+        response = _timed_request(
+            KLINE_ENDPOINT, get_bybit_session().get_kline,
             category="linear", symbol=symbol, interval=interval, limit=limit)
         if response and response.get('retCode') == 0:
             return _process_kline_data(response['result']['list'])
@@ -43,10 +181,94 @@ def get_historical_data(symbol: str, interval: str, limit: int) -> Optional[pd.D
         print(f"❌ Error API (get_historical_data) untuk {symbol}: {e}")
     return None
 
+def _fetch_kline_array(symbol: str, interval: str, limit: int, start: Optional[int] = None,
+                       end: Optional[int] = None) -> Optional[np.ndarray]:
+    """Mengambil k-line dari Bybit langsung sebagai array (n, 7) urut waktu naik."""
+    params = {"category": "linear", "symbol": symbol, "interval": interval, "limit": limit}
+    if start is not None:
+        params["start"] = start
+    if end is not None:
+        params["end"] = end
+    response = _timed_request(KLINE_ENDPOINT, get_bybit_session().get_kline, **params)
+    if response and response.get('retCode') == 0:
+        return _kline_list_to_array(response['result']['list'])
+    return None
+
+def get_cached_historical_data(symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+    """
+    Versi get_historical_data yang memakai ring buffer per simbol: hanya bar yang
+    lebih baru dari timestamp terakhir di cache yang diunduh ulang.
+    """
+    buffer = get_kline_buffer(symbol, interval)
+    with buffer.lock:
+        try:
+            start, fetch_limit = buffer.plan_fetch(interval, limit)
+            bars = _fetch_kline_array(symbol, interval, fetch_limit, start)
+            if bars is not None and start is not None and (not len(bars) or bars[0, 0] > start):
+                # Ada celah antara cache dan data baru → ambil ulang jendela penuh
+                start = None
+                bars = _fetch_kline_array(symbol, interval, limit)
+            if bars is None:
+                return None
+        except Exception as e:
+            print(f"❌ Error API (get_cached_historical_data) untuk {symbol}: {e}")
+            return None
+
+        if start is None:
+            buffer.clear()
+        buffer.extend(bars)
+        return _bars_to_frame(buffer.view(limit))
+
+# --- Bar Interval Tinggi (diturunkan dari 1m) ---
+LIVE_BARS = BarService(max_bars=RESAMPLED_MAX_BARS)
+
+def _fetch_base_history(symbol: str, minutes: int) -> Optional[np.ndarray]:
+    """Mengambil `minutes` bar 1m terakhir (beberapa halaman start/end) sebagai array urut waktu naik."""
+    end_ms = int(clock.time() * 1000)
+    cursor = (end_ms // BASE_INTERVAL_MS - minutes + 1) * BASE_INTERVAL_MS
+    pages = []
+    while cursor <= end_ms:
+        page_end = min(cursor + KLINE_PAGE_LIMIT * BASE_INTERVAL_MS - 1, end_ms)
+        bars = _fetch_kline_array(symbol, BASE_INTERVAL, KLINE_PAGE_LIMIT, cursor, page_end)
+        if bars is None:
+            return None
+        pages.append(bars)
+        cursor = page_end + 1
+    return np.concatenate(pages) if pages else np.empty((0, len(KLINE_FIELDS)))
+
+def get_resampled_data(symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+    """
+    K-line interval tinggi (3m, 5m, 15m, 1h, 4h, ...) untuk jalur live tanpa request
+    k-line per interval: ring buffer 1m (get_cached_historical_data) adalah sumber
+    data, dan agregat per interval di LIVE_BARS hanya diperpanjang dengan bar 1m baru.
+    Riwayat 1m diunduh penuh sekali saat agregat masih kosong atau tertinggal lebih
+    jauh dari isi ring buffer. Bar terakhir adalah candle yang sedang berjalan.
+    """
+    minutes = interval_minutes(interval)
+    if minutes == 1:
+        return get_cached_historical_data(symbol, BASE_INTERVAL, limit)
+    if get_cached_historical_data(symbol, BASE_INTERVAL, KLINE_BUFFER_CAPACITY) is None:
+        return None
+    buffer = get_kline_buffer(symbol, BASE_INTERVAL)
+    with buffer.lock:
+        recent = buffer.view().copy()
+    LIVE_BARS.ingest(symbol, recent)
+    aggregate = LIVE_BARS.aggregate(symbol, interval)
+    if aggregate.last_timestamp is None:
+        try:
+            history = _fetch_base_history(symbol, (limit + 1) * minutes)
+        except Exception as e:
+            print(f"❌ Error API (get_resampled_data) untuk {symbol}: {e}")
+            return None
+        if history is None:
+            return None
+        aggregate = LIVE_BARS.seed(symbol, interval, np.concatenate([history, recent]))
+    return bars_to_frame(aggregate.view()[-limit:])
+
 def get_all_futures_tickers() -> Optional[List[Dict[str, Any]]]:
     """Mengambil data semua ticker dari pasar futures Bybit."""
     try:
-        response = bybit_session.get_tickers(category="linear")
+        response = _timed_request(TICKERS_ENDPOINT, get_bybit_session().get_tickers, category="linear")
         if response and response.get('retCode') == 0:
             return response['result']['list']
     except Exception as e:
@@ -54,40 +276,80 @@ def get_all_futures_tickers() -> Optional[List[Dict[str, Any]]]:
     return None
 
 def download_historical_data(symbol: str, interval: str, start_time: int) -> Optional[str]:
-    """Mengunduh data historis dalam jumlah besar dan menyimpannya ke CSV."""
-    all_data = []
-    limit = 1000
-    
-    while True:
-        try:
-            print(f"Mengambil data {symbol} dari {pd.to_datetime(start_time, unit='ms')}...")
-            response = bybit_session.get_kline(
-                category="linear", symbol=symbol, interval=interval,
-                start=start_time, limit=limit
-            )
-            
-            if response and response.get('retCode') == 0:
-                data = response['result']['list']
-                if not data:
-                    break
-                
-                all_data.extend(data)
-                # Pindah ke timestamp berikutnya untuk permintaan selanjutnya
-                start_time = int(data[-1][0]) + (int(interval) * 60 * 1000)
-            else:
-                print(f"⚠️ Peringatan API: {response.get('retMsg')}")
-                break
-                
-            time.sleep(0.5) # Jeda sopan untuk API
-        except Exception as e:
-            print(f"❌ Error saat mengunduh data: {e}")
-            break
-
-    if all_data:
-        df = _process_kline_data(all_data)
-        filename = f"{symbol}_{interval}m_data.csv"
-        df.to_csv(filename, index=False)
-        print(f"✅ Data berhasil disimpan ke {filename}")
-        return filename
-    
-    return None
+    """
+    Mengunduh data historis dalam jumlah besar ke market store. Memakai
+    history_downloader (shard konkuren, bisa dilanjutkan jika terputus).
+    """
+    # Impor lokal: history_downloader bergantung pada modul ini
+    from history_downloader import download_history_sync
+    download_history_sync([symbol], interval, start_time)
+    store = MarketDataStore()
+    return store.series_path(symbol, interval) if store.rows(symbol, interval) else None
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class PriceSnapshot:
+    """
+    Snapshot harga semua ticker linear dari satu panggilan get_all_futures_tickers().
+    Dipakai bersama oleh loop trading, manajemen risiko, dan proses shutdown dalam
+    satu siklus; get_latest_price hanya dipanggil saat simbol tidak ada di snapshot
+    atau snapshot sudah melewati max_age.
+    """
+
+    def __init__(self, tickers: Optional[List[Dict[str, Any]]], captured_at: Optional[float] = None,
+                 max_age: float = PRICE_SNAPSHOT_MAX_AGE):
+        self.tickers = tickers or []
+        self.captured_at = clock.time() if captured_at is None else captured_at
+        self.max_age = max_age
+        self._quotes: Dict[str, Dict[str, Optional[float]]] = {}
+        for t in self.tickers:
+            last_price = _to_float(t.get('lastPrice'))
+            if not last_price:
+                continue
+            self._quotes[t['symbol']] = {
+                "lastPrice": last_price,
+                "bid": _to_float(t.get('bid1Price')),
+                "ask": _to_float(t.get('ask1Price')),
+                "turnover24h": _to_float(t.get('turnover24h')),
+            }
+
+    @classmethod
+    def capture(cls, max_age: float = PRICE_SNAPSHOT_MAX_AGE) -> "PriceSnapshot":
+        """Mengambil snapshot baru dengan satu request ticker massal."""
+        return cls(get_all_futures_tickers(), max_age=max_age)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._quotes
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    @property
+    def age(self) -> float:
+        return clock.time() - self.captured_at
+
+    def is_fresh(self) -> bool:
+        return self.age <= self.max_age
+
+    def prices(self) -> Dict[str, float]:
+        """lastPrice semua simbol di snapshot."""
+        return {symbol: quote['lastPrice'] for symbol, quote in self._quotes.items()}
+
+    def quote(self, symbol: str) -> Optional[Dict[str, Optional[float]]]:
+        """Mengembalikan lastPrice/bid/ask/turnover24h dari snapshot (tanpa fallback)."""
+        return self._quotes.get(symbol)
+
+    def get_price(self, symbol: str) -> Optional[float]:
+        """Harga terakhir dari snapshot; fallback ke get_latest_price jika miss/kedaluwarsa."""
+        fresh = self.is_fresh()
+        quote = self._quotes.get(symbol)
+        if quote and fresh:
+            return quote['lastPrice']
+        price = get_latest_price(symbol)
+        if price and fresh:
+            self._quotes[symbol] = {"lastPrice": price, "bid": None, "ask": None, "turnover24h": None}
+        return price
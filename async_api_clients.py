@@ -0,0 +1,190 @@
+# async_api_clients.py
+import asyncio
+import random
+import time
+from typing import Dict, List, Any, Optional
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from api_clients import (
+    PriceSnapshot, _process_kline_data, _kline_list_to_array, _bars_to_frame, get_kline_buffer,
+)
+import metrics
+from rate_limiter import TokenBucket
+
+BYBIT_BASE_URL = "https://api.bybit.com"
+# Endpoint market Bybit dibatasi per IP: 600 request per 5 detik (120/detik)
+DEFAULT_REQUESTS_PER_SECOND = 100
+DEFAULT_ENDPOINT_LIMITS = {
+    "/v5/market/kline": 100,
+    "/v5/market/tickers": 20,
+}
+RATE_LIMIT_RET_CODES = {10006, 10018}  # "Too many visits" / batas IP terlampaui
+RATE_LIMIT_HTTP_STATUS = {403, 429}  # Bybit: 403 "access too frequent" = ban IP sementara
+MAX_BACKOFF_SECONDS = 10.0
+
+
+class AsyncBybitClient:
+    """
+    Klien HTTP asyncio untuk endpoint market publik Bybit (tanpa tanda tangan).
+    Menyediakan padanan async dari fungsi-fungsi di api_clients dengan:
+    - token bucket global (batas IP) dan per-endpoint,
+    - semaphore untuk membatasi jumlah request yang berjalan bersamaan,
+    - backoff eksponensial saat menerima retCode/HTTP rate limit, HTTP 5xx, timeout,
+      atau error koneksi; HTTP 4xx lainnya langsung gagal tanpa retry.
+    """
+
+    def __init__(self, base_url: str = BYBIT_BASE_URL, max_concurrency: int = 20,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 endpoint_limits: Optional[Dict[str, float]] = None,
+                 max_retries: int = 5, backoff_base: float = 0.5, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._global_bucket = TokenBucket(requests_per_second)
+        limits = endpoint_limits if endpoint_limits is not None else DEFAULT_ENDPOINT_LIMITS
+        self._endpoint_buckets = {path: TokenBucket(rate) for path, rate in limits.items()}
+
+    @classmethod
+    def from_settings(cls, engine_settings: Dict[str, Any]) -> "AsyncBybitClient":
+        """Membuat klien dari bagian `engine` di settings.json."""
+        return cls(
+            base_url=engine_settings.get("base_url", BYBIT_BASE_URL),
+            max_concurrency=engine_settings.get("max_concurrency", 20),
+            requests_per_second=engine_settings.get("requests_per_second", DEFAULT_REQUESTS_PER_SECOND),
+            endpoint_limits=engine_settings.get("endpoint_requests_per_second"),
+        )
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    async def __aenter__(self) -> "AsyncBybitClient":
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._session = aiohttp.ClientSession(timeout=self._timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(MAX_BACKOFF_SECONDS, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """GET ke endpoint publik dengan pembatasan laju; hanya error sementara yang dicoba ulang."""
+        query = {k: str(v) for k, v in params.items() if v is not None}
+        endpoint_bucket = self._endpoint_buckets.get(path)
+        for attempt in range(self.max_retries + 1):
+            await self._global_bucket.acquire_async()
+            if endpoint_bucket:
+                await endpoint_bucket.acquire_async()
+            rate_limited = False
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    try:
+                        async with self._session.get(self.base_url + path, params=query) as resp:
+                            if resp.status in RATE_LIMIT_HTTP_STATUS:
+                                rate_limited = True
+                            elif resp.status >= 500:
+                                metrics.API_ERRORS.inc(endpoint=path, kind=f"http_{resp.status}")
+                                print(f"⚠️ Request {path} gagal (percobaan {attempt + 1}): HTTP {resp.status}")
+                            elif resp.status >= 400:
+                                # Request salah (parameter, simbol, path): mengulang tidak akan membantu
+                                metrics.API_ERRORS.inc(endpoint=path, kind=f"http_{resp.status}")
+                                print(f"❌ Request {path} ditolak: HTTP {resp.status} {resp.reason}")
+                                return None
+                            else:
+                                data = await resp.json(content_type=None)
+                                if data.get("retCode") in RATE_LIMIT_RET_CODES:
+                                    rate_limited = True
+                                else:
+                                    if data.get("retCode") != 0:
+                                        metrics.API_ERRORS.inc(endpoint=path, kind=f"retcode_{data.get('retCode')}")
+                                    return data
+                    finally:
+                        metrics.API_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=path)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                metrics.API_ERRORS.inc(endpoint=path, kind="exception")
+                print(f"⚠️ Request {path} gagal (percobaan {attempt + 1}): {e}")
+
+            delay = self._backoff(attempt)
+            if rate_limited:
+                metrics.API_ERRORS.inc(endpoint=path, kind="rate_limit")
+                # Tahan semua request, bukan hanya yang ini, agar tidak memperparah pembatasan
+                print(f"⏳ Rate limit Bybit di {path}, jeda {delay:.2f} detik...")
+                self._global_bucket.pause(delay)
+            await asyncio.sleep(delay)
+        print(f"❌ Request {path} gagal setelah {self.max_retries + 1} percobaan.")
+        return None
+
+    async def get_all_futures_tickers(self) -> Optional[List[Dict[str, Any]]]:
+        response = await self._get("/v5/market/tickers", {"category": "linear"})
+        if response and response.get('retCode') == 0:
+            return response['result']['list']
+        return None
+
+    async def get_latest_price(self, symbol: str) -> Optional[float]:
+        response = await self._get("/v5/market/tickers", {"category": "linear", "symbol": symbol})
+        if response and response.get('retCode') == 0:
+            result_list = response['result']['list']
+            if result_list:
+                return float(result_list[0]['lastPrice'])
+        return None
+
+    async def capture_snapshot(self) -> PriceSnapshot:
+        """Padanan async dari PriceSnapshot.capture()."""
+        return PriceSnapshot(await self.get_all_futures_tickers())
+
+    async def get_snapshot_price(self, snapshot: PriceSnapshot, symbol: str) -> Optional[float]:
+        """Harga dari snapshot; fallback ke request per simbol (async) jika miss/kedaluwarsa."""
+        quote = snapshot.quote(symbol)
+        if quote and snapshot.is_fresh():
+            return quote['lastPrice']
+        return await self.get_latest_price(symbol)
+
+    async def _get_kline_list(self, symbol: str, interval: str, limit: int,
+                              start: Optional[int] = None, end: Optional[int] = None) -> Optional[List[list]]:
+        response = await self._get("/v5/market/kline", {
+            "category": "linear", "symbol": symbol, "interval": interval, "limit": limit,
+            "start": start, "end": end})
+        if response and response.get('retCode') == 0:
+            return response['result']['list']
+        return None
+
+    async def get_kline_page(self, symbol: str, interval: str, start: int, end: int,
+                             limit: int = 1000) -> Optional[np.ndarray]:
+        """Satu halaman k-line dalam rentang [start, end] sebagai array (n, 7) urut waktu naik."""
+        kline_list = await self._get_kline_list(symbol, interval, limit, start, end)
+        return None if kline_list is None else _kline_list_to_array(kline_list)
+
+    async def get_historical_data(self, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        kline_list = await self._get_kline_list(symbol, interval, limit)
+        return None if kline_list is None else _process_kline_data(kline_list)
+
+    async def get_cached_historical_data(self, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Padanan async dari api_clients.get_cached_historical_data (ring buffer yang sama)."""
+        buffer = get_kline_buffer(symbol, interval)
+        start, fetch_limit = buffer.plan_fetch(interval, limit)
+        kline_list = await self._get_kline_list(symbol, interval, fetch_limit, start)
+        bars = None if kline_list is None else _kline_list_to_array(kline_list)
+        if bars is not None and start is not None and (not len(bars) or bars[0, 0] > start):
+            # Ada celah antara cache dan data baru → ambil ulang jendela penuh
+            start = None
+            kline_list = await self._get_kline_list(symbol, interval, limit)
+            bars = None if kline_list is None else _kline_list_to_array(kline_list)
+        if bars is None:
+            return None
+        with buffer.lock:
+            if start is None:
+                buffer.clear()
+            buffer.extend(bars)
+            return _bars_to_frame(buffer.view(limit))
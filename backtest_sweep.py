@@ -0,0 +1,142 @@
+# backtest_sweep.py — Sweep backtest multi-simbol x multi-parameter di banyak core
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import (
+    ATR_SL_MULTIPLIER, ATR_TP_MULTIPLIER, BAR_SERVICE, BASE_INTERVAL, DATA_INTERVAL, INITIAL_BALANCE,
+    add_indicators, compute_signals, ensure_market_data, simulate_backtest,
+)
+
+FEATURE_COLUMNS = ['close', 'adx', 'rsi', 'bband_upper', 'bband_lower', 'atr']
+PARAM_NAMES = ['atr_sl_multiplier', 'atr_tp_multiplier', 'adx_threshold']
+RESULTS_FILE = "sweep_results.csv"
+
+# Deskriptor blok shared memory: (nama, shape)
+SharedArrayRef = Tuple[str, Tuple[int, ...]]
+
+# Cache per proses worker: nama blok -> (SharedMemory, array)
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _to_shared(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedArrayRef]:
+    """Menyalin array sekali ke shared memory agar worker bisa membacanya tanpa salinan."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape)
+
+
+def _attach(ref: SharedArrayRef) -> np.ndarray:
+    name, shape = ref
+    if name not in _attached:
+        # Worker pool berbagi resource tracker dengan proses induk, jadi blok tetap
+        # dihapus sekali oleh induk (unlink) setelah sweep selesai.
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    return _attached[name][1]
+
+
+def load_features(symbol: str, interval: str) -> np.ndarray:
+    """Memuat data simbol dan menghitung indikator sekali; hasil (bar x FEATURE_COLUMNS)."""
+    ensure_market_data(symbol, BASE_INTERVAL)
+    df = add_indicators(BAR_SERVICE.frame(symbol, interval))
+    return np.ascontiguousarray(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+
+
+def summarize(trades: Dict[str, np.ndarray], equity: np.ndarray,
+              initial_balance: float = INITIAL_BALANCE) -> Dict[str, float]:
+    """Ringkasan metrik satu run: PnL, win rate, drawdown, jumlah trade."""
+    pnl = trades['pnl']
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = peak - equity
+    return {
+        "total_pnl": float(pnl.sum()),
+        "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+        "max_drawdown_pct": float((drawdown / peak).max() * 100) if len(drawdown) else 0.0,
+        "trades": int(len(pnl)),
+        "final_equity": float(equity[-1]) if len(equity) else initial_balance,
+    }
+
+
+def run_job(job: Tuple[str, SharedArrayRef, Dict[str, float]]) -> Dict[str, Any]:
+    """Menjalankan satu kombinasi (simbol, parameter) di proses worker."""
+    symbol, ref, params = job
+    features = _attach(ref)
+    close, adx, rsi, upper, lower, atr = (features[:, i] for i in range(len(FEATURE_COLUMNS)))
+    signals = compute_signals(close, adx, rsi, upper, lower, atr, adx_threshold=params['adx_threshold'])
+    trades, equity = simulate_backtest(close, signals, atr,
+                                       sl_multiplier=params['atr_sl_multiplier'],
+                                       tp_multiplier=params['atr_tp_multiplier'])
+    return {"symbol": symbol, **params, **summarize(trades, equity)}
+
+
+def run_sweep(symbols: List[str], interval: str, grid: Dict[str, List[float]],
+              processes: int = None) -> pd.DataFrame:
+    """
+    Menyebar semua kombinasi (simbol, parameter) ke process pool. Data tiap simbol
+    dimuat dan indikatornya dihitung sekali, lalu dibagikan lewat shared memory.
+    Mengembalikan tabel hasil yang sudah diurutkan (PnL tertinggi, drawdown terendah).
+    """
+    param_sets = [dict(zip(PARAM_NAMES, values)) for values in itertools.product(*(grid[p] for p in PARAM_NAMES))]
+    blocks = []
+    try:
+        refs = {}
+        for symbol in symbols:
+            try:
+                shm, refs[symbol] = _to_shared(load_features(symbol, interval))
+                blocks.append(shm)
+            except Exception as e:
+                print(f"⚠️ Lewati {symbol}: {e}")
+        jobs = [(symbol, ref, params) for symbol, ref in refs.items() for params in param_sets]
+        if not jobs:
+            return pd.DataFrame()
+
+        processes = processes or os.cpu_count()
+        print(f"🚀 Menjalankan {len(jobs)} backtest ({len(refs)} simbol x {len(param_sets)} parameter) "
+              f"di {processes} proses...")
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunksize = max(1, len(jobs) // (processes * 4))
+            results = list(executor.map(run_job, jobs, chunksize=chunksize))
+        print(f"✅ Sweep selesai dalam {time.time() - start:.2f} detik.")
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    table = pd.DataFrame(results).sort_values(['total_pnl', 'max_drawdown'], ascending=[False, True])
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def _float_list(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep backtest multi-simbol dan multi-parameter.")
+    parser.add_argument("--symbols", default="DOGEUSDT", help="Daftar simbol dipisah koma")
+    parser.add_argument("--interval", default=DATA_INTERVAL, help="Interval data (menit)")
+    parser.add_argument("--sl", type=_float_list, default=[ATR_SL_MULTIPLIER], help="Grid atr_sl_multiplier, mis. 1,1.5,2")
+    parser.add_argument("--tp", type=_float_list, default=[ATR_TP_MULTIPLIER], help="Grid atr_tp_multiplier, mis. 2,3,4")
+    parser.add_argument("--adx", type=_float_list, default=[20.0], help="Grid ambang ADX ranging, mis. 15,20,25")
+    parser.add_argument("--processes", type=int, default=None, help="Jumlah proses (default: semua core)")
+    parser.add_argument("--out", default=RESULTS_FILE, help="File CSV hasil")
+    args = parser.parse_args()
+
+    grid = {"atr_sl_multiplier": args.sl, "atr_tp_multiplier": args.tp, "adx_threshold": args.adx}
+    table = run_sweep([s.strip() for s in args.symbols.split(",") if s.strip()], args.interval, grid, args.processes)
+    if table.empty:
+        print("🟡 Tidak ada hasil sweep.")
+    else:
+        table.to_csv(args.out, index=False)
+        print(table.head(20).to_string(index=False))
+        print(f"\n📊 Hasil lengkap disimpan ke {args.out}")
@@ -1,138 +1,390 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import argparse
+import heapq
+import os
 import sys
 import talib
 import time
+from typing import Any, Dict, List, Tuple
 
 # --- Impor dari Modul Proyek Anda ---
 try:
-    from config import SETTINGS
+    from config import get_settings
     from api_clients import download_historical_data
+    from bar_service import BASE_INTERVAL, BarService
+    from market_store import MarketDataStore
+    from strategy import DECISION_HOLD, DECISION_LONG, OHLCV_COLUMNS, decision_codes
 except ImportError as e:
     print(f"Error: Gagal mengimpor modul. Detail: {e}")
     sys.exit()
 
 # --- KONFIGURASI BACKTEST ---
 SYMBOL_TO_TEST = "DOGEUSDT"
-DATA_INTERVAL = '15' # Timeframe: '60' untuk 1 jam
+DATA_INTERVAL = '15' # Timeframe: '60' untuk 1 jam (diturunkan dari data 1m di market store)
 START_DATE = "2025-09-01"
 INITIAL_BALANCE = 10.0
+TRADES_FILE = "backtest_trades.csv"  # bisa dievaluasi dengan evaluate_performance.py --file
+MARKET_STORE = MarketDataStore()
+BAR_SERVICE = BarService(MARKET_STORE)
 
 # Ambil pengaturan dari file settings.json
+SETTINGS = get_settings()
 MARGIN_PER_TRADE = SETTINGS['trading_settings']['margin_per_trade']
 LEVERAGE = SETTINGS['trading_settings']['leverage']
 BYBIT_TAKER_FEE = SETTINGS['trading_settings']['bybit_taker_fee']
 ATR_SL_MULTIPLIER = SETTINGS['risk_management']['atr_sl_multiplier']
 ATR_TP_MULTIPLIER = SETTINGS['risk_management']['atr_tp_multiplier']
+SCALPING_SL_PCT = SETTINGS['risk_management']['scalping_sl_pct']
+SCALPING_TP_PCT = SETTINGS['risk_management']['scalping_tp_pct']
 
+# --- KONFIGURASI REPLAY STRATEGI LIVE (harus sama dengan main.py) ---
+LIVE_INTERVAL = '1'
+LIVE_WINDOW = 50              # limit k-line di strategy.make_decision
+LIVE_COOLDOWN_SECONDS = 120   # cooldown per simbol di analyze_and_trade_coin
+LIVE_MAX_POSITIONS = 8        # batas posisi aktif di run_trading_loop
 
-def run_backtest(data_file):
-    """Menjalankan simulasi trading dengan indikator yang sudah dihitung sebelumnya."""
-    try:
-        df = pd.read_csv(data_file, parse_dates=['timestamp'])
-        print(f"📈 Memuat {len(df)} bar data dari {data_file}...")
-    except FileNotFoundError:
-        print(f"❌ File data '{data_file}' tidak ditemukan.")
+
+# --- Inti Backtest Berbasis Array ---
+SIGNAL_LONG, SIGNAL_SHORT = 1, -1
+TRADE_COLUMNS = ['entry_index', 'exit_index', 'side', 'entry_price', 'exit_price', 'size',
+                 'margin', 'stop_loss_price', 'take_profit_price', 'pnl']
+
+
+def compute_signals(close: np.ndarray, adx: np.ndarray, rsi: np.ndarray, upper_band: np.ndarray,
+                    lower_band: np.ndarray, atr: np.ndarray, adx_threshold: float = 20.0) -> np.ndarray:
+    """Sinyal entry untuk semua bar sekaligus: +1 LONG, -1 SHORT, 0 tidak ada."""
+    # Kondisi Ranging -> Mean Reversion
+    ranging = adx < adx_threshold
+    go_long = ranging & (close <= lower_band) & (rsi < 30)
+    go_short = ranging & ~go_long & (close >= upper_band) & (rsi > 70)
+    signals = np.where(go_long, SIGNAL_LONG, np.where(go_short, SIGNAL_SHORT, 0)).astype(np.int8)
+    signals[~(atr > 0)] = 0  # tanpa ATR valid tidak bisa menentukan SL/TP
+    return signals
+
+
+def _find_exit(close: np.ndarray, start: int, sl_price: float, tp_price: float, is_long: bool) -> int:
+    """Indeks bar pertama >= start yang menyentuh SL/TP (len(close) jika tidak ada)."""
+    n = len(close)
+    chunk = 256
+    while start < n:
+        end = min(n, start + chunk)
+        segment = close[start:end]
+        if is_long:
+            hit = (segment <= sl_price) | (segment >= tp_price)
+        else:
+            hit = (segment >= sl_price) | (segment <= tp_price)
+        idx = np.flatnonzero(hit)
+        if idx.size:
+            return start + int(idx[0])
+        start = end
+        chunk *= 2
+    return n
+
+
+def simulate_backtest(close: np.ndarray, signals: np.ndarray, atr: np.ndarray,
+                      sl_multiplier: float = ATR_SL_MULTIPLIER, tp_multiplier: float = ATR_TP_MULTIPLIER,
+                      initial_balance: float = INITIAL_BALANCE, margin: float = MARGIN_PER_TRADE,
+                      leverage: float = LEVERAGE, fee_rate: float = BYBIT_TAKER_FEE
+                      ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Simulasi satu posisi pada satu waktu di atas array kontigu. Loop hanya melompat
+    antar-event (entry berikutnya, lalu bar SL/TP pertama) sementara equity ditulis
+    per segmen ke array yang sudah dialokasikan. Hasil identik bar-per-bar dengan
+    loop per baris sebelumnya.
+    Mengembalikan (trades sebagai dict kolom -> array, equity per bar).
+    """
+    n = len(close)
+    equity = np.empty(n)
+    entry_bars = np.flatnonzero(signals)
+    trades = {col: [] for col in TRADE_COLUMNS}
+    balance = initial_balance
+    i = 0
+    while i < n:
+        k = np.searchsorted(entry_bars, i)
+        if k == len(entry_bars) or balance < margin:
+            equity[i:] = balance
+            break
+        entry = int(entry_bars[k])
+        equity[i:entry] = balance
+
+        # --- Buka posisi ---
+        side = int(signals[entry])
+        entry_price = close[entry]
+        bar_atr = atr[entry]
+        if side == SIGNAL_LONG:
+            sl_price = entry_price - (bar_atr * sl_multiplier)
+            tp_price = entry_price + (bar_atr * tp_multiplier)
+        else:
+            sl_price = entry_price + (bar_atr * sl_multiplier)
+            tp_price = entry_price - (bar_atr * tp_multiplier)
+        size = (margin * leverage) / entry_price
+        balance -= margin
+
+        # --- Cari bar keluar (SL/TP) & catat equity selama posisi terbuka ---
+        exit_bar = _find_exit(close, entry + 1, sl_price, tp_price, side == SIGNAL_LONG)
+        held = close[entry:exit_bar]
+        unrealized = (held - entry_price) * size if side == SIGNAL_LONG else (entry_price - held) * size
+        equity[entry:exit_bar] = balance + (margin + unrealized)
+        if exit_bar == n:
+            break  # posisi masih terbuka di akhir data
+
+        exit_price = close[exit_bar]
+        pnl = (exit_price - entry_price) * size if side == SIGNAL_LONG else (entry_price - exit_price) * size
+        total_fee = (entry_price * size * fee_rate) + (exit_price * size * fee_rate)
+        net_pnl = pnl - total_fee
+        balance += margin + net_pnl
+        for col, value in zip(TRADE_COLUMNS, (entry, exit_bar, side, entry_price, exit_price, size,
+                                              margin, sl_price, tp_price, net_pnl)):
+            trades[col].append(value)
+        i = exit_bar  # bar keluar boleh langsung membuka posisi baru
+
+    trade_arrays = {col: np.asarray(values, dtype=np.int64 if col.endswith('_index') else float)
+                    for col, values in trades.items()}
+    trade_arrays['side'] = trade_arrays['side'].astype(np.int8)
+    return trade_arrays, equity
+
+
+def trades_to_frame(trades: Dict[str, np.ndarray], timestamps: np.ndarray) -> pd.DataFrame:
+    """Mengubah trade berbentuk array menjadi DataFrame dengan kolom yang sama seperti laporan lama."""
+    return pd.DataFrame({
+        'exit_time': timestamps[trades['exit_index']],
+        'exit_price': trades['exit_price'],
+        'pnl': trades['pnl'],
+        'entry_time': timestamps[trades['entry_index']],
+        'entry_price': trades['entry_price'],
+        'side': np.where(trades['side'] == SIGNAL_LONG, 'LONG', 'SHORT'),
+        'size': trades['size'],
+        'margin': trades['margin'],
+        'stop_loss_price': trades['stop_loss_price'],
+        'take_profit_price': trades['take_profit_price'],
+    })
+
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Menambahkan kolom indikator (RSI, SMA50, ADX, ATR, BBANDS) dan membuang baris pemanasan.
+    Kolom batch dihitung sekaligus dengan TA-Lib; indikator inkremental di indicators.py
+    (jalur live) diuji identik dengan kolom ini di tests/test_indicators.py.
+    """
+    close = pd.to_numeric(df['close'])
+    high = pd.to_numeric(df['high'])
+    low = pd.to_numeric(df['low'])
+
+    df['rsi'] = talib.RSI(close, timeperiod=14)
+    df['sma50'] = talib.SMA(close, timeperiod=50)
+    df['adx'] = talib.ADX(high, low, close, timeperiod=14)
+    df['atr'] = talib.ATR(high, low, close, timeperiod=14)
+
+    upper, middle, lower = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
+    df['bband_upper'] = upper
+    df['bband_lower'] = lower
+
+    # Hapus baris awal yang tidak memiliki data indikator lengkap
+    df.dropna(inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def legacy_csv_filename(symbol: str, interval: str) -> str:
+    return f"{symbol}_{interval}m_data.csv"
+
+
+def ensure_market_data(symbol: str, interval: str, start_date: str = START_DATE) -> int:
+    """
+    Memastikan data simbol ada di market store: pakai yang sudah ada, impor CSV
+    lama jika tersedia, atau unduh dari Bybit. Mengembalikan jumlah bar.
+    """
+    rows = MARKET_STORE.rows(symbol, interval)
+    if rows:
+        print(f"Menggunakan data yang sudah ada di store: {symbol} {interval}m ({rows} bar)")
+        return rows
+    csv_filename = legacy_csv_filename(symbol, interval)
+    if os.path.exists(csv_filename):
+        print(f"Mengimpor {csv_filename} ke market store...")
+        MARKET_STORE.import_csv(csv_filename, symbol, interval)
+    else:
+        print(f"Data {symbol} {interval}m tidak ditemukan, memulai unduhan...")
+        start_date_ms = int(pd.Timestamp(start_date).timestamp() * 1000)
+        download_historical_data(symbol, interval=interval, start_time=start_date_ms)
+    return MARKET_STORE.rows(symbol, interval)
+
+
+def run_backtest(symbol: str = SYMBOL_TO_TEST, interval: str = DATA_INTERVAL):
+    """
+    Menjalankan simulasi trading dengan indikator yang sudah dihitung sebelumnya.
+    Bar `interval` diresample dari data 1m di market store (BAR_SERVICE).
+    """
+    df = BAR_SERVICE.frame(symbol, interval)
+    if df.empty:
+        print(f"❌ Data {symbol} {BASE_INTERVAL}m tidak ditemukan di market store.")
         return
+    print(f"📈 Memuat {len(df)} bar data {symbol} {interval}m...")
 
     # --- TAHAP 1: PRA-KALKULASI SEMUA INDIKATOR ---
     print("⏳ Menghitung semua indikator (ini mungkin butuh beberapa saat)...")
     start_calc_time = time.time()
     try:
-        close = pd.to_numeric(df['close'])
-        high = pd.to_numeric(df['high'])
-        low = pd.to_numeric(df['low'])
-
-        df['rsi'] = talib.RSI(close, timeperiod=14)
-        df['sma50'] = talib.SMA(close, timeperiod=50)
-        df['adx'] = talib.ADX(high, low, close, timeperiod=14)
-        df['atr'] = talib.ATR(high, low, close, timeperiod=14)
-        
-        upper, middle, lower = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
-        df['bband_upper'] = upper
-        df['bband_lower'] = lower
-        
-        # Hapus baris awal yang tidak memiliki data indikator lengkap
-        df.dropna(inplace=True)
-        df.reset_index(drop=True, inplace=True)
+        df = add_indicators(df)
         print(f"✅ Indikator berhasil dihitung dalam {time.time() - start_calc_time:.2f} detik.")
-
     except Exception as e:
         print(f"❌ Gagal menghitung indikator: {e}")
         return
 
-    balance = INITIAL_BALANCE
-    position = None
+    print("🚀 Memulai proses backtest...")
+    # --- TAHAP 2: SIMULASI DI ATAS ARRAY NUMPY ---
+    start_sim_time = time.time()
+    close_arr = df['close'].to_numpy(dtype=float)
+    atr_arr = df['atr'].to_numpy(dtype=float)
+    signals = compute_signals(close_arr, df['adx'].to_numpy(dtype=float), df['rsi'].to_numpy(dtype=float),
+                              df['bband_upper'].to_numpy(dtype=float), df['bband_lower'].to_numpy(dtype=float),
+                              atr_arr)
+    trades, equity = simulate_backtest(close_arr, signals, atr_arr)
+    print(f"✅ Simulasi {len(df)} bar selesai dalam {time.time() - start_sim_time:.3f} detik.")
+
+    timestamps = df['timestamp'].to_numpy()
+    print("\n--- ✅ Backtest Selesai ---")
+    trades_df = trades_to_frame(trades, timestamps)
+    trades_df.insert(0, 'symbol', symbol)
+    analyze_results(trades_df,
+                    pd.DataFrame({'timestamp': timestamps, 'balance': equity}))
+
+
+# --- Replay Strategi Live ---
+def live_decision_codes(ohlcv: np.ndarray, window: int = LIVE_WINDOW, chunk: int = 20000) -> np.ndarray:
+    """
+    Keputusan strategy.make_decision untuk setiap bar, dihitung dari jendela bergulir
+    `window` bar (view tanpa salinan) secara vektor per potongan. Bar sebelum jendela
+    pertama lengkap bernilai HOLD.
+    """
+    n = len(ohlcv)
+    codes = np.full(n, DECISION_HOLD, dtype=np.int8)
+    if n < window:
+        return codes
+    windows = np.lib.stride_tricks.sliding_window_view(ohlcv, window, axis=0).transpose(0, 2, 1)
+    for start in range(0, len(windows), chunk):
+        batch_codes, _ = decision_codes(windows[start:start + chunk])
+        codes[window - 1 + start:window - 1 + start + len(batch_codes)] = batch_codes
+    return codes
+
+
+def simulate_live_replay(symbol_data: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                         initial_balance: float = INITIAL_BALANCE, margin: float = MARGIN_PER_TRADE,
+                         leverage: float = LEVERAGE, fee_rate: float = BYBIT_TAKER_FEE,
+                         sl_pct: float = SCALPING_SL_PCT, tp_pct: float = SCALPING_TP_PCT,
+                         cooldown_seconds: float = LIVE_COOLDOWN_SECONDS,
+                         max_positions: int = LIVE_MAX_POSITIONS) -> pd.DataFrame:
+    """
+    Mensimulasikan aturan main.py di atas keputusan yang sudah dihitung:
+    SL/TP persentase tetap, cooldown per simbol, batas jumlah posisi, dan saldo margin.
+    `symbol_data` berisi simbol -> (timestamp ms, close, kode keputusan).
+    Hanya bar dengan sinyal entry yang diproses; bar keluar setiap posisi dicari
+    secara vektor, dan penutupan pada timestamp yang sama diproses sebelum entry
+    (seperti check_risk_management yang berjalan di awal siklus).
+    """
+    symbols = list(symbol_data)
+    event_ts, event_sym, event_bar = [], [], []
+    for sym_idx, symbol in enumerate(symbols):
+        timestamps, _, codes = symbol_data[symbol]
+        bars = np.flatnonzero(codes != DECISION_HOLD)
+        event_ts.append(timestamps[bars])
+        event_sym.append(np.full(len(bars), sym_idx))
+        event_bar.append(bars)
+    event_ts, event_sym, event_bar = (np.concatenate(a) if a else np.empty(0, dtype=np.int64)
+                                      for a in (event_ts, event_sym, event_bar))
+    order = np.lexsort((event_sym, event_ts))
+
+    cooldown_ms = cooldown_seconds * 1000
+    balance = initial_balance
+    open_positions: Dict[str, Dict[str, Any]] = {}
+    exits: List[Tuple[float, str]] = []  # heap (timestamp keluar, simbol)
+    last_trade_time: Dict[str, int] = {}
     trades = []
-    balance_history = []
-
-    print("🚀 Memulai proses backtest loop...")
-    # --- TAHAP 2: LOOP BACKTEST YANG JAUH LEBIH CEPAT ---
-    for i, row in df.iterrows():
-        current_price = row['close']
-        current_time = row['timestamp']
-        
-        # --- Manajemen Posisi (SL/TP) ---
-        if position:
-            pnl = (current_price - position['entry_price']) * position['size'] if position['side'] == 'LONG' else (position['entry_price'] - current_price) * position['size']
-            sl_hit, tp_hit = False, False
-            if position['side'] == 'LONG':
-                if current_price <= position['stop_loss_price']: sl_hit = True
-                elif current_price >= position['take_profit_price']: tp_hit = True
-            elif position['side'] == 'SHORT':
-                if current_price >= position['stop_loss_price']: sl_hit = True
-                elif current_price <= position['take_profit_price']: tp_hit = True
-
-            if sl_hit or tp_hit:
-                entry_val = position['entry_price'] * position['size']
-                exit_val = current_price * position['size']
-                total_fee = (entry_val * BYBIT_TAKER_FEE) + (exit_val * BYBIT_TAKER_FEE)
-                net_pnl = pnl - total_fee
-                balance += position['margin'] + net_pnl
-                trades.append({'exit_time': current_time, 'exit_price': current_price, 'pnl': net_pnl, **position})
-                position = None
-
-        # --- Mencari Sinyal Posisi Baru ---
-        if not position:
-            # Ambil nilai indikator yang sudah dihitung dari baris saat ini
-            adx = row['adx']
-            rsi = row['rsi']
-            upper_band = row['bband_upper']
-            lower_band = row['bband_lower']
-            
-            decision = "HOLD"
-            # Simulasi logika adaptif sederhana
-            if adx < 20: # Kondisi Ranging -> Mean Reversion
-                if current_price <= lower_band and rsi < 30: decision = "GO_LONG"
-                elif current_price >= upper_band and rsi > 70: decision = "GO_SHORT"
-            
-            if (decision in ["GO_LONG", "GO_SHORT"]) and balance >= MARGIN_PER_TRADE:
-                side = "LONG" if decision == "GO_LONG" else "SHORT"
-                atr = row['atr']
-                if atr > 0:
-                    sl_price = current_price - (atr * ATR_SL_MULTIPLIER)
-                    tp_price = current_price + (atr * ATR_TP_MULTIPLIER)
-                    if side == 'SHORT':
-                        sl_price = current_price + (atr * ATR_SL_MULTIPLIER)
-                        tp_price = current_price - (atr * ATR_TP_MULTIPLIER)
-                    
-                    size = (MARGIN_PER_TRADE * LEVERAGE) / current_price
-                    balance -= MARGIN_PER_TRADE
-                    position = {'entry_time': current_time, 'entry_price': current_price, 'side': side, 'size': size, 'margin': MARGIN_PER_TRADE, 'stop_loss_price': sl_price, 'take_profit_price': tp_price}
-
-        # --- Catat Perkembangan Saldo (Equity) ---
-        current_equity = balance
-        if position:
-            current_pnl = (current_price - position['entry_price']) * position['size'] if position['side'] == 'LONG' else (position['entry_price'] - current_price) * position['size']
-            current_equity += (position['margin'] + current_pnl)
-        balance_history.append({'timestamp': current_time, 'balance': current_equity})
+
+    def close_until(ts: float):
+        nonlocal balance
+        while exits and exits[0][0] <= ts:
+            _, symbol = heapq.heappop(exits)
+            pos = open_positions.pop(symbol)
+            price = pos['exit_price']
+            gross_pnl = (price - pos['entry_price']) * pos['size'] if pos['side'] == 'LONG' else (pos['entry_price'] - price) * pos['size']
+            fee = (pos['entry_price'] * pos['size'] + price * pos['size']) * fee_rate
+            net_pnl = gross_pnl - fee
+            balance += (pos['margin'] + net_pnl)
+            trades.append({**pos, 'pnl': net_pnl, 'balance': balance})
+
+    for k in order:
+        ts, symbol, bar = int(event_ts[k]), symbols[event_sym[k]], int(event_bar[k])
+        close_until(ts)
+        if symbol in open_positions:
+            continue
+        if symbol in last_trade_time and ts - last_trade_time[symbol] < cooldown_ms:
+            continue
+        if len(open_positions) >= max_positions or balance < margin:
+            continue
+
+        timestamps, close, codes = symbol_data[symbol]
+        side = 'LONG' if codes[bar] == DECISION_LONG else 'SHORT'
+        price = close[bar]
+        sl_price = price * (1 - sl_pct) if side == 'LONG' else price * (1 + sl_pct)
+        tp_price = price * (1 + tp_pct) if side == 'LONG' else price * (1 - tp_pct)
+        balance -= margin
+        last_trade_time[symbol] = ts
+        pos = {
+            'symbol': symbol, 'side': side, 'entry_time': ts, 'entry_price': price,
+            'size': (margin * leverage) / price, 'margin': margin,
+            'stop_loss_price': sl_price, 'take_profit_price': tp_price,
+        }
+        open_positions[symbol] = pos
+        exit_bar = _find_exit(close, bar + 1, sl_price, tp_price, side == 'LONG')
+        if exit_bar < len(close):
+            exit_price = close[exit_bar]
+            sl_hit = exit_price <= sl_price if side == 'LONG' else exit_price >= sl_price
+            pos.update(exit_time=int(timestamps[exit_bar]), exit_price=exit_price,
+                       reason="Stop Loss" if sl_hit else "Take Profit")
+            heapq.heappush(exits, (pos['exit_time'], symbol))
+    close_until(float('inf'))
+
+    trades_df = pd.DataFrame(trades)
+    if not trades_df.empty:
+        for col in ('entry_time', 'exit_time'):
+            trades_df[col] = pd.to_datetime(trades_df[col], unit='ms')
+    return trades_df
+
+
+def run_live_replay(symbols: List[str], interval: str = LIVE_INTERVAL):
+    """Backtest strategi live (strategy.make_decision + aturan main.py) di atas data historis."""
+    symbol_data = {}
+    first_time = None
+    start_time = time.time()
+    for symbol in symbols:
+        ensure_market_data(symbol, interval)
+        columns = MARKET_STORE.load(symbol, interval)
+        timestamps = columns['timestamp']
+        if not len(timestamps):
+            continue
+        ohlcv = np.column_stack([columns[col] for col in OHLCV_COLUMNS])
+        symbol_data[symbol] = (timestamps, columns['close'], live_decision_codes(ohlcv))
+        symbol_start = pd.to_datetime(int(timestamps[0]), unit='ms')
+        first_time = symbol_start if first_time is None else min(first_time, symbol_start)
+        print(f"✅ {symbol}: {len(timestamps)} bar dievaluasi")
+    trades_df = simulate_live_replay(symbol_data)
+    print(f"✅ Replay selesai dalam {time.time() - start_time:.2f} detik.")
 
     print("\n--- ✅ Backtest Selesai ---")
-    analyze_results(pd.DataFrame(trades), pd.DataFrame(balance_history))
+    if trades_df.empty:
+        analyze_results(trades_df, pd.DataFrame())
+        return
+    balance_df = pd.concat([
+        pd.DataFrame({'timestamp': [first_time], 'balance': [INITIAL_BALANCE]}),
+        trades_df[['exit_time', 'balance']].rename(columns={'exit_time': 'timestamp'}),
+    ], ignore_index=True)
+    analyze_results(trades_df, balance_df, title=f"Replay Strategi Live ({', '.join(symbols)} - {interval}m)")
 
 
-def analyze_results(trades_df, balance_df):
+def analyze_results(trades_df, balance_df, title=None):
     """Menganalisis dan memvisualisasikan hasil backtest."""
     if trades_df.empty:
         print("🟡 Tidak ada trade yang dieksekusi selama periode backtest.")
@@ -152,21 +404,25 @@ def analyze_results(trades_df, balance_df):
     
     fig = make_subplots(rows=1, cols=1)
     fig.add_trace(go.Scatter(x=balance_df['timestamp'], y=balance_df['balance'], mode='lines', name='Equity Curve'))
-    fig.update_layout(title=f'Performa Strategi Backtest ({SYMBOL_TO_TEST} - {DATA_INTERVAL}m)', xaxis_title='Tanggal', yaxis_title='Saldo Margin ($)', height=600)
+    title = title or f'Performa Strategi Backtest ({SYMBOL_TO_TEST} - {DATA_INTERVAL}m)'
+    fig.update_layout(title=title, xaxis_title='Tanggal', yaxis_title='Saldo Margin ($)', height=600)
     
     report_filename = "backtest_report.html"
     fig.write_html(report_filename)
     print(f"\n📊 Laporan visual backtest disimpan ke {report_filename}")
+    trades_df.sort_values('exit_time', kind='stable').to_csv(TRADES_FILE, index=False)
+    print(f"🧾 Daftar trade disimpan ke {TRADES_FILE} (python evaluate_performance.py --file {TRADES_FILE})")
 
 
 if __name__ == "__main__":
-    data_filename = f"{SYMBOL_TO_TEST}_{DATA_INTERVAL}m_data.csv"
-    try:
-        pd.read_csv(data_filename)
-        print(f"Menggunakan file data yang sudah ada: {data_filename}")
-    except FileNotFoundError:
-        print(f"File data {data_filename} tidak ditemukan, memulai unduhan...")
-        start_date_ms = int(pd.Timestamp(START_DATE).timestamp() * 1000)
-        download_historical_data(SYMBOL_TO_TEST, interval=DATA_INTERVAL, start_time=start_date_ms)
-    
-    run_backtest(data_filename)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Backtest strategi trading.")
+    parser.add_argument("--mode", choices=["adaptive", "live"], default="adaptive",
+                        help="adaptive: strategi ADX/RSI/Bollinger; live: replay strategy.make_decision")
+    parser.add_argument("--symbols", default=SYMBOL_TO_TEST, help="Simbol (dipisah koma untuk mode live)")
+    args = parser.parse_args()
+
+    if args.mode == "live":
+        run_live_replay([s.strip() for s in args.symbols.split(",") if s.strip()])
+    else:
+        ensure_market_data(args.symbols, BASE_INTERVAL)
+        run_backtest(args.symbols, DATA_INTERVAL)
\ No newline at end of file
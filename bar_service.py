@@ -0,0 +1,207 @@
+# bar_service.py — Bar interval tinggi (3m, 5m, 15m, 1h, 4h, ...) yang diturunkan dari data 1 menit
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_store import COLUMNS, MarketDataStore
+
+BASE_INTERVAL = '1'
+BASE_INTERVAL_MS = 60 * 1000
+COMMON_INTERVALS = ('3', '5', '15', '60', '240')
+
+
+def interval_minutes(interval: str) -> int:
+    """Interval Bybit dalam menit ('15' -> 15); hanya kelipatan menit yang bisa diturunkan dari 1m."""
+    try:
+        minutes = int(interval)
+    except (TypeError, ValueError):
+        raise ValueError(f"Interval {interval!r} tidak bisa diturunkan dari data 1 menit")
+    if minutes < 1:
+        raise ValueError(f"Interval {interval!r} tidak valid")
+    return minutes
+
+
+def resample_bars(bars: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Resample bar 1m (array n x COLUMNS, urut waktu naik tanpa duplikat) ke interval
+    lain sekaligus: bucket = timestamp // interval (selaras UTC seperti candle Bybit),
+    open = pertama, high = max, low = min, close = terakhir, volume/turnover = jumlah.
+    Timestamp hasil adalah awal bucket. Menit yang kosong (tidak ada bar) dilewati.
+    """
+    bars = np.asarray(bars, dtype=np.float64)
+    if not len(bars):
+        return np.empty((0, len(COLUMNS)))
+    interval_ms = interval_minutes(interval) * BASE_INTERVAL_MS
+    bucket = bars[:, 0].astype(np.int64) // interval_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    out = np.empty((len(starts), len(COLUMNS)))
+    out[:, 0] = bucket[starts] * interval_ms
+    out[:, 1] = bars[starts, 1]
+    out[:, 2] = np.maximum.reduceat(bars[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(bars[:, 3], starts)
+    out[:, 4] = bars[ends, 4]
+    out[:, 5:] = np.add.reduceat(bars[:, 5:], starts, axis=0)
+    return out
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """Array bar -> DataFrame dengan kolom yang sama seperti MarketDataStore.load_frame."""
+    df = pd.DataFrame(bars[:, 1:], columns=COLUMNS[1:])
+    df.insert(0, 'timestamp', pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms'))
+    return df
+
+
+class BarAggregate:
+    """
+    Agregat satu simbol/interval yang diperpanjang secara inkremental.
+    - closed: bucket yang sudah selesai (sudah ada bar 1m dari bucket sesudahnya),
+      tidak pernah dihitung ulang.
+    - pending: bar 1m milik bucket terakhir; bucket ini dihitung ulang setiap kali
+      bar 1m baru masuk (termasuk saat bar 1m terakhir diperbarui).
+    """
+
+    def __init__(self, interval: str, max_bars: Optional[int] = None):
+        self.interval = interval
+        self.interval_ms = interval_minutes(interval) * BASE_INTERVAL_MS
+        self.max_bars = max_bars
+        self.closed = np.empty((0, len(COLUMNS)))
+        self.pending = np.empty((0, len(COLUMNS)))
+        self._current = np.empty((0, len(COLUMNS)))  # bucket terakhir (belum selesai) hasil resample
+
+    @property
+    def pending_start(self) -> Optional[int]:
+        """Awal bucket terakhir (ms); bar 1m sejak titik ini yang perlu dibaca ulang."""
+        if not len(self.pending):
+            return None
+        return int(self.pending[0, 0]) // self.interval_ms * self.interval_ms
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Timestamp bar 1m terakhir yang sudah masuk agregat."""
+        return int(self.pending[-1, 0]) if len(self.pending) else None
+
+    def clear(self):
+        self.closed = np.empty((0, len(COLUMNS)))
+        self.pending = np.empty((0, len(COLUMNS)))
+        self._current = np.empty((0, len(COLUMNS)))
+
+    def extend(self, bars_1m: np.ndarray) -> int:
+        """
+        Menambahkan bar 1m (urut waktu naik). Bar yang jatuh di bucket yang sudah
+        selesai diabaikan; bar dengan timestamp yang sama menimpa yang lama.
+        Mengembalikan jumlah bucket yang baru selesai.
+        """
+        bars = np.asarray(bars_1m, dtype=np.float64)
+        start = self.pending_start
+        if start is not None:
+            bars = bars[bars[:, 0] >= start]
+        if not len(bars):
+            return 0
+        merged = np.concatenate([self.pending, bars])
+        merged = merged[np.argsort(merged[:, 0], kind='stable')]
+        merged = merged[np.r_[merged[1:, 0] != merged[:-1, 0], True]]  # duplikat: ambil yang terbaru
+
+        resampled = resample_bars(merged, self.interval)
+        finished = resampled[:-1]
+        if len(finished):
+            self.closed = np.concatenate([self.closed, finished])
+            if self.max_bars and len(self.closed) > self.max_bars:
+                self.closed = self.closed[-self.max_bars:]
+        self._current = resampled[-1:]
+        self.pending = merged[merged[:, 0] >= self._current[0, 0]]
+        return len(finished)
+
+    def view(self, include_partial: bool = True) -> np.ndarray:
+        """Semua bar agregat urut waktu naik; bucket berjalan ikut jika include_partial."""
+        if not include_partial or not len(self._current):
+            return self.closed
+        return np.concatenate([self.closed, self._current])
+
+
+class BarService:
+    """
+    Satu sumber kebenaran 1 menit untuk semua timeframe. Interval lain dihitung
+    dengan resample_bars dan disimpan di cache per (simbol, interval); panggilan
+    berikutnya hanya membaca bar 1m sejak awal bucket terakhir dan memperpanjang
+    agregat, bukan menghitung ulang seluruh riwayat.
+    - Dengan store (backtester): bar 1m dibaca dari MarketDataStore (memmap).
+    - Tanpa store (live): bar 1m dimasukkan lewat ingest(), mis. dari ring buffer
+      k-line di api_clients.
+    """
+
+    def __init__(self, store: Optional[MarketDataStore] = None, max_bars: Optional[int] = None):
+        self.store = store
+        self.max_bars = max_bars
+        self._aggregates: Dict[Tuple[str, str], BarAggregate] = {}
+        self._lock = threading.Lock()
+
+    def aggregate(self, symbol: str, interval: str) -> BarAggregate:
+        key = (symbol, interval)
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            with self._lock:
+                aggregate = self._aggregates.setdefault(key, BarAggregate(interval, self.max_bars))
+        return aggregate
+
+    def _load_base(self, symbol: str, start: Optional[int] = None) -> np.ndarray:
+        columns = self.store.load(symbol, BASE_INTERVAL, start=start)
+        return np.column_stack([np.asarray(columns[col], dtype=np.float64) for col in COLUMNS])
+
+    def ingest(self, symbol: str, bars_1m: np.ndarray):
+        """
+        Memasukkan bar 1m baru ke semua agregat simbol yang sudah pernah diminta.
+        Agregat yang tertinggal (ada menit yang hilang sebelum bar pertama) dikosongkan
+        supaya pemanggil mengisinya ulang lewat seed().
+        """
+        if not len(bars_1m):
+            return
+        with self._lock:
+            for (sym, _), aggregate in self._aggregates.items():
+                if sym != symbol:
+                    continue
+                last_ts = aggregate.last_timestamp
+                if last_ts is not None and bars_1m[0, 0] > last_ts + BASE_INTERVAL_MS:
+                    aggregate.clear()
+                else:
+                    aggregate.extend(bars_1m)
+
+    def seed(self, symbol: str, interval: str, bars_1m: np.ndarray) -> BarAggregate:
+        """Mengisi ulang agregat simbol/interval dari riwayat 1m (mis. setelah celah data)."""
+        aggregate = self.aggregate(symbol, interval)
+        with self._lock:
+            aggregate.clear()
+            aggregate.extend(bars_1m)
+        return aggregate
+
+    def bars(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None,
+             include_partial: bool = True) -> np.ndarray:
+        """
+        Bar simbol pada interval apa pun sebagai array (n x COLUMNS), opsional dibatasi
+        rentang [start, end] dalam milidetik. Interval 1m dibaca langsung dari store.
+        """
+        if interval_minutes(interval) == 1:
+            if self.store is None:
+                raise ValueError("BarService tanpa store tidak menyimpan bar 1m")
+            bars = self._load_base(symbol)
+        else:
+            aggregate = self.aggregate(symbol, interval)
+            with self._lock:
+                if self.store is not None:
+                    aggregate.extend(self._load_base(symbol, aggregate.pending_start))
+                bars = aggregate.view(include_partial)
+        lo = 0 if start is None else int(np.searchsorted(bars[:, 0], start, side='left'))
+        hi = len(bars) if end is None else int(np.searchsorted(bars[:, 0], end, side='right'))
+        return bars[lo:hi]
+
+    def frame(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None,
+              include_partial: bool = True) -> pd.DataFrame:
+        """Seperti bars(), dalam bentuk DataFrame (kolom timestamp datetime)."""
+        return bars_to_frame(self.bars(symbol, interval, start, end, include_partial))
+
+    def forget(self, symbol: str):
+        with self._lock:
+            for key in [key for key in self._aggregates if key[0] == symbol]:
+                del self._aggregates[key]
@@ -0,0 +1,274 @@
+# benchmark.py — Benchmark hot path (parsing, strategi, siklus loop, backtest) tanpa jaringan
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = "benchmark_results.json"
+DEFAULT_THRESHOLD = 0.10  # regresi jika lebih buruk > 10% dari baseline
+UNIVERSE_SIZE = 500
+FIXTURE_BARS = 200
+BACKTEST_SIZES = [100_000, 1_000_000]
+INTERVAL_MS = 60_000
+
+
+# --- Fixture ---
+def synthetic_bars(n_bars: int, seed: int = 0, start_ms: int = 1_700_000_000_000) -> np.ndarray:
+    """Random walk OHLCV (n, 7) dengan timestamp 1 menit, deterministik untuk seed yang sama."""
+    rng = np.random.default_rng(seed)
+    close = 1.0 + seed % 7 + np.exp(np.cumsum(rng.normal(0, 0.002, n_bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.random(n_bars) * 0.002)
+    low = np.minimum(open_, close) * (1 - rng.random(n_bars) * 0.002)
+    volume = rng.lognormal(10, 1, n_bars)
+    timestamps = start_ms + INTERVAL_MS * np.arange(n_bars)
+    return np.column_stack([timestamps, open_, high, low, close, volume, volume * close])
+
+
+def synthetic_fixture(n_symbols: int = UNIVERSE_SIZE, n_bars: int = FIXTURE_BARS, seed: int = 0) -> Dict[str, Any]:
+    """Ticker dan k-line untuk universe sintetis; format sama dengan fixture rekaman."""
+    klines, tickers = {}, []
+    for i in range(n_symbols):
+        symbol = f"BENCH{i:03d}USDT"
+        bars = synthetic_bars(n_bars, seed + i)
+        klines[symbol] = bars.tolist()
+        tickers.append({"symbol": symbol, "lastPrice": str(bars[-1, 4]), "bid1Price": str(bars[-1, 4] * 0.9999),
+                        "ask1Price": str(bars[-1, 4] * 1.0001), "turnover24h": str(bars[:, 6].sum())})
+    return {"tickers": tickers, "klines": klines}
+
+
+def load_fixture(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return synthetic_fixture()
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class MockExchange:
+    """
+    Pengganti sesi pybit untuk get_tickers/get_kline yang melayani data fixture.
+    Timestamp digeser agar bar terakhir jatuh di menit berjalan, sehingga cache
+    k-line berperilaku seperti saat live (siklus kedua hanya mengambil bar baru).
+    """
+
+    def __init__(self, fixture: Dict[str, Any]):
+        self.tickers = fixture['tickers']
+        self.klines = {symbol: np.asarray(bars, dtype=float) for symbol, bars in fixture['klines'].items()}
+        now_ms = int(time.time() * 1000) // INTERVAL_MS * INTERVAL_MS
+        for bars in self.klines.values():
+            bars[:, 0] += now_ms - bars[-1, 0]
+        self.calls = 0
+
+    @staticmethod
+    def _response(result_list: List[Any]) -> Dict[str, Any]:
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": result_list}}
+
+    def get_tickers(self, category: str = "linear", symbol: Optional[str] = None, **_) -> Dict[str, Any]:
+        self.calls += 1
+        if symbol is None:
+            return self._response(self.tickers)
+        return self._response([t for t in self.tickers if t['symbol'] == symbol])
+
+    def get_kline(self, category: str = "linear", symbol: str = "", interval: str = "1", limit: int = 200,
+                  start: Optional[int] = None, end: Optional[int] = None, **_) -> Dict[str, Any]:
+        self.calls += 1
+        bars = self.klines.get(symbol)
+        if bars is None:
+            return self._response([])
+        if start is not None:
+            bars = bars[bars[:, 0] >= start]
+        if end is not None:
+            bars = bars[bars[:, 0] <= end]
+        bars = bars[-int(limit):][::-1]  # Bybit: terbaru di depan, semua nilai string
+        return self._response([[str(int(b[0]))] + [repr(float(x)) for x in b[1:]] for b in bars])
+
+
+# --- Utilitas Pengukuran ---
+def best_time(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Waktu terbaik (detik) dari beberapa pengulangan; lebih stabil daripada rata-rata."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _result(value: float, unit: str, better: str) -> Dict[str, Any]:
+    return {"value": value, "unit": unit, "better": better}
+
+
+# --- Benchmark ---
+def bench_kline_parsing(repeat: int = 20) -> Dict[str, Dict[str, Any]]:
+    from api_clients import _kline_list_to_array, _process_kline_data
+    bars = synthetic_bars(1000)
+    raw = [[str(int(b[0]))] + [repr(float(x)) for x in b[1:]] for b in bars[::-1]]
+    return {
+        "kline_parse_frame_ms_per_1000_bars": _result(best_time(lambda: _process_kline_data(raw), repeat) * 1000,
+                                                      "ms", "lower"),
+        "kline_parse_array_ms_per_1000_bars": _result(best_time(lambda: _kline_list_to_array(raw), repeat) * 1000,
+                                                      "ms", "lower"),
+    }
+
+
+def bench_decisions(fixture: Dict[str, Any], repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    from api_clients import _bars_to_frame
+    from strategy import frames_to_batch, make_decision, make_decisions
+    frames = {symbol: _bars_to_frame(np.asarray(bars, dtype=float)[-50:]) for symbol, bars in fixture['klines'].items()}
+    symbols = list(frames)
+
+    def scalar():
+        for symbol, frame in frames.items():
+            make_decision(symbol, {}, 1.0, data=frame)
+
+    def batch():
+        make_decisions(symbols, frames_to_batch(list(frames.values())), {})
+
+    return {
+        "decisions_per_sec_scalar": _result(len(symbols) / best_time(scalar, repeat), "decisions/s", "higher"),
+        "decisions_per_sec_batch": _result(len(symbols) / best_time(batch, repeat), "decisions/s", "higher"),
+    }
+
+
+def bench_trading_cycle(fixture: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Satu siklus run_trading_loop penuh (cache dingin lalu hangat) terhadap MockExchange."""
+    exchange = MockExchange(fixture)
+    config.set_bybit_session(exchange)
+    import api_clients
+    import main
+    from state_journal import StateJournal
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # state, log trading, dan status ditulis di direktori sementara
+        try:
+            main.JOURNAL = StateJournal(os.path.join(workdir, "state"))
+            main.JOURNAL.recover()
+            main.MARGIN_BALANCE = 10.0
+            main.OPEN_POSITIONS.load({})
+            main.LAST_TRADE_TIME.clear()
+            api_clients._kline_buffers.clear()
+            cold = best_time(main.run_trading_cycle, repeat=1)
+            calls = exchange.calls
+            warm = best_time(main.run_trading_cycle, repeat=1)
+            warm_calls = exchange.calls - calls
+            main.JOURNAL.close()
+        finally:
+            os.chdir(previous_dir)
+    return {
+        "trading_cycle_cold_seconds": _result(cold, "s", "lower"),
+        "trading_cycle_warm_seconds": _result(warm, "s", "lower"),
+        "trading_cycle_warm_requests": _result(warm_calls, "requests", "lower"),
+    }
+
+
+def bench_backtest(n_bars: int) -> Dict[str, Dict[str, Any]]:
+    """Pipeline run_backtest (indikator + sinyal + simulasi) tanpa I/O dan plot."""
+    import backtester
+    bars = synthetic_bars(n_bars)
+    df = pd.DataFrame(bars[:, 1:6], columns=['open', 'high', 'low', 'close', 'volume'])
+    df.insert(0, 'timestamp', pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms'))
+
+    def run():
+        features = backtester.add_indicators(df.copy())
+        close = features['close'].to_numpy(dtype=float)
+        atr = features['atr'].to_numpy(dtype=float)
+        signals = backtester.compute_signals(close, features['adx'].to_numpy(dtype=float),
+                                             features['rsi'].to_numpy(dtype=float),
+                                             features['bband_upper'].to_numpy(dtype=float),
+                                             features['bband_lower'].to_numpy(dtype=float), atr)
+        backtester.simulate_backtest(close, signals, atr)
+
+    def live():
+        backtester.live_decision_codes(np.ascontiguousarray(bars[:, 1:6]))
+
+    label = f"{n_bars // 1000}k"
+    return {
+        f"backtest_bars_per_sec_{label}": _result(n_bars / best_time(run, repeat=3), "bars/s", "higher"),
+        f"live_replay_bars_per_sec_{label}": _result(n_bars / best_time(live, repeat=1), "bars/s", "higher"),
+    }
+
+
+def run_benchmarks(fixture: Dict[str, Any], backtest_sizes: List[int]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    steps = [("parsing k-line", bench_kline_parsing),
+             ("keputusan strategi", lambda: bench_decisions(fixture)),
+             ("siklus loop trading", lambda: bench_trading_cycle(fixture))]
+    steps += [(f"backtest {n:,} bar", lambda n=n: bench_backtest(n)) for n in backtest_sizes]
+    for name, step in steps:
+        print(f"⏳ Benchmark {name}...")
+        results.update(step())
+    return {
+        "meta": {"timestamp": pd.Timestamp.now().isoformat(), "python": platform.python_version(),
+                 "platform": platform.platform(), "numpy": np.__version__, "pandas": pd.__version__,
+                 "universe": len(fixture['tickers'])},
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Daftar metrik yang lebih buruk dari baseline melebihi ambang relatif `threshold`."""
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base['value']:
+            continue
+        change = (result['value'] - base['value']) / base['value']
+        worse = -change if result['better'] == "higher" else change
+        if worse > threshold:
+            regressions.append(f"{name}: {base['value']:.4g} → {result['value']:.4g} {result['unit']} "
+                               f"({worse * 100:.1f}% lebih buruk)")
+    return regressions
+
+
+def print_results(report: Dict[str, Any]):
+    print("\n--- Hasil Benchmark ---")
+    for name, result in report['results'].items():
+        print(f"{name:<40} {result['value']:>14,.3f} {result['unit']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hot path agent trading dengan data fixture (tanpa jaringan).")
+    parser.add_argument("--fixture", default=None, help="File fixture JSON (default: universe sintetis)")
+    parser.add_argument("--save-fixture", default=None, help="Simpan fixture yang dipakai ke file JSON")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in BACKTEST_SIZES),
+                        help="Ukuran seri backtest dipisah koma")
+    parser.add_argument("--out", default=RESULTS_FILE, help="File JSON hasil")
+    parser.add_argument("--baseline", default=None, help="File JSON hasil sebelumnya untuk cek regresi")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Ambang regresi relatif, mis. 0.1 = 10%%")
+    args = parser.parse_args()
+
+    config.set_settings(config.load_settings(os.path.join(ROOT, config.SETTINGS_FILE)))
+    fixture = load_fixture(args.fixture)
+    if args.save_fixture:
+        with open(args.save_fixture, "w") as f:
+            json.dump(fixture, f)
+    report = run_benchmarks(fixture, [int(n) for n in args.sizes.split(",") if n])
+    print_results(report)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📊 Hasil disimpan ke {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regresi melebihi {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ Tidak ada regresi melebihi {args.threshold * 100:.0f}% dibanding {args.baseline}")
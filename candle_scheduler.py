@@ -0,0 +1,74 @@
+# candle_scheduler.py — Evaluasi ulang simbol hanya saat candle baru atau saat setup mungkin terpenuhi
+import threading
+from typing import Container, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import clock
+from api_clients import interval_to_ms
+from strategy import (DECISION_HOLD, DECISION_LONG, DECISION_NAMES, DECISION_SHORT, MIN_BARS, OHLCV_COLUMNS,
+                      REASON_BEARISH, REASON_BULLISH, REASON_NO_DATA, REASON_TEMPLATES, ClosedBarState)
+
+
+class CandleScheduler:
+    """
+    Pengganti make_decision per siklus untuk engine yang memindai semua koin
+    setiap beberapa detik:
+    - decide() memakai ClosedBarState yang dihitung sekali per candle (selama bar
+      tertutup di jendela tidak berubah), sehingga tiap evaluasi hanya O(1) untuk
+      bar berjalan. Hasilnya identik dengan make_decision.
+    - should_evaluate() memberi tahu kapan k-line perlu diambil dan dievaluasi:
+      belum ada memo, candle yang terakhir dilihat sudah tutup, atau harga terakhir
+      membuat syarat tren + badan candle mungkin terpenuhi (ClosedBarState.may_trigger).
+      Di luar itu keputusan pasti HOLD, jadi request k-line dilewati.
+    """
+
+    def __init__(self, interval: str = '1'):
+        self.interval_ms = interval_to_ms(interval)
+        self._states: Dict[str, ClosedBarState] = {}
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.skipped = 0
+
+    def should_evaluate(self, symbol: str, price: float, now_ms: Optional[int] = None) -> bool:
+        state = self._states.get(symbol)
+        now_ms = int(clock.time() * 1000) if now_ms is None else now_ms
+        evaluate = state is None or now_ms >= state.bar_ts + self.interval_ms or state.may_trigger(price)
+        with self._lock:
+            if evaluate:
+                self.evaluated += 1
+            else:
+                self.skipped += 1
+        return evaluate
+
+    def _state_for(self, symbol: str, data: pd.DataFrame) -> ClosedBarState:
+        # Kunci O(1): bar berjalan, bar tertutup terakhir, dan panjang jendela. Ring buffer
+        # k-line hanya menimpa bar terakhir, jadi kunci yang sama berarti bar tertutup yang sama.
+        timestamps = data['timestamp']
+        key = (timestamps.iat[-1].value, timestamps.iat[-2].value, len(data))
+        state = self._states.get(symbol)
+        if state is None or state.key != key:
+            state = ClosedBarState.from_frame(data, key)
+            self._states[symbol] = state
+        return state
+
+    def decide(self, symbol: str, open_positions: Container[str],
+               data: Optional[pd.DataFrame]) -> Tuple[str, str]:
+        """(keputusan, pesan) seperti make_decision, dengan memo bar tertutup per simbol."""
+        if data is None or len(data) < MIN_BARS:
+            self._states.pop(symbol, None)
+            return "HOLD", REASON_TEMPLATES[REASON_NO_DATA].format(symbol=symbol)
+        state = self._state_for(symbol, data)
+        bar = np.array([data[col].iat[-1] for col in OHLCV_COLUMNS], dtype=float)
+        reason = state.decide(bar, symbol in open_positions)
+        code = {REASON_BULLISH: DECISION_LONG, REASON_BEARISH: DECISION_SHORT}.get(reason, DECISION_HOLD)
+        return DECISION_NAMES[code], REASON_TEMPLATES[reason].format(symbol=symbol)
+
+    def forget(self, symbol: str):
+        self._states.pop(symbol, None)
+
+    @property
+    def skip_ratio(self) -> float:
+        total = self.evaluated + self.skipped
+        return self.skipped / total if total else 0.0
@@ -0,0 +1,67 @@
+# check_import_budget.py — Memastikan modul offline bisa diimpor cepat tanpa kredensial
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# Modul yang harus bisa diimpor tanpa API key dan tanpa membuat klien exchange
+OFFLINE_MODULES = ["strategy", "indicators", "market_store", "backtester", "backtest_sweep",
+                   "evaluate_performance", "trade_log", "market_replay",
+                   "risk_engine", "candle_scheduler", "bar_service"]
+FORBIDDEN_MODULES = ["pybit", "dotenv"]
+DEFAULT_BUDGET_SECONDS = 1.0
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+config = sys.modules.get("config")
+print(json.dumps({{
+    "elapsed": elapsed,
+    "forbidden": [name for name in {forbidden!r} if name in sys.modules],
+    "client_created": bool(config and getattr(config, "_bybit_session", None) is not None),
+}}))
+"""
+
+
+def probe_module(module: str) -> Dict[str, Any]:
+    """Mengimpor satu modul di proses baru (cache impor bersih, tanpa kredensial) dan mengukur hasilnya."""
+    env = {k: v for k, v in os.environ.items() if k not in ("BYBIT_API_KEY", "BYBIT_API_SECRET")}
+    root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+                            cwd=root, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"module": module, "error": result.stderr.strip().splitlines()[-1:]}
+    return {"module": module, **json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def check_import_budget(modules: List[str], budget: float) -> bool:
+    ok = True
+    for module in modules:
+        result = probe_module(module)
+        if "error" in result:
+            print(f"❌ {module}: gagal diimpor ({' '.join(result['error'])})")
+            ok = False
+            continue
+        problems = []
+        if result['elapsed'] > budget:
+            problems.append(f"melebihi budget {budget:.2f} detik")
+        if result['forbidden']:
+            problems.append(f"mengimpor {', '.join(result['forbidden'])}")
+        if result['client_created']:
+            problems.append("membuat klien Bybit")
+        status = "❌" if problems else "✅"
+        print(f"{status} {module}: {result['elapsed']:.3f} detik" + (f" — {'; '.join(problems)}" if problems else ""))
+        ok = ok and not problems
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cek waktu impor modul offline dan pastikan tidak ada setup klien exchange.")
+    parser.add_argument("--modules", default=",".join(OFFLINE_MODULES), help="Daftar modul dipisah koma")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="Batas waktu impor per modul (detik)")
+    args = parser.parse_args()
+    sys.exit(0 if check_import_budget([m.strip() for m in args.modules.split(",") if m.strip()], args.budget) else 1)
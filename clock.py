@@ -0,0 +1,76 @@
+# clock.py — Sumber waktu yang bisa diganti: jam nyata (live) atau jam virtual (replay)
+import threading
+import time as _time
+from typing import Optional
+
+import pandas as pd
+
+
+class ReplayFinished(Exception):
+    """Jam virtual sudah melewati akhir data rekaman."""
+
+
+class RealClock:
+    """Jam dinding biasa; dipakai saat trading live."""
+
+    def time(self) -> float:
+        return _time.time()
+
+    def sleep(self, seconds: float):
+        _time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Jam untuk replay: waktu hanya maju lewat sleep(), sehingga hasil replay
+    deterministik berapa pun kecepatan mesinnya.
+    - speed=None: sleep() langsung memajukan waktu tanpa menunggu (secepat mungkin).
+    - speed=N: sleep() tetap menunggu seconds / N detik nyata (mis. untuk ditonton di dashboard).
+    Jika `end` diberikan, sleep() yang melewati `end` melempar ReplayFinished.
+    """
+
+    def __init__(self, start: float, end: Optional[float] = None, speed: Optional[float] = None):
+        self._now = float(start)
+        self.end = end
+        self.speed = speed
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if self.speed:
+            _time.sleep(seconds / self.speed)
+        with self._lock:
+            self._now += seconds
+            finished = self.end is not None and self._now > self.end
+        if finished:
+            raise ReplayFinished(f"Replay selesai pada {pd.Timestamp.fromtimestamp(self.end)}")
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(new_clock: Optional[object]):
+    """Mengganti sumber waktu global; None = kembali ke jam nyata."""
+    global _clock
+    _clock = new_clock if new_clock is not None else RealClock()
+
+
+def time() -> float:
+    """Detik epoch menurut jam aktif (pengganti time.time())."""
+    return _clock.time()
+
+
+def sleep(seconds: float):
+    """Pengganti time.sleep() yang menghormati jam virtual."""
+    _clock.sleep(seconds)
+
+
+def now() -> pd.Timestamp:
+    """Pengganti pd.Timestamp.now() (waktu lokal tanpa zona) menurut jam aktif."""
+    return pd.Timestamp.fromtimestamp(_clock.time())
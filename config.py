@@ -1,17 +1,20 @@
 #config.py
 import os
 import json
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
-from dotenv import load_dotenv
-from pybit.unified_trading import HTTP
+if TYPE_CHECKING:
+    from pybit.unified_trading import HTTP
 
-def load_settings(file_path: str = "settings.json") -> Dict[str, Any]:
+SETTINGS_FILE = "settings.json"
+
+def load_settings(file_path: str = SETTINGS_FILE) -> Dict[str, Any]:
     """Memuat, memvalidasi, dan mengembalikan pengaturan dari file JSON."""
     print(f"⚙️ Memuat pengaturan dari {file_path}...")
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File pengaturan '{file_path}' tidak ditemukan.")
-    
+
     try:
         with open(file_path, "r") as f:
             settings = json.load(f)
@@ -20,8 +23,21 @@ def load_settings(file_path: str = "settings.json") -> Dict[str, Any]:
     except json.JSONDecodeError:
         raise ValueError(f"File '{file_path}' tidak dalam format JSON yang valid.")
 
-def initialize_bybit_client(api_keys: Dict[str, str]) -> HTTP:
+def load_api_keys() -> Dict[str, str]:
+    """Membaca API key Bybit dari environment / file .env."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_keys = {
+        "bybit_key": os.getenv("BYBIT_API_KEY"),
+        "bybit_secret": os.getenv("BYBIT_API_SECRET"),
+    }
+    if not all(api_keys.values()):
+        raise ValueError("Pastikan BYBIT_API_KEY dan BYBIT_API_SECRET ada di file .env")
+    return api_keys
+
+def initialize_bybit_client(api_keys: Dict[str, str]) -> "HTTP":
     """Menginisialisasi dan mengembalikan klien API untuk Bybit."""
+    from pybit.unified_trading import HTTP
     print("🔧 Mengkonfigurasi koneksi Bybit...")
     try:
         bybit_client = HTTP(
@@ -34,16 +50,47 @@ def initialize_bybit_client(api_keys: Dict[str, str]) -> HTTP:
     except Exception as e:
         raise ConnectionError(f"Gagal menginisialisasi klien Bybit: {e}")
 
-# --- EKSEKUSI UTAMA ---
-load_dotenv()
+# --- Provider Lazy ---
+# Pengaturan dan klien Bybit baru dibuat saat pertama kali dipakai, sehingga modul
+# seperti backtester dan strategy bisa diimpor tanpa kredensial maupun pybit.
+_settings: Optional[Dict[str, Any]] = None
+_bybit_session: Optional["HTTP"] = None
+_lock = threading.Lock()
+
+def get_settings() -> Dict[str, Any]:
+    """Pengaturan dari settings.json, dimuat sekali saat pertama kali dibutuhkan."""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _settings = load_settings()
+    return _settings
+
+def set_settings(settings: Optional[Dict[str, Any]]):
+    """Menyuntikkan pengaturan (mis. untuk pengujian); None = muat ulang dari file saat dipakai."""
+    global _settings
+    with _lock:
+        _settings = settings
 
-API_KEYS = {
-    "bybit_key": os.getenv("BYBIT_API_KEY"),
-    "bybit_secret": os.getenv("BYBIT_API_SECRET"),
-}
+def get_bybit_session() -> "HTTP":
+    """Klien HTTP Bybit, dibuat (dan kredensial dicek) saat request pertama."""
+    global _bybit_session
+    if _bybit_session is None:
+        with _lock:
+            if _bybit_session is None:
+                _bybit_session = initialize_bybit_client(load_api_keys())
+    return _bybit_session
 
-if not all(API_KEYS.values()):
-    raise ValueError("Pastikan BYBIT_API_KEY dan BYBIT_API_SECRET ada di file .env")
+def set_bybit_session(session: Optional[Any]):
+    """Menyuntikkan klien Bybit (mis. sesi tiruan atau rekaman); None = buat ulang saat dipakai."""
+    global _bybit_session
+    with _lock:
+        _bybit_session = session
 
-SETTINGS = load_settings()
-bybit_session = initialize_bybit_client(API_KEYS)
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Kompatibilitas untuk `from config import SETTINGS` / `bybit_session` lama
+    if name == "SETTINGS":
+        return get_settings()
+    if name == "bybit_session":
+        return get_bybit_session()
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
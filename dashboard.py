@@ -2,30 +2,40 @@
 import streamlit as st
 import pandas as pd
 import json
-import time
 import os
 from typing import Dict, Any, Tuple, List
 
-# Impor fungsi yang relevan
-from api_clients import get_latest_price
+# Impor fungsi yang relevan (dashboard tidak melakukan request ke exchange sama sekali)
+from state_feed import FEED_SOCKET, StateFeedSubscriber
+from trade_log import TradeLogTail
 
 # --- Konstanta & Konfigurasi ---
 STATUS_FILE = "status.json"
 POSITIONS_FILE = "positions.csv"
 LOG_FILE = "trade_log.csv"
 REFRESH_INTERVAL_SECONDS = 5
+TRADES_PAGE_SIZE = 50
 
 st.set_page_config(page_title="Dashboard Agent Trading", page_icon="🤖", layout="wide")
 
+@st.cache_resource
+def get_state_feed() -> StateFeedSubscriber:
+    """Satu subscriber feed agent per server; tersambung ulang otomatis jika agent restart."""
+    return StateFeedSubscriber(FEED_SOCKET).start()
+
+@st.cache_resource
+def get_trade_log_tail() -> TradeLogTail:
+    """Satu pembaca log per sesi server; offset dan agregat bertahan antar-refresh."""
+    return TradeLogTail(LOG_FILE)
+
 @st.cache_data(ttl=REFRESH_INTERVAL_SECONDS)
-def load_data_from_local_files() -> Tuple[float, Dict[str, Any], pd.DataFrame]:
+def load_data_from_local_files() -> Tuple[float, Dict[str, Any]]:
     """
-    Memuat semua data dari file CSV dan JSON lokal.
+    Memuat saldo dan posisi dari file JSON dan CSV lokal.
     Menggunakan cache Streamlit untuk efisiensi.
     """
     margin_balance = 0.0
     open_positions = {}
-    log_df = pd.DataFrame()
 
     # Muat saldo
     if os.path.exists(STATUS_FILE):
@@ -45,31 +55,24 @@ def load_data_from_local_files() -> Tuple[float, Dict[str, Any], pd.DataFrame]:
             pass
         except Exception as e:
             st.warning(f"Gagal memuat {POSITIONS_FILE}: {e}")
-    
-    # Muat log
-    if os.path.exists(LOG_FILE):
-        try:
-            log_df = pd.read_csv(LOG_FILE)
-        except pd.errors.EmptyDataError:
-            pass
-        except Exception as e:
-            st.warning(f"Gagal memuat {LOG_FILE}: {e}")
             
-    return margin_balance, open_positions, log_df
+    return margin_balance, open_positions
 
-def calculate_metrics(margin_balance: float, open_positions: Dict[str, Any], log_df: pd.DataFrame) -> Tuple[Dict[str, Any], pd.DataFrame]:
+def calculate_metrics(margin_balance: float, open_positions: Dict[str, Any], trade_log: TradeLogTail,
+                      prices: Dict[str, float]) -> Tuple[Dict[str, Any], pd.DataFrame]:
     """Menghitung semua metrik KPI dan menyiapkan DataFrame posisi untuk ditampilkan."""
-    # 1. Hitung PnL Terealisasi
-    realized_pnl = 0.0
-    if not log_df.empty and 'pnl' in log_df.columns:
-        log_df['pnl'] = pd.to_numeric(log_df['pnl'], errors='coerce').fillna(0)
-        realized_pnl = log_df[log_df['action'] == 'CLOSE']['pnl'].sum()
+    # 1. PnL Terealisasi diambil dari agregat berjalan (hanya baris baru yang diproses)
+    try:
+        trade_log.refresh()
+    except Exception as e:
+        st.warning(f"Gagal memuat {LOG_FILE}: {e}")
+    realized_pnl = trade_log.realized_pnl
 
     # 2. Hitung PnL Tidak Terealisasi dan siapkan data posisi
     total_unrealized_pnl = 0.0
     positions_list = []
     for symbol, pos_data in open_positions.items():
-        current_price = get_latest_price(symbol)
+        current_price = prices.get(symbol)
         display_data = pos_data.copy()
         
         if current_price:
@@ -89,12 +92,14 @@ def calculate_metrics(margin_balance: float, open_positions: Dict[str, Any], log
         "margin_balance": margin_balance,
         "realized_pnl": realized_pnl,
         "num_open_positions": len(open_positions),
-        "total_unrealized_pnl": total_unrealized_pnl
+        "total_unrealized_pnl": total_unrealized_pnl,
+        "closed_trades": trade_log.closed_trades,
+        "win_rate": trade_log.win_rate,
     }
     
     return metrics, positions_df
 
-def display_dashboard(metrics: Dict[str, Any], positions_df: pd.DataFrame, log_df: pd.DataFrame):
+def display_dashboard(metrics: Dict[str, Any], positions_df: pd.DataFrame, trade_log: TradeLogTail, page: int):
     """Menampilkan semua elemen UI Streamlit."""
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Saldo Margin Saat Ini", f"${metrics['margin_balance']:,.2f}")
@@ -118,27 +123,45 @@ def display_dashboard(metrics: Dict[str, Any], positions_df: pd.DataFrame, log_d
         st.dataframe(positions_df[display_cols], use_container_width=True)
 
     st.subheader("Log Riwayat Trading")
-    if log_df.empty:
+    if not trade_log.total_rows:
         st.info("Log trading masih kosong.")
     else:
-        # Urutkan berdasarkan timestamp untuk tampilan yang benar
-        log_df['timestamp'] = pd.to_datetime(log_df['timestamp'])
-        st.dataframe(log_df.sort_values(by='timestamp', ascending=False), use_container_width=True)
+        st.caption(f"{metrics['closed_trades']} trade ditutup | Win rate {metrics['win_rate']:.1f}% | "
+                   f"Halaman {page + 1} dari {trade_log.page_count(TRADES_PAGE_SIZE)} (terbaru di atas)")
+        st.dataframe(trade_log.page(page, TRADES_PAGE_SIZE), use_container_width=True)
+
+        col_symbol, col_day = st.columns(2)
+        col_symbol.markdown("**Rekap per Simbol**")
+        col_symbol.dataframe(trade_log.rollup_frame("symbol"), use_container_width=True)
+        col_day.markdown("**Rekap per Hari**")
+        col_day.dataframe(trade_log.rollup_frame("day"), use_container_width=True)
         
-    st.caption(f"Dashboard diperbarui setiap {REFRESH_INTERVAL_SECONDS} detik.")
+    st.caption(metrics['source'])
 
 def main():
     """Fungsi utama untuk menjalankan loop dashboard."""
     st.title("🤖 Live Dashboard Agent Trading (Lokal)")
+    trade_log = get_trade_log_tail()
+    feed = get_state_feed()
+    # Widget dibuat sekali di luar loop; mengubahnya membuat Streamlit menjalankan ulang skrip
+    page = st.number_input("Halaman log trading", min_value=1, value=1, step=1) - 1
     placeholder = st.empty()
 
     while True:
         with placeholder.container():
-            margin_balance, open_positions, log_df = load_data_from_local_files()
-            metrics, positions_df = calculate_metrics(margin_balance, open_positions, log_df)
-            display_dashboard(metrics, positions_df, log_df)
-        
-        time.sleep(REFRESH_INTERVAL_SECONDS)
+            if feed.has_state:
+                margin_balance, open_positions, prices = feed.snapshot()
+                source = "🟢 Tersambung ke feed agent, diperbarui saat state berubah."
+            else:
+                # Agent tidak berjalan / feed mati: pakai file state terakhir, tanpa harga live
+                margin_balance, open_positions = load_data_from_local_files()
+                prices = {}
+                source = f"🟡 Feed agent tidak tersambung, membaca file setiap {REFRESH_INTERVAL_SECONDS} detik."
+            metrics, positions_df = calculate_metrics(margin_balance, open_positions, trade_log, prices)
+            metrics['source'] = source
+            display_dashboard(metrics, positions_df, trade_log, page)
+
+        feed.wait_for_update(REFRESH_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,79 +1,249 @@
 # evaluate_performance.py
-import pandas as pd
+import argparse
 import os
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
 
 LOG_FILE = "trade_log.csv"
+CHUNK_SIZE = 100_000          # baris CSV per chunk
+BOOTSTRAP_RESAMPLES = 20_000  # jumlah resample Monte Carlo
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_BATCH_ELEMENTS = 4_000_000  # batas elemen matriks resample per batch (memori)
+TIME_COLUMNS = ('timestamp', 'exit_time')  # log live / output backtester
 
-def evaluate_trading_performance():
-    if not os.path.exists(LOG_FILE):
-        print(f"❌ File {LOG_FILE} tidak ditemukan.")
-        return
 
-    try:
-        df = pd.read_csv(LOG_FILE)
-    except Exception as e:
-        print(f"❌ Gagal membaca {LOG_FILE}: {e}")
-        return
+def read_trades(path: str, chunksize: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Membaca file trade per chunk dan hanya mengembalikan trade yang sudah ditutup
+    dengan PnL valid. Mendukung trade_log.csv live (baris OPEN/CLOSE, kolom action)
+    maupun CSV trade backtester (satu baris per trade, tanpa kolom action).
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if 'pnl' not in chunk.columns:
+            raise ValueError("Kolom 'pnl' tidak ditemukan di log.")
+        if 'action' in chunk.columns:
+            chunk = chunk[chunk['action'] == 'CLOSE']
+        chunk = chunk.assign(pnl=pd.to_numeric(chunk['pnl'], errors='coerce')).dropna(subset=['pnl'])
+        if not chunk.empty:
+            yield chunk
 
-    if df.empty:
-        print("ℹ️ Tidak ada data trading untuk dievaluasi.")
-        return
 
-    # Pastikan kolom 'pnl' ada dan numerik
-    if 'pnl' not in df.columns:
-        print("❌ Kolom 'pnl' tidak ditemukan di log.")
-        return
+class StreamingStats:
+    """
+    Metrik kinerja yang dihitung dalam satu lintasan atas chunk trade berurutan:
+    jumlah/menang, PnL, profit factor, rata-rata, ekstrem, max drawdown kurva
+    PnL kumulatif, Sharpe/Sortino per trade, dan rekap per simbol. Memori tetap
+    kecil: selain agregat, hanya array PnL (float64) yang disimpan untuk bootstrap.
+    """
 
-    df['pnl'] = pd.to_numeric(df['pnl'], errors='coerce')
-    df = df.dropna(subset=['pnl'])
+    def __init__(self):
+        self.trades = 0
+        self.wins = 0
+        self.total_pnl = 0.0
+        self.sum_sq = 0.0
+        self.downside_sq = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.max_win = -np.inf
+        self.max_loss = np.inf
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.first_time: Optional[str] = None
+        self.last_time: Optional[str] = None
+        self.by_symbol: Dict[str, Dict[str, float]] = {}
+        self._pnl_chunks: List[np.ndarray] = []
 
-    if df.empty:
-        print("ℹ️ Tidak ada data PnL yang valid.")
-        return
+    def update(self, chunk: pd.DataFrame):
+        pnl = chunk['pnl'].to_numpy(dtype=float)
+        if not len(pnl):
+            return
+        wins = pnl > 0
+        self.trades += len(pnl)
+        self.wins += int(wins.sum())
+        self.sum_sq += float(np.dot(pnl, pnl))
+        downside = np.minimum(pnl, 0.0)
+        self.downside_sq += float(np.dot(downside, downside))
+        self.gross_profit += float(pnl[wins].sum())
+        self.gross_loss += float(-pnl[~wins].sum())
+        self.max_win = max(self.max_win, float(pnl.max()))
+        self.max_loss = min(self.max_loss, float(pnl.min()))
+
+        # Drawdown kurva PnL kumulatif, dilanjutkan dari ekuitas & puncak chunk sebelumnya
+        equity = self.total_pnl + np.cumsum(pnl)
+        peak = np.maximum.accumulate(np.maximum(equity, self.peak))
+        self.max_drawdown = max(self.max_drawdown, float((peak - equity).max()))
+        self.peak = float(peak[-1])
+        self.total_pnl = float(equity[-1])
+
+        time_column = next((col for col in TIME_COLUMNS if col in chunk.columns), None)
+        if time_column:
+            self.first_time = self.first_time or str(chunk[time_column].iloc[0])
+            self.last_time = str(chunk[time_column].iloc[-1])
+        if 'symbol' in chunk.columns:
+            grouped = pd.DataFrame({'symbol': chunk['symbol'].astype(str).to_numpy(), 'pnl': pnl, 'win': wins})
+            for symbol, row in grouped.groupby('symbol').agg(
+                    trades=('pnl', 'size'), wins=('win', 'sum'), pnl=('pnl', 'sum')).iterrows():
+                stats = self.by_symbol.setdefault(symbol, {"trades": 0, "wins": 0, "pnl": 0.0})
+                stats['trades'] += int(row['trades'])
+                stats['wins'] += int(row['wins'])
+                stats['pnl'] += float(row['pnl'])
+        self._pnl_chunks.append(pnl)
+
+    # --- Metrik turunan ---
+    @property
+    def pnl(self) -> np.ndarray:
+        if len(self._pnl_chunks) > 1:
+            self._pnl_chunks = [np.concatenate(self._pnl_chunks)]
+        return self._pnl_chunks[0] if self._pnl_chunks else np.empty(0)
+
+    @property
+    def losses(self) -> int:
+        return self.trades - self.wins
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.trades if self.trades else 0.0
+
+    @property
+    def avg_pnl(self) -> float:
+        return self.total_pnl / self.trades if self.trades else 0.0
+
+    @property
+    def avg_win(self) -> float:
+        return self.gross_profit / self.wins if self.wins else 0.0
+
+    @property
+    def avg_loss(self) -> float:
+        return -self.gross_loss / self.losses if self.losses else 0.0
 
-    total_trades = len(df)
-    winning_trades = df[df['pnl'] > 0]
-    losing_trades = df[df['pnl'] <= 0]
+    @property
+    def profit_factor(self) -> float:
+        return self.gross_profit / (self.gross_loss or 0.001)  # hindari div by zero
 
-    win_rate = len(winning_trades) / total_trades if total_trades > 0 else 0
-    total_pnl = df['pnl'].sum()
-    avg_pnl = df['pnl'].mean()
-    avg_win = winning_trades['pnl'].mean() if not winning_trades.empty else 0
-    avg_loss = losing_trades['pnl'].mean() if not losing_trades.empty else 0
-    max_win = df['pnl'].max()
-    max_loss = df['pnl'].min()
+    @property
+    def std_pnl(self) -> float:
+        if self.trades < 2:
+            return 0.0
+        variance = (self.sum_sq - self.trades * self.avg_pnl ** 2) / (self.trades - 1)
+        return float(np.sqrt(max(variance, 0.0)))
 
-    # Hitung Profit Factor (opsional tapi penting)
-    gross_profit = winning_trades['pnl'].sum() if not winning_trades.empty else 0
-    gross_loss = abs(losing_trades['pnl'].sum()) if not losing_trades.empty else 0.001  # hindari div by zero
-    profit_factor = gross_profit / gross_loss
+    @property
+    def sharpe(self) -> float:
+        """Sharpe per trade (rata-rata PnL / simpangan baku PnL, tanpa annualisasi)."""
+        std = self.std_pnl
+        return self.avg_pnl / std if std else 0.0
+
+    @property
+    def sortino(self) -> float:
+        """Sortino per trade (rata-rata PnL / downside deviation terhadap 0)."""
+        downside = np.sqrt(self.downside_sq / self.trades) if self.trades else 0.0
+        return self.avg_pnl / downside if downside else 0.0
+
+    def symbol_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame.from_dict(self.by_symbol, orient='index', columns=['trades', 'wins', 'pnl'])
+        df.index.name = 'symbol'
+        df['win_rate'] = df['wins'] / df['trades'] if len(df) else []
+        return df.sort_values('pnl', ascending=False)
+
+
+def bootstrap_pnl(pnl: np.ndarray, n_resamples: int = BOOTSTRAP_RESAMPLES,
+                  confidence: float = BOOTSTRAP_CONFIDENCE, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bootstrap Monte Carlo atas PnL per trade: setiap resample menarik n trade dengan
+    pengembalian, lalu total PnL dan max drawdown kurva kumulatifnya dihitung secara
+    vektor (satu matriks resample x trade per batch). Mengembalikan interval
+    kepercayaan persentil dan peluang total PnL negatif.
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    n = len(pnl)
+    rng = np.random.default_rng(seed)
+    totals = np.empty(n_resamples)
+    drawdowns = np.empty(n_resamples)
+    batch = max(1, BOOTSTRAP_BATCH_ELEMENTS // max(n, 1))
+    for lo in range(0, n_resamples, batch):
+        hi = min(lo + batch, n_resamples)
+        equity = np.cumsum(pnl[rng.integers(0, n, size=(hi - lo, n))], axis=1)
+        peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+        totals[lo:hi] = equity[:, -1]
+        drawdowns[lo:hi] = (peak - equity).max(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    return {
+        "resamples": n_resamples,
+        "confidence": confidence,
+        "total_pnl": tuple(float(v) for v in np.percentile(totals, [tail, 50, 100 - tail])),
+        "max_drawdown": tuple(float(v) for v in np.percentile(drawdowns, [tail, 50, 100 - tail])),
+        "prob_loss": float((totals < 0).mean()),
+    }
+
+
+def evaluate_trading_performance(path: str = LOG_FILE, chunksize: int = CHUNK_SIZE,
+                                 n_resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = BOOTSTRAP_CONFIDENCE,
+                                 seed: Optional[int] = None) -> Optional[StreamingStats]:
+    if not os.path.exists(path):
+        print(f"❌ File {path} tidak ditemukan.")
+        return None
+
+    stats = StreamingStats()
+    try:
+        for chunk in read_trades(path, chunksize):
+            stats.update(chunk)
+    except pd.errors.EmptyDataError:
+        pass
+    except Exception as e:
+        print(f"❌ Gagal membaca {path}: {e}")
+        return None
+
+    if not stats.trades:
+        print("ℹ️ Tidak ada data PnL yang valid.")
+        return None
 
     # Tampilkan hasil
     print("=" * 60)
-    print("📊 EVALUASI KINERJA TRADING (DRY RUN)")
+    print(f"📊 EVALUASI KINERJA TRADING ({os.path.basename(path)})")
     print("=" * 60)
-    print(f"📈 Total Trade          : {total_trades}")
-    print(f"✅ Win Rate             : {win_rate:.2%}")
-    print(f"💰 Total PnL            : ${total_pnl:.4f}")
-    print(f"📊 Rata-rata PnL        : ${avg_pnl:.4f}")
-    print(f"🟢 Rata-rata Profit     : ${avg_win:.4f}")
-    print(f"🔴 Rata-rata Rugi       : ${avg_loss:.4f}")
-    print(f"🔝 Max Profit           : ${max_win:.4f}")
-    print(f"🔻 Max Rugi             : ${max_loss:.4f}")
-    print(f"⚙️ Profit Factor        : {profit_factor:.2f}")
+    if stats.first_time:
+        print(f"🗓️ Periode              : {stats.first_time} -> {stats.last_time}")
+    print(f"📈 Total Trade          : {stats.trades}")
+    print(f"✅ Win Rate             : {stats.win_rate:.2%}")
+    print(f"💰 Total PnL            : ${stats.total_pnl:.4f}")
+    print(f"📊 Rata-rata PnL        : ${stats.avg_pnl:.4f}")
+    print(f"🟢 Rata-rata Profit     : ${stats.avg_win:.4f}")
+    print(f"🔴 Rata-rata Rugi       : ${stats.avg_loss:.4f}")
+    print(f"🔝 Max Profit           : ${stats.max_win:.4f}")
+    print(f"🔻 Max Rugi             : ${stats.max_loss:.4f}")
+    print(f"⚙️ Profit Factor        : {stats.profit_factor:.2f}")
+    print(f"📉 Max Drawdown         : ${stats.max_drawdown:.4f}")
+    print(f"📐 Sharpe / Sortino     : {stats.sharpe:.3f} / {stats.sortino:.3f} (per trade)")
     print("-" * 60)
 
+    if stats.by_symbol:
+        print("🪙 PER SIMBOL")
+        for symbol, row in stats.symbol_frame().iterrows():
+            print(f"   {symbol:<16} {int(row['trades']):>6} trade | Win {row['win_rate']:>7.2%} | PnL ${row['pnl']:.4f}")
+        print("-" * 60)
+
+    if n_resamples and stats.trades > 1:
+        result = bootstrap_pnl(stats.pnl, n_resamples, confidence, seed)
+        lo, mid, hi = result['total_pnl']
+        dd_lo, dd_mid, dd_hi = result['max_drawdown']
+        print(f"🎲 BOOTSTRAP ({n_resamples:,} resample, interval {confidence:.0%})")
+        print(f"   Total PnL            : ${lo:.4f} .. ${hi:.4f} (median ${mid:.4f})")
+        print(f"   Max Drawdown         : ${dd_lo:.4f} .. ${dd_hi:.4f} (median ${dd_mid:.4f})")
+        print(f"   Peluang Total Rugi   : {result['prob_loss']:.2%}")
+        print("-" * 60)
+
     # Rekomendasi berdasarkan data
-    if win_rate < 0.45:
+    if stats.win_rate < 0.45:
         print("⚠️  REKOMENDASI: Win rate terlalu rendah (<45%).")
         print("   → Strategi saat ini TIDAK LAYAK untuk live trading.")
         print("   → Saran: Ganti ke strategi berbasis tren + volume (lihat versi baru strategy.py).")
-    elif avg_pnl < 0:
+    elif stats.avg_pnl < 0:
         print("⚠️  REKOMENDASI: Rata-rata PnL negatif.")
         print("   → Meski win rate tinggi, rugi per trade terlalu besar.")
         print("   → Perbesar rasio TP:SL (minimal 3:1).")
-    elif profit_factor < 1.2:
+    elif stats.profit_factor < 1.2:
         print("⚠️  REKOMENDASI: Profit Factor < 1.2 → sistem belum stabil.")
         print("   → Kumpulkan lebih banyak data (>50 trade) sebelum keputusan akhir.")
     else:
@@ -81,6 +251,15 @@ def evaluate_trading_performance():
         print("   → Pertimbangkan uji coba lebih lama atau live trading kecil-kecilan.")
 
     print("=" * 60)
+    return stats
 
 if __name__ == "__main__":
-    evaluate_trading_performance()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluasi kinerja trading dari log live atau CSV trade backtester.")
+    parser.add_argument("--file", default=LOG_FILE, help="File trade (trade_log.csv atau backtest_trades.csv)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Baris CSV per chunk")
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP_RESAMPLES,
+                        help="Jumlah resample bootstrap (0 = nonaktif)")
+    parser.add_argument("--confidence", type=float, default=BOOTSTRAP_CONFIDENCE, help="Tingkat interval kepercayaan")
+    parser.add_argument("--seed", type=int, default=None, help="Seed RNG bootstrap")
+    args = parser.parse_args()
+    evaluate_trading_performance(args.file, args.chunksize, args.bootstrap, args.confidence, args.seed)
@@ -0,0 +1,215 @@
+# history_downloader.py — Pengunduh data historis konkuren yang bisa dilanjutkan
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from api_clients import interval_to_ms
+from async_api_clients import AsyncBybitClient
+from config import get_settings
+from market_store import COLUMNS, MarketDataStore
+
+PAGE_LIMIT = 1000         # bar maksimum per request kline Bybit
+SHARD_PAGES = 20          # jumlah halaman per shard waktu
+STAGING_DIR = "_staging"  # di dalam root market store
+MANIFEST_FILE = "download.json"
+
+
+class HistoryDownload:
+    """
+    Unduhan satu simbol/interval yang dipecah menjadi shard waktu berukuran tetap.
+    - Setiap shard diunduh halaman demi halaman (start dan end diisi, sehingga
+      urutan respons Bybit yang terbaru-di-depan tidak berpengaruh) dan setiap
+      halaman langsung ditulis ke store staging milik shard tersebut.
+    - Shard yang selesai digabung ke market store utama secara berurutan, lalu
+      staging-nya dihapus.
+    - Rencana shard dan statusnya dicatat di manifest, dan progres di dalam shard
+      tercatat di meta staging, sehingga unduhan yang terputus dilanjutkan dari bar
+      terakhir yang sudah tersimpan.
+    Store hanya bisa diperpanjang ke depan: rentang dimulai setelah bar terakhir yang
+    sudah ada di store utama.
+    """
+
+    def __init__(self, store: MarketDataStore, symbol: str, interval: str, start_ms: int, end_ms: int,
+                 shard_pages: int = SHARD_PAGES):
+        self.store = store
+        self.symbol = symbol
+        self.interval = interval
+        self.step = interval_to_ms(interval)
+        self.directory = os.path.join(store.root, STAGING_DIR, symbol, f"{interval}m")
+        self.staging = MarketDataStore(self.directory)
+        self.added = 0
+        self._merge_lock = asyncio.Lock()
+        self.manifest = self._load_manifest() or {"symbol": symbol, "interval": interval,
+                                                  "shards": [], "done": [], "merged": 0}
+        self._plan(start_ms, end_ms, shard_pages * PAGE_LIMIT * self.step)
+
+    # --- Manifest ---
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def _load_manifest(self) -> Optional[Dict]:
+        if not os.path.exists(self._manifest_path):
+            return None
+        with open(self._manifest_path, "r") as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path)
+
+    def _plan(self, start_ms: int, end_ms: int, shard_span: int):
+        """Menambahkan shard [start, end] (inklusif, selaras interval) yang belum direncanakan."""
+        shards = self.manifest['shards']
+        last_ts = self.store.last_timestamp(self.symbol, self.interval)
+        if shards:
+            start_ms = shards[-1][1] + 1
+        elif last_ts is not None:
+            start_ms = max(start_ms, last_ts + self.step)
+        start_ms = -(-start_ms // self.step) * self.step
+        end_ms = end_ms // self.step * self.step
+        if start_ms > end_ms:
+            return
+        for shard_start in range(start_ms, end_ms + 1, shard_span):
+            shards.append([shard_start, min(shard_start + shard_span - 1, end_ms)])
+            self.manifest['done'].append(False)
+        self._save_manifest()
+
+    @property
+    def pending(self) -> List[int]:
+        return [i for i, done in enumerate(self.manifest['done']) if not done]
+
+    @property
+    def complete(self) -> bool:
+        return self.manifest['merged'] == len(self.manifest['shards'])
+
+    # --- Unduhan ---
+    def _shard_name(self, index: int) -> str:
+        return f"shard{index:05d}"
+
+    async def fetch_shard(self, client: AsyncBybitClient, index: int) -> bool:
+        """Mengunduh satu shard mulai dari bar terakhir di staging-nya. False jika gagal."""
+        shard_start, shard_end = self.manifest['shards'][index]
+        name = self._shard_name(index)
+        last_ts = self.staging.last_timestamp(name, self.interval)
+        cursor = shard_start if last_ts is None else last_ts + self.step
+        while cursor <= shard_end:
+            page_end = min(cursor + PAGE_LIMIT * self.step - 1, shard_end)
+            bars = await client.get_kline_page(self.symbol, self.interval, cursor, page_end, PAGE_LIMIT)
+            if bars is None:
+                print(f"⚠️ {self.symbol} {self.interval}m: shard {index + 1} berhenti di "
+                      f"{pd.to_datetime(cursor, unit='ms')}")
+                return False
+            bars = bars[(bars[:, 0] >= cursor) & (bars[:, 0] <= page_end)]
+            if len(bars):
+                await asyncio.to_thread(self.staging.append, name, self.interval, bars)
+            cursor = page_end + 1
+        self.manifest['done'][index] = True
+        await self.merge_ready()
+        return True
+
+    async def merge_ready(self):
+        """Menggabungkan shard selesai yang berurutan ke store utama."""
+        async with self._merge_lock:
+            await asyncio.to_thread(self._merge_ready)
+
+    def _merge_ready(self):
+        shards, done = self.manifest['shards'], self.manifest['done']
+        while self.manifest['merged'] < len(shards) and done[self.manifest['merged']]:
+            index = self.manifest['merged']
+            name = self._shard_name(index)
+            columns = self.staging.load(name, self.interval)
+            if len(columns['timestamp']):
+                bars = np.column_stack([columns[col] for col in COLUMNS]).astype(np.float64)
+                self.added += self.store.append(self.symbol, self.interval, bars)
+            del columns
+            # Append ke store utama idempoten, jadi crash di antara langkah ini aman
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            self.manifest['merged'] = index + 1
+        self._save_manifest()
+        if self.complete:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            try:
+                os.removedirs(os.path.dirname(self.directory))  # folder staging yang sudah kosong
+            except OSError:
+                pass
+
+
+async def download_history(symbols: List[str], interval: str, start_ms: int, end_ms: Optional[int] = None,
+                           store: Optional[MarketDataStore] = None,
+                           client: Optional[AsyncBybitClient] = None,
+                           shard_pages: int = SHARD_PAGES) -> Dict[str, int]:
+    """
+    Mengunduh k-line banyak simbol sekaligus ke market store. Semua shard dari semua
+    simbol berjalan bersamaan di bawah rate limiter klien yang sama. Tanpa end_ms,
+    unduhan berhenti di bar terakhir yang sudah tertutup.
+    Mengembalikan jumlah bar baru per simbol.
+    """
+    store = store or MarketDataStore()
+    if end_ms is None:
+        end_ms = int(time.time() * 1000) // interval_to_ms(interval) * interval_to_ms(interval) - 1
+    if client is None:
+        client = AsyncBybitClient.from_settings(get_settings().get('engine', {}))
+
+    downloads = [HistoryDownload(store, symbol, interval, start_ms, end_ms, shard_pages) for symbol in symbols]
+    jobs = [(download, index) for download in downloads for index in download.pending]
+    print(f"📥 Mengunduh {len(symbols)} simbol {interval}m dalam {len(jobs)} shard...")
+    started = time.time()
+
+    async with client:
+        # Batasi shard aktif agar tidak terlalu banyak file staging terbuka sekaligus
+        semaphore = asyncio.Semaphore(client.max_concurrency)
+
+        async def run(download: HistoryDownload, index: int) -> bool:
+            async with semaphore:
+                return await download.fetch_shard(client, index)
+
+        for download in downloads:
+            await download.merge_ready()  # shard yang selesai tapi belum digabung (run sebelumnya)
+        results = await asyncio.gather(*(run(download, index) for download, index in jobs))
+
+    failed = results.count(False)
+    for download in downloads:
+        status = "✅" if download.complete else "⚠️"
+        print(f"{status} {download.symbol} {interval}m: {download.added} bar baru, "
+              f"total {store.rows(download.symbol, interval)} bar")
+    print(f"⏱️ Unduhan selesai dalam {time.time() - started:.2f} detik.")
+    if failed:
+        print(f"⚠️ {failed} shard gagal. Jalankan ulang perintah yang sama untuk melanjutkan.")
+    return {download.symbol: download.added for download in downloads}
+
+
+def download_history_sync(symbols: List[str], interval: str, start_ms: int, end_ms: Optional[int] = None,
+                          **kwargs) -> Dict[str, int]:
+    """Padanan sinkron download_history untuk pemanggil non-asyncio (mis. backtester)."""
+    return asyncio.run(download_history(symbols, interval, start_ms, end_ms, **kwargs))
+
+
+def _date_to_ms(text: str) -> int:
+    return int(pd.Timestamp(text).timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unduh data k-line historis Bybit ke market store.")
+    parser.add_argument("--symbols", required=True, help="Daftar simbol dipisah koma")
+    parser.add_argument("--interval", default="1", help="Interval data (menit)")
+    parser.add_argument("--start", required=True, help="Tanggal mulai, mis. 2025-01-01")
+    parser.add_argument("--end", default=None, help="Tanggal akhir (default: bar tertutup terakhir)")
+    parser.add_argument("--shard-pages", type=int, default=SHARD_PAGES, help="Jumlah halaman per shard")
+    args = parser.parse_args()
+
+    download_history_sync([s.strip() for s in args.symbols.split(",") if s.strip()], args.interval,
+                          _date_to_ms(args.start), _date_to_ms(args.end) if args.end else None,
+                          shard_pages=args.shard_pages)
@@ -0,0 +1,294 @@
+# indicators.py — Indikator inkremental O(1) per bar, identik dengan TA-Lib
+import math
+from collections import deque
+from typing import Any, Iterable, List, Optional, Tuple
+
+NAN = float('nan')
+
+
+def _is_zero(value: float) -> bool:
+    # Padanan pengecekan nol RSI/ADX di TA-Lib 0.6+: hanya nol persis. Ambang lama (1e-8)
+    # membuat koin berharga sangat kecil selalu bernilai 0.
+    return value == 0.0
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    greatest = high - low
+    val2 = abs(prev_close - high)
+    if val2 > greatest:
+        greatest = val2
+    val3 = abs(prev_close - low)
+    if val3 > greatest:
+        greatest = val3
+    return greatest
+
+
+class Indicator:
+    """
+    Dasar semua indikator inkremental. update() menerima satu bar baru dan
+    mengembalikan nilai terkini (NaN selama periode pemanasan, sama seperti
+    posisi NaN di output TA-Lib).
+    """
+
+    value: float = NAN
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    @property
+    def output(self) -> Any:
+        """Nilai yang dicatat series() per bar; indikator dengan beberapa output menimpanya."""
+        return self.value
+
+    def update(self, *bar: float) -> float:
+        raise NotImplementedError
+
+    @classmethod
+    def seed(cls, *series: Iterable[float], **params) -> "Indicator":
+        """Membuat indikator dan memanaskannya dengan data historis (satu iterable per input)."""
+        indicator = cls(**params)
+        for bar in zip(*series):
+            indicator.update(*bar)
+        return indicator
+
+    @classmethod
+    def series(cls, *series: Iterable[float], **params) -> List[Any]:
+        """Output untuk setiap bar seluruh seri, setara output talib untuk array yang sama."""
+        indicator = cls(**params)
+        outputs = []
+        for bar in zip(*series):
+            indicator.update(*bar)
+            outputs.append(indicator.output)
+        return outputs
+
+
+class SMA(Indicator):
+    """Simple moving average (talib.SMA)."""
+
+    def __init__(self, period: int = 30):
+        self.period = period
+        self.value = NAN
+        self._window: deque = deque(maxlen=period)
+        self._total = 0.0
+
+    def update(self, x: float) -> float:
+        self._window.append(x)
+        self._total += x
+        if len(self._window) == self.period:
+            self.value = self._total / self.period
+            # Seperti TA-Lib: nilai tertua dikurangkan setelah output dihitung
+            self._total -= self._window[0]
+        return self.value
+
+
+class EMA(Indicator):
+    """Exponential moving average dengan seed SMA (talib.EMA)."""
+
+    def __init__(self, period: int = 30):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value = NAN
+        self._count = 0
+        self._seed_total = 0.0
+
+    def update(self, x: float) -> float:
+        if self._count < self.period:
+            self._count += 1
+            self._seed_total += x
+            if self._count == self.period:
+                self.value = self._seed_total / self.period
+            return self.value
+        self.value = ((x - self.value) * self.k) + self.value
+        return self.value
+
+
+class RSI(Indicator):
+    """Relative Strength Index dengan smoothing Wilder (talib.RSI)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = NAN
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def _output(self) -> float:
+        total = self._gain + self._loss
+        return 100.0 * (self._gain / total) if not _is_zero(total) else 0.0
+
+    def update(self, x: float) -> float:
+        if self._prev is None:
+            self._prev = x
+            return self.value
+        change = x - self._prev
+        self._prev = x
+        self._count += 1
+        if self._count <= self.period:
+            if change < 0:
+                self._loss -= change
+            else:
+                self._gain += change
+            if self._count == self.period:
+                self._loss /= self.period
+                self._gain /= self.period
+                self.value = self._output()
+            return self.value
+
+        self._loss *= (self.period - 1)
+        self._gain *= (self.period - 1)
+        if change < 0:
+            self._loss -= change
+        else:
+            self._gain += change
+        self._loss /= self.period
+        self._gain /= self.period
+        self.value = self._output()
+        return self.value
+
+
+class ATR(Indicator):
+    """Average True Range dengan smoothing Wilder (talib.ATR)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = NAN
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._tr_total = 0.0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self._prev_close is None:
+            self._prev_close = close
+            return self.value
+        tr = _true_range(high, low, self._prev_close)
+        self._prev_close = close
+        self._count += 1
+        if self._count <= self.period:
+            self._tr_total += tr
+            if self._count == self.period:
+                self.value = self._tr_total / self.period
+            return self.value
+        self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+
+class ADX(Indicator):
+    """Average Directional Index (talib.ADX), nilai pertama muncul pada bar ke-(2 * period)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = NAN
+        self.plus_di = NAN
+        self.minus_di = NAN
+        self._prev: Optional[Tuple[float, float, float]] = None
+        self._count = 0
+        self._plus_dm = 0.0
+        self._minus_dm = 0.0
+        self._tr = 0.0
+        self._dx_total = 0.0
+
+    def _dx(self) -> Optional[float]:
+        if _is_zero(self._tr):
+            return None
+        self.minus_di = 100.0 * (self._minus_dm / self._tr)
+        self.plus_di = 100.0 * (self._plus_dm / self._tr)
+        total = self.minus_di + self.plus_di
+        if _is_zero(total):
+            return None
+        return 100.0 * (abs(self.minus_di - self.plus_di) / total)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self._prev is None:
+            self._prev = (high, low, close)
+            return self.value
+        prev_high, prev_low, prev_close = self._prev
+        self._prev = (high, low, close)
+        diff_p = high - prev_high
+        diff_m = prev_low - low
+        tr = _true_range(high, low, prev_close)
+        self._count += 1
+        period = self.period
+
+        if self._count >= period:
+            # Smoothing Wilder setelah akumulasi awal period - 1 bar
+            self._minus_dm -= self._minus_dm / period
+            self._plus_dm -= self._plus_dm / period
+        if diff_m > 0 and diff_p < diff_m:
+            self._minus_dm += diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            self._plus_dm += diff_p
+        self._tr = self._tr - self._tr / period + tr if self._count >= period else self._tr + tr
+
+        if self._count < period:
+            return self.value
+        dx = self._dx()
+        if self._count < 2 * period - 1:
+            if dx is not None:
+                self._dx_total += dx
+            return self.value
+        if self._count == 2 * period - 1:
+            if dx is not None:
+                self._dx_total += dx
+            self.value = self._dx_total / period
+        elif dx is not None:
+            self.value = ((self.value * (period - 1)) + dx) / period
+        return self.value
+
+
+class BollingerBands(Indicator):
+    """Bollinger Bands berbasis SMA (talib.BBANDS); value = band tengah, output = (upper, middle, lower)."""
+
+    def __init__(self, period: int = 20, nbdevup: float = 2.0, nbdevdn: float = 2.0):
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.value = NAN
+        self.upper = NAN
+        self.lower = NAN
+        self._sma = SMA(period)
+        self._window: deque = deque(maxlen=period)
+        self._mean = 0.0
+        self._m2 = 0.0  # jumlah kuadrat simpangan terhadap rata-rata jendela (Welford)
+        self._since_anchor = 0
+
+    def update(self, x: float) -> float:
+        middle = self._sma.update(x)
+        if len(self._window) == self.period:
+            # Welford jendela geser: tambah x dan buang nilai tertua sekaligus, O(1) per bar.
+            # Bebas pembatalan sum-of-squares sehingga tetap akurat pada koin berharga sangat kecil.
+            oldest = self._window[0]
+            mean = self._mean + (x - oldest) / self.period
+            self._m2 += (x - oldest) * ((x - mean) + (oldest - self._mean))
+            self._mean = mean
+            self._since_anchor += 1
+        else:
+            delta = x - self._mean
+            self._mean += delta / (len(self._window) + 1)
+            self._m2 += delta * (x - self._mean)
+        self._window.append(x)
+        if len(self._window) < self.period:
+            return self.value
+        if self._since_anchor >= self.period:
+            self._anchor()
+        stddev = math.sqrt(max(self._m2, 0.0) / self.period)  # clamp: sisa pembulatan bisa sedikit negatif
+        self.value = middle
+        self.upper = middle + stddev * self.nbdevup
+        self.lower = middle - stddev * self.nbdevdn
+        return self.value
+
+    def _anchor(self):
+        # Sekali per pergantian jendela penuh (amortisasi O(1) per bar): hitung ulang rata-rata
+        # dan M2 dari jendela agar galat pembulatan Welford tidak menumpuk tanpa batas.
+        self._mean = sum(self._window) / self.period
+        self._m2 = sum((v - self._mean) * (v - self._mean) for v in self._window)
+        self._since_anchor = 0
+
+    @property
+    def bands(self) -> Tuple[float, float, float]:
+        return self.upper, self.value, self.lower
+
+    @property
+    def output(self) -> Tuple[float, float, float]:
+        return self.bands
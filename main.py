@@ -1,97 +1,170 @@
 # main.py
+import argparse
 import time
+import asyncio
 import pandas as pd
 import json
+import csv
+import io
 import os
+import shutil
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Tuple
-from api_clients import get_latest_price, get_all_futures_tickers
-from strategy import find_potential_coins, make_decision
-from config import SETTINGS
+from functools import partial
+from typing import Dict, Any, Tuple, Optional, List
+import clock
+import metrics
+from api_clients import PriceSnapshot, get_resampled_data
+from strategy import REASON_HAS_POSITION, REASON_TEMPLATES, find_potential_coins
+from candle_scheduler import CandleScheduler
+from position_book import POSITION_FIELDS, BookSnapshot, Position, PositionBook
+from risk_engine import RiskEngine
+from config import get_bybit_session, get_settings, set_bybit_session
+from state_feed import FEED_SOCKET, StateFeedPublisher
+from state_journal import COMPACT_EVERY, STATE_DIR, StateJournal, write_atomic
 
 # --- Pengaturan dari config ---
+SETTINGS = get_settings()
 LEVERAGE = SETTINGS['trading_settings']['leverage']
 BYBIT_TAKER_FEE = SETTINGS['trading_settings']['bybit_taker_fee']
 MARGIN_PER_TRADE = SETTINGS['trading_settings']['margin_per_trade']
+STRATEGY_INTERVAL = SETTINGS['trading_settings'].get('interval', '1')  # '5', '15', ... diturunkan dari k-line 1m
+STRATEGY_BARS = 50
 SL_PCT = SETTINGS['risk_management']['scalping_sl_pct']      # e.g., 0.0012
 TP_PCT = SETTINGS['risk_management']['scalping_tp_pct']      # e.g., 0.0040
+RISK_TICK_WATCHER = SETTINGS['risk_management'].get('tick_watcher', True)  # False = SL/TP hanya per siklus
+RISK_SYNC_SECONDS = 1.0  # interval cek perubahan book untuk subscribe ulang ticker posisi
+SCANNER_SETTINGS = SETTINGS.get('market_scanner', {})
+ENGINE_SETTINGS = SETTINGS.get('engine', {})
+CYCLE_WORKERS = 5  # thread analisis per siklus (engine thread); 1 saat replay agar deterministik
+SCHEDULER = CandleScheduler(STRATEGY_INTERVAL)
+USE_SCHEDULER = ENGINE_SETTINGS.get('candle_scheduler', True)  # False = analisis ulang setiap siklus
+METRICS_SETTINGS = SETTINGS.get('metrics', {})
+metrics.configure(METRICS_SETTINGS)
 
 # --- File Penyimpanan ---
 STATUS_FILE = "status.json"
 POSITIONS_FILE = "positions.csv"
 LOG_FILE = "trade_log.csv"
+STATE_SETTINGS = SETTINGS.get('state', {})
+JOURNAL = StateJournal(STATE_SETTINGS.get('directory', STATE_DIR),
+                       STATE_SETTINGS.get('compact_every', COMPACT_EVERY))
+
+FEED_SETTINGS = SETTINGS.get('feed', {})
+FEED = StateFeedPublisher(FEED_SETTINGS.get('socket_path', FEED_SOCKET))
 
 # --- State Global ---
 MARGIN_BALANCE = 10.0
-OPEN_POSITIONS: Dict[str, Any] = {}
-data_lock = threading.Lock()
+OPEN_POSITIONS = PositionBook()  # pembaca memakai OPEN_POSITIONS.snapshot() tanpa data_lock
+data_lock = metrics.instrumented_lock("data_lock")
 LAST_TRADE_TIME = {}  # cooldown per simbol
+MAX_OPEN_POSITIONS = 8
 
 # --- Fungsi State ---
+def _load_legacy_state() -> Tuple[float, Dict[str, Any]]:
+    """Membaca status.json/positions.csv (format lama) untuk migrasi ke jurnal state."""
+    balance, positions = 10.0, {}
+    if os.path.exists(STATUS_FILE):
+        try:
+            with open(STATUS_FILE, "r") as f:
+                balance = json.load(f).get("margin_balance", 10.0)
+        except Exception as e:
+            print(f"⚠️ Gagal muat {STATUS_FILE}: {e}")
+    if os.path.exists(POSITIONS_FILE):
+        try:
+            float_cols = {'entry_price', 'size', 'margin', 'stop_loss_price', 'take_profit_price'}
+            with open(POSITIONS_FILE, "r", newline="") as f:
+                for row in csv.DictReader(f):
+                    positions[row['symbol']] = {k: float(v) if k in float_cols else v for k, v in row.items()}
+        except Exception as e:
+            print(f"⚠️ Gagal muat {POSITIONS_FILE}: {e}")
+            positions = {}
+    return balance, positions
+
 def load_state_on_startup():
-    global MARGIN_BALANCE, OPEN_POSITIONS
+    global MARGIN_BALANCE
     print("🔄 Memuat status terakhir...")
+    started = time.perf_counter()
     with data_lock:
-        if os.path.exists(STATUS_FILE):
-            try:
-                with open(STATUS_FILE, "r") as f:
-                    MARGIN_BALANCE = json.load(f).get("margin_balance", 10.0)
-            except Exception as e:
-                print(f"⚠️ Gagal muat {STATUS_FILE}: {e}")
-        if os.path.exists(POSITIONS_FILE):
-            try:
-                df = pd.read_csv(POSITIONS_FILE)
-                float_cols = ['entry_price', 'size', 'margin', 'stop_loss_price', 'take_profit_price']
-                for col in float_cols:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                OPEN_POSITIONS = {row['symbol']: row.to_dict() for _, row in df.iterrows()}
-            except Exception as e:
-                print(f"⚠️ Gagal muat {POSITIONS_FILE}: {e}")
-                OPEN_POSITIONS = {}
-    print("✅ Status dimuat.")
+        balance, positions = JOURNAL.recover()
+        if balance is None:
+            # Belum ada jurnal: migrasikan file state lama sebagai snapshot awal
+            balance, positions = _load_legacy_state()
+            JOURNAL.snapshot(balance, positions)
+        MARGIN_BALANCE = balance
+        OPEN_POSITIONS.load(positions)
+        book = OPEN_POSITIONS.snapshot()
+    write_state_views(balance, book)
+    print(f"✅ Status dimuat dalam {(time.perf_counter() - started) * 1000:.1f} ms.")
 
-def save_all_states():
-    with data_lock:
-        balance = MARGIN_BALANCE
-        positions = OPEN_POSITIONS.copy()
+def write_state_views(balance: float, positions: BookSnapshot):
+    """Menulis status.json dan positions.csv (tampilan turunan untuk dashboard) secara atomik."""
     try:
-        with open(STATUS_FILE, "w") as f:
-            json.dump({"margin_balance": balance}, f, indent=4)
+        write_atomic(STATUS_FILE, json.dumps({"margin_balance": balance}, indent=4))
     except Exception as e:
         print(f"⚠️ Gagal simpan {STATUS_FILE}: {e}")
     try:
         if positions:
-            pd.DataFrame.from_dict(positions, orient='index').to_csv(POSITIONS_FILE, index=False)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(POSITION_FIELDS)
+            writer.writerows(positions.to_rows())
+            write_atomic(POSITIONS_FILE, buffer.getvalue())
         elif os.path.exists(POSITIONS_FILE):
             os.remove(POSITIONS_FILE)
     except Exception as e:
         print(f"⚠️ Gagal simpan {POSITIONS_FILE}: {e}")
 
+def save_all_states():
+    """Satu fsync jurnal untuk semua perubahan sejak pemanggilan terakhir; tanpa perubahan tidak menulis apa pun."""
+    try:
+        if not JOURNAL.commit():
+            return
+    except Exception as e:
+        print(f"⚠️ Gagal commit jurnal state: {e}")
+        return
+    with data_lock:
+        balance = MARGIN_BALANCE
+        positions = OPEN_POSITIONS.snapshot()
+    write_state_views(balance, positions)
+
 def append_to_trade_log(entry: Dict[str, Any]):
     try:
         entry = {k: (float(v) if isinstance(v, (int, float)) else str(v)) for k, v in entry.items()}
-        header = not os.path.exists(LOG_FILE)
-        pd.DataFrame([entry]).to_csv(LOG_FILE, mode='a', header=header, index=False)
+        header = not os.path.exists(LOG_FILE) or os.path.getsize(LOG_FILE) == 0
+        with open(LOG_FILE, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(entry.keys()))
+            if header:
+                writer.writeheader()
+            writer.writerow(entry)
     except Exception as e:
         print(f"⚠️ Gagal log ke {LOG_FILE}: {e}")
 
+def publish_state():
+    """Mengirim saldo dan posisi terkini ke dashboard (tidak memblok)."""
+    with data_lock:
+        balance = MARGIN_BALANCE
+        positions = OPEN_POSITIONS.snapshot()
+    FEED.publish_state(balance, positions.to_dicts())
+
 # --- Eksekusi Posisi ---
-def open_position(symbol: str, side: str, price: float):
-    global MARGIN_BALANCE, OPEN_POSITIONS, LAST_TRADE_TIME
+def open_position(symbol: str, side: str, price: float, max_positions: Optional[int] = None):
+    """max_positions: batas posisi yang dicek di bawah data_lock (untuk entry yang bisa datang bersamaan)."""
+    global MARGIN_BALANCE, LAST_TRADE_TIME
     with data_lock:
         if symbol in OPEN_POSITIONS or MARGIN_BALANCE < MARGIN_PER_TRADE:
             return
+        if max_positions is not None and len(OPEN_POSITIONS) >= max_positions:
+            return
         sl_price = price * (1 - SL_PCT) if side == 'LONG' else price * (1 + SL_PCT)
         tp_price = price * (1 + TP_PCT) if side == 'LONG' else price * (1 - TP_PCT)
         size_in_coin = (MARGIN_PER_TRADE * LEVERAGE) / price
         MARGIN_BALANCE -= MARGIN_PER_TRADE
-        OPEN_POSITIONS[symbol] = {
-            "symbol": symbol, "side": side, "entry_price": price, "size": size_in_coin,
-            "margin": MARGIN_PER_TRADE, "stop_loss_price": sl_price, "take_profit_price": tp_price
-        }
-        LAST_TRADE_TIME[symbol] = pd.Timestamp.now()
+        position = Position(symbol, side, price, size_in_coin, MARGIN_PER_TRADE, sl_price, tp_price)
+        OPEN_POSITIONS.add(position)
+        JOURNAL.record("open", MARGIN_BALANCE, symbol, position=position.to_dict())
+        LAST_TRADE_TIME[symbol] = clock.now()
+    publish_state()
     print(f"✅ SCALP DIBUKA: {side} {symbol} | SL: ${sl_price:.6f} ({SL_PCT*100:.2f}%) | TP: ${tp_price:.6f} ({TP_PCT*100:.2f}%)")
 
 def close_position(symbol: str, price: float, reason: str = "Sinyal"):
@@ -99,104 +172,408 @@ def close_position(symbol: str, price: float, reason: str = "Sinyal"):
     pos_data = {}
     net_pnl = 0
     with data_lock:
-        if symbol not in OPEN_POSITIONS: return
         pos = OPEN_POSITIONS.pop(symbol)
-        gross_pnl = (price - pos['entry_price']) * pos['size'] if pos['side'] == 'LONG' else (pos['entry_price'] - price) * pos['size']
-        fee = (pos['entry_price'] * pos['size'] + price * pos['size']) * BYBIT_TAKER_FEE
+        if pos is None: return
+        gross_pnl = (price - pos.entry_price) * pos.size if pos.side == 'LONG' else (pos.entry_price - price) * pos.size
+        fee = (pos.entry_price * pos.size + price * pos.size) * BYBIT_TAKER_FEE
         net_pnl = gross_pnl - fee
-        MARGIN_BALANCE += (pos['margin'] + net_pnl)
+        MARGIN_BALANCE += (pos.margin + net_pnl)
         pos_data = {
-            "timestamp": pd.Timestamp.now().isoformat(),
-            "symbol": symbol, "action": "CLOSE", "side": pos['side'],
-            "price": price, "size": pos['size'], "margin": pos['margin'],
+            "timestamp": clock.now().isoformat(),
+            "symbol": symbol, "action": "CLOSE", "side": pos.side,
+            "price": price, "size": pos.size, "margin": pos.margin,
             "pnl": net_pnl, "reason": reason
         }
+        JOURNAL.record("close", MARGIN_BALANCE, symbol, trade=pos_data)
     if pos_data:
         append_to_trade_log(pos_data)
+        FEED.publish_trade(pos_data)
+        publish_state()
     print(f"✅ TUTUP {symbol} ({reason}) | PnL: ${net_pnl:.4f}")
 
-def check_risk_management():
-    with data_lock:
-        positions = list(OPEN_POSITIONS.items())
-    for symbol, pos in positions:
-        price = get_latest_price(symbol)
-        if not price: continue
-        sl_hit = tp_hit = False
-        sl = pos['stop_loss_price']
-        tp = pos['take_profit_price']
-        if pos['side'] == 'LONG':
-            sl_hit = price <= sl
-            tp_hit = price >= tp
-        else:
-            sl_hit = price >= sl
-            tp_hit = price <= tp
-        if sl_hit:
-            close_position(symbol, price, "Stop Loss")
-        elif tp_hit:
-            close_position(symbol, price, "Take Profit")
+# --- Manajemen Risiko ---
+RISK_ENGINE = RiskEngine(OPEN_POSITIONS, on_exit=close_position)
+
+def check_position_exit(symbol: str, price: float):
+    """Cek SL/TP satu simbol terhadap harga terbaru (dipakai per tick oleh feed WebSocket)."""
+    RISK_ENGINE.on_tick(symbol, price)
+
+def check_risk_management(snapshot: Optional[PriceSnapshot] = None):
+    """Cek SL/TP semua posisi sekaligus terhadap snapshot ticker (diambil baru jika tidak diberikan)."""
+    positions = OPEN_POSITIONS.snapshot()
+    if not positions:
+        return
+    if snapshot is None:
+        snapshot = PriceSnapshot.capture()
+    RISK_ENGINE.check_prices({symbol: snapshot.get_price(symbol) for symbol in positions})
+
+def run_risk_watcher():
+    """
+    Cek SL/TP di luar siklus scan untuk engine thread/async/sharded tanpa request REST
+    tambahan: ticker simbol yang punya posisi di-subscribe lewat WebSocket dan setiap
+    tick langsung dievaluasi RiskEngine. Subscription disamakan dengan book setiap
+    kali versinya berubah (cek lokal, tanpa jaringan).
+    """
+    from market_stream import MarketDataStream
+    stream = MarketDataStream(on_tick=check_position_exit, klines=False,
+                              url=ENGINE_SETTINGS.get("ws_url", "wss://stream.bybit.com/v5/public/linear"))
+    stream.start()
+    version = None
+    while True:
+        if OPEN_POSITIONS.version != version:
+            version = OPEN_POSITIONS.version
+            stream.set_symbols(OPEN_POSITIONS.symbols())
+        time.sleep(RISK_SYNC_SECONDS)
 
 def close_all_positions():
     print("\n🚨 Menutup semua posisi...")
-    with data_lock:
-        symbols = list(OPEN_POSITIONS.keys())
+    symbols = OPEN_POSITIONS.symbols()
+    snapshot = PriceSnapshot.capture() if symbols else None
     for sym in symbols:
-        price = get_latest_price(sym)
+        price = snapshot.get_price(sym)
         if price:
             close_position(sym, price, "Shutdown")
 
 # --- Loop Utama ---
-def analyze_and_trade_coin(symbol: str) -> Tuple[str, str]:
-    price = get_latest_price(symbol)
-    if not price: return "ERROR", f"Tidak bisa ambil harga {symbol}"
-    with data_lock:
-        open_pos = OPEN_POSITIONS.copy()
+def is_in_cooldown(symbol: str) -> bool:
     # Cooldown 120 detik per simbol (dari 60)
     if symbol in LAST_TRADE_TIME:
-        if (pd.Timestamp.now() - LAST_TRADE_TIME[symbol]).total_seconds() < 120:
-            return "HOLD", f"⏳ Cooldown aktif untuk {symbol}"
-    decision, log_msg, _ = make_decision(symbol, open_pos, price)
+        return (clock.now() - LAST_TRADE_TIME[symbol]).total_seconds() < 120
+    return False
+
+def decide_and_trade(symbol: str, price: float, data: Optional[pd.DataFrame] = None,
+                     max_positions: Optional[int] = None) -> Tuple[str, str]:
+    open_pos = OPEN_POSITIONS.snapshot()  # immutable, tanpa lock maupun salinan
+    started = time.perf_counter()
+    if data is None:
+        data = get_resampled_data(symbol, STRATEGY_INTERVAL, STRATEGY_BARS)
+    decision, log_msg = SCHEDULER.decide(symbol, open_pos, data)
+    if metrics.ENABLED:
+        elapsed = time.perf_counter() - started
+        metrics.DECISION_SECONDS.observe(elapsed)
+        metrics.DECISION_SYMBOL_SECONDS.observe(elapsed, symbol=symbol)
     if decision in ["GO_LONG", "GO_SHORT"]:
-        open_position(symbol, "LONG" if decision == "GO_LONG" else "SHORT", price)
+        open_position(symbol, "LONG" if decision == "GO_LONG" else "SHORT", price, max_positions)
     return decision, log_msg
 
+def analyze_and_trade_coin(symbol: str, snapshot: PriceSnapshot) -> Tuple[str, str]:
+    price = snapshot.get_price(symbol)
+    if not price: return "ERROR", f"Tidak bisa ambil harga {symbol}"
+    if is_in_cooldown(symbol):
+        return "HOLD", f"⏳ Cooldown aktif untuk {symbol}"
+    skip = should_skip(symbol, price)
+    if skip is not None:
+        return "HOLD", skip
+    return decide_and_trade(symbol, price)
+
+def should_skip(symbol: str, price: float) -> Optional[str]:
+    """
+    Pesan HOLD jika simbol pasti tidak menghasilkan entry siklus ini, sehingga k-line
+    tidak perlu diambil: sudah ada posisi, atau scheduler candle memastikan setup
+    belum mungkin terpenuhi (pesan kosong agar tidak mencetak ratusan baris).
+    """
+    if not USE_SCHEDULER:
+        return None
+    if symbol in OPEN_POSITIONS:
+        return REASON_TEMPLATES[REASON_HAS_POSITION].format(symbol=symbol)
+    if not SCHEDULER.should_evaluate(symbol, price):
+        return ""
+    return None
+
+def select_coins(snapshot: PriceSnapshot) -> List[str]:
+    """Menentukan simbol yang dianalisis pada siklus ini."""
+    with data_lock:
+        balance = MARGIN_BALANCE
+        positions = OPEN_POSITIONS.snapshot()
+    open_symbols = list(positions)
+    coins = []
+    if balance >= MARGIN_PER_TRADE:
+        coins = find_potential_coins(snapshot.tickers, SCANNER_SETTINGS)
+    all_coins = list(dict.fromkeys(coins + open_symbols))  # urutan stabil → replay deterministik
+
+    # Batasi maksimal posisi aktif = 8 (dari modal $10)
+    if len(OPEN_POSITIONS) >= MAX_OPEN_POSITIONS:
+        # Hanya pantau posisi terbuka, jangan buka baru
+        all_coins = open_symbols
+    return all_coins
+
+def record_cycle(engine: str, started: float, symbols: int) -> float:
+    """Mencatat durasi siklus dan throughput simbol per detik."""
+    elapsed = time.monotonic() - started
+    metrics.CYCLE_SECONDS.observe(elapsed, engine=engine)
+    if elapsed > 0:
+        metrics.SYMBOLS_PER_SECOND.set(symbols / elapsed, engine=engine)
+    return elapsed
+
+def print_cycle_results(results: List[Tuple[str, str]]):
+    print("\n--- Hasil Siklus ---")
+    for _, msg in results:
+        if msg: print(msg)
+
+def run_trading_cycle() -> List[Tuple[str, str]]:
+    """
+    Satu siklus engine thread: snapshot harga, manajemen risiko, analisis semua koin
+    terpilih, lalu simpan state. Mengembalikan hasil per koin (kosong jika tidak ada koin).
+    """
+    cycle_start = time.monotonic()
+    # Satu request ticker massal per siklus untuk semua kebutuhan harga
+    snapshot = PriceSnapshot.capture()
+    FEED.publish_prices(snapshot.prices())
+    check_risk_management(snapshot)
+    all_coins = select_coins(snapshot)
+    if not all_coins:
+        return []
+
+    with ThreadPoolExecutor(max_workers=CYCLE_WORKERS) as executor:
+        results = list(executor.map(partial(analyze_and_trade_coin, snapshot=snapshot), all_coins))
+    record_cycle("thread", cycle_start, len(all_coins))
+    print_cycle_results(results)
+    save_all_states()
+    return results
+
 def run_trading_loop():
     print(f"🚀 SCALPING AGENT DIMULAI | Saldo: ${MARGIN_BALANCE:.2f}")
     while True:
-        check_risk_management()
-        with data_lock:
-            balance = MARGIN_BALANCE
-            open_symbols = list(OPEN_POSITIONS.keys())
-        coins = []
-        if balance >= MARGIN_PER_TRADE:
-            tickers = get_all_futures_tickers()
-            coins = find_potential_coins(tickers)
-        all_coins = list(set(coins + open_symbols))
-        if not all_coins:
-            time.sleep(60)
-            continue
-
-        # Batasi maksimal posisi aktif = 8 (dari modal $10)
-        with data_lock:
-            if len(OPEN_POSITIONS) >= 8:
-                # Hanya pantau posisi terbuka, jangan buka baru
-                all_coins = open_symbols
-
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(analyze_and_trade_coin, all_coins))
-        print("\n--- Hasil Siklus ---")
-        for _, msg in results:
-            if msg: print(msg)
-        save_all_states()
-        time.sleep(6)  # optimal untuk scalping 1-menit
+        results = run_trading_cycle()
+        clock.sleep(6 if results else 60)  # 6 detik optimal untuk scalping 1-menit
+
+# --- Engine Asyncio ---
+async def analyze_and_trade_coin_async(client: "AsyncBybitClient", symbol: str,
+                                       snapshot: PriceSnapshot) -> Tuple[str, str]:
+    price = await client.get_snapshot_price(snapshot, symbol)
+    if not price: return "ERROR", f"Tidak bisa ambil harga {symbol}"
+    if is_in_cooldown(symbol):
+        return "HOLD", f"⏳ Cooldown aktif untuk {symbol}"
+    skip = should_skip(symbol, price)
+    if skip is not None:
+        return "HOLD", skip
+    if STRATEGY_INTERVAL == '1':
+        data = await client.get_cached_historical_data(symbol, interval='1', limit=STRATEGY_BARS)
+    else:
+        data = await asyncio.to_thread(get_resampled_data, symbol, STRATEGY_INTERVAL, STRATEGY_BARS)
+    # decide_and_trade bisa memblok (data_lock, jurnal, fallback REST sinkron bila data None),
+    # jadi dijalankan di thread agar event loop tetap melayani request simbol lain
+    return await asyncio.to_thread(decide_and_trade, symbol, price, data)
+
+async def run_trading_loop_async():
+    """Sama seperti run_trading_loop, tetapi semua request dikirim lewat AsyncBybitClient."""
+    from async_api_clients import AsyncBybitClient
+    print(f"🚀 SCALPING AGENT DIMULAI (async) | Saldo: ${MARGIN_BALANCE:.2f}")
+    async with AsyncBybitClient.from_settings(ENGINE_SETTINGS) as client:
+        while True:
+            cycle_start = time.monotonic()
+            snapshot = await client.capture_snapshot()
+            FEED.publish_prices(snapshot.prices())
+            check_risk_management(snapshot)
+            all_coins = select_coins(snapshot)
+            if not all_coins:
+                await asyncio.sleep(60)
+                continue
+
+            results = await asyncio.gather(
+                *(analyze_and_trade_coin_async(client, symbol, snapshot) for symbol in all_coins))
+            elapsed = record_cycle("async", cycle_start, len(all_coins))
+            print_cycle_results(results)
+            print(f"⏱️ {len(all_coins)} simbol dianalisis dalam {elapsed:.2f} detik")
+            await asyncio.to_thread(save_all_states)  # fsync jurnal
+            await asyncio.sleep(6)
+
+# --- Engine Sharded (multi-proses) ---
+def request_entry(symbol: str, side: str, price: float) -> bool:
+    """
+    Arbitrase permintaan entry dari worker shard: cooldown dan batas posisi dicek
+    ulang di coordinator (state terbaru), lalu open_position mengecek saldo dan
+    posisi ganda di bawah data_lock.
+    """
+    if is_in_cooldown(symbol) or len(OPEN_POSITIONS) >= MAX_OPEN_POSITIONS:
+        return False
+    open_position(symbol, side, price)
+    return symbol in OPEN_POSITIONS
+
+def run_sharded_loop():
+    """
+    Proses ini menjadi coordinator: mengambil snapshot ticker, mengelola risiko,
+    saldo, posisi, batas posisi, dan cooldown. Analisis k-line dan keputusan
+    dijalankan oleh `engine.workers` proses worker, masing-masing untuk shard simbolnya.
+    """
+    from sharded_engine import CONNECT_TIMEOUT, DEFAULT_THREADS_PER_WORKER, SCAN_TIMEOUT, ShardCoordinator
+    coordinator = ShardCoordinator(
+        ENGINE_SETTINGS.get("workers") or os.cpu_count() or 1, SETTINGS,
+        threads_per_worker=ENGINE_SETTINGS.get("threads_per_worker", DEFAULT_THREADS_PER_WORKER),
+        use_scheduler=USE_SCHEDULER,
+        connect_timeout=ENGINE_SETTINGS.get("worker_connect_timeout", CONNECT_TIMEOUT),
+        scan_timeout=ENGINE_SETTINGS.get("worker_scan_timeout", SCAN_TIMEOUT))
+    coordinator.start()
+    print(f"🚀 SCALPING AGENT DIMULAI (sharded) | Saldo: ${MARGIN_BALANCE:.2f}")
+    try:
+        while True:
+            cycle_start = time.monotonic()
+            snapshot = PriceSnapshot.capture()
+            FEED.publish_prices(snapshot.prices())
+            check_risk_management(snapshot)
+            prices = {}
+            for symbol in select_coins(snapshot):
+                price = snapshot.get_price(symbol)
+                if price and not is_in_cooldown(symbol):
+                    prices[symbol] = price
+            if not prices:
+                clock.sleep(60)
+                continue
+
+            results = coordinator.scan(list(prices), prices, OPEN_POSITIONS.symbols(), clock.time())
+            for symbol, decision, _ in results:
+                if decision in ["GO_LONG", "GO_SHORT"]:
+                    request_entry(symbol, "LONG" if decision == "GO_LONG" else "SHORT", prices[symbol])
+            elapsed = record_cycle("sharded", cycle_start, len(prices))
+            print_cycle_results([(decision, msg) for _, decision, msg in results])
+            print(f"⏱️ {len(prices)} simbol dianalisis dalam {elapsed:.2f} detik")
+            save_all_states()
+            clock.sleep(6)
+    finally:
+        coordinator.stop()
+
+# --- Engine Streaming (WebSocket) ---
+UNIVERSE_REFRESH_SECONDS = 60
+
+def run_streaming_loop():
+    """
+    Loop berbasis push: make_decision dijalankan setiap candle 1 menit ditutup dan
+    SL/TP dicek pada setiap tick. REST hanya dipakai untuk memperbarui daftar koin.
+    """
+    from market_stream import MarketDataStream
+    executor = ThreadPoolExecutor(max_workers=ENGINE_SETTINGS.get("max_concurrency", 5))
+
+    def evaluate_on_candle_close(symbol: str):
+        # Candle close bisa datang beruntun; slot posisi dicek per event, bukan hanya saat refresh universe
+        if is_in_cooldown(symbol):
+            return
+        if symbol not in OPEN_POSITIONS and len(OPEN_POSITIONS) >= MAX_OPEN_POSITIONS:
+            return
+        price = stream.last_price(symbol)
+        # Interval lebih tinggi diturunkan dari bar 1m yang sama (LIVE_BARS diisi handle_message)
+        if STRATEGY_INTERVAL == '1':
+            data = stream.get_bars(symbol, limit=STRATEGY_BARS)
+        else:
+            data = get_resampled_data(symbol, STRATEGY_INTERVAL, STRATEGY_BARS)
+        if price:
+            decision, log_msg = decide_and_trade(symbol, price, data, max_positions=MAX_OPEN_POSITIONS)
+            if decision != "HOLD":
+                print(log_msg)
+
+    stream = MarketDataStream(
+        on_candle_close=lambda symbol: executor.submit(evaluate_on_candle_close, symbol),
+        on_tick=check_position_exit,
+        url=ENGINE_SETTINGS.get("ws_url", "wss://stream.bybit.com/v5/public/linear"),
+    )
+    print(f"🚀 SCALPING AGENT DIMULAI (stream) | Saldo: ${MARGIN_BALANCE:.2f}")
+    stream.start()
+    last_refresh = 0.0
+    try:
+        while True:
+            if time.monotonic() - last_refresh >= UNIVERSE_REFRESH_SECONDS:
+                snapshot = PriceSnapshot.capture()
+                check_risk_management(snapshot)
+                coins = select_coins(snapshot)
+                coins = list(set(coins) | set(OPEN_POSITIONS.symbols()))
+                stream.set_symbols(coins)
+                print(f"📡 Memantau {len(coins)} simbol lewat WebSocket")
+                last_refresh = time.monotonic()
+            FEED.publish_prices(stream.snapshot().prices())
+            save_all_states()
+            clock.sleep(6)
+    finally:
+        stream.stop()
+        executor.shutdown(wait=False)
+
+# --- Rekam & Replay ---
+REPLAY_MODE = None  # "record" / "replay" saat dijalankan dengan --record / --replay
+
+def start_recording(path: str):
+    """Semua respons ticker/k-line dari sesi Bybit asli direkam ke `path` selama bot berjalan."""
+    global REPLAY_MODE
+    from market_replay import MarketRecorder
+    set_bybit_session(MarketRecorder(path, get_bybit_session()))
+    REPLAY_MODE = "record"
+    print(f"🎙️ Merekam respons pasar ke {path}")
+
+def start_replay(path: str, speed: Optional[float] = None):
+    """
+    Menjalankan agent terhadap rekaman `path` pada jam virtual. State, status, dan
+    trade log ditulis ke direktori `<rekaman>_replay/` yang dibuat ulang setiap kali,
+    sehingga state live tidak tersentuh dan hasil replay bisa dibandingkan antar-run.
+    """
+    global REPLAY_MODE, JOURNAL, STATUS_FILE, POSITIONS_FILE, LOG_FILE, CYCLE_WORKERS
+    from market_replay import ReplayExchange
+    exchange = ReplayExchange.load(path)
+    if exchange.start_time is None:
+        raise ValueError(f"Rekaman {path} tidak berisi respons yang bisa diputar ulang.")
+    run_dir = os.path.splitext(path)[0] + "_replay"
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    STATUS_FILE = os.path.join(run_dir, "status.json")
+    POSITIONS_FILE = os.path.join(run_dir, "positions.csv")
+    LOG_FILE = os.path.join(run_dir, "trade_log.csv")
+    JOURNAL = StateJournal(os.path.join(run_dir, STATE_DIR), JOURNAL.compact_every)
+    CYCLE_WORKERS = 1
+    set_bybit_session(exchange)
+    clock.set_clock(clock.VirtualClock(exchange.start_time, exchange.end_time, speed))
+    REPLAY_MODE = "replay"
+    print(f"⏩ Replay {path} (kecepatan: {f'{speed}x' if speed else 'maksimum'}) → hasil di {run_dir}/")
+
+def finish_replay(reason: clock.ReplayFinished):
+    save_all_states()
+    JOURNAL.close()
+    with data_lock:
+        balance, n_open = MARGIN_BALANCE, len(OPEN_POSITIONS)
+    print(f"\n🏁 {reason} | Saldo: ${balance:.2f} | Posisi terbuka: {n_open} | Log: {LOG_FILE}")
+
+def run_engine():
+    """Menjalankan loop trading sesuai `engine.mode` di settings.json."""
+    mode = ENGINE_SETTINGS.get("mode", "thread")
+    if REPLAY_MODE and mode != "thread":
+        # Rekam/replay hanya mencakup sesi pybit (REST sinkron) yang dipakai engine thread
+        print(f"⚠️ Mode engine '{mode}' tidak didukung untuk rekam/replay, memakai engine thread.")
+        mode = "thread"
+    if mode != "stream" and REPLAY_MODE != "replay" and RISK_TICK_WATCHER:
+        # Engine stream sudah mengecek SL/TP per tick; replay harus deterministik per siklus
+        threading.Thread(target=run_risk_watcher, name="risk-watcher", daemon=True).start()
+    if mode == "async":
+        asyncio.run(run_trading_loop_async())
+    elif mode == "stream":
+        run_streaming_loop()
+    elif mode == "sharded":
+        run_sharded_loop()
+    else:
+        run_trading_loop()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent scalping Bybit.")
+    parser.add_argument("--record", metavar="FILE", default=None,
+                        help="Rekam semua respons ticker/k-line ke log biner")
+    parser.add_argument("--replay", metavar="FILE", default=None,
+                        help="Jalankan terhadap log rekaman dengan jam virtual (tanpa jaringan)")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Kecepatan replay relatif waktu nyata (default: secepat mungkin)")
+    args = parser.parse_args()
     try:
+        if args.replay:
+            start_replay(args.replay, args.speed)
+        elif args.record:
+            start_recording(args.record)
         load_state_on_startup()
-        run_trading_loop()
+        metrics.start_exporter(METRICS_SETTINGS)
+        if REPLAY_MODE != "replay" and FEED_SETTINGS.get("enabled", True) and FEED.start():
+            publish_state()
+        run_engine()
+    except clock.ReplayFinished as e:
+        finish_replay(e)
     except KeyboardInterrupt:
         print("\n🛑 Dihentikan oleh user.")
         close_all_positions()
         save_all_states()
+        JOURNAL.close()
         print("✅ Status disimpan.")
     except Exception as e:
-        print(f"\n💥 Error: {e}")
\ No newline at end of file
+        print(f"\n💥 Error: {e}")
+    finally:
+        FEED.stop()
\ No newline at end of file
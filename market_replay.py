@@ -0,0 +1,205 @@
+# market_replay.py — Rekam respons REST pasar Bybit dan putar ulang dengan jam virtual
+import argparse
+import bisect
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+import clock
+
+# Format log: MAGIC, lalu record berurutan = header RECORD_HEADER
+# (waktu rekam detik epoch, id metode, panjang parameter, panjang payload),
+# parameter request sebagai JSON, dan respons sebagai JSON terkompresi zlib.
+MAGIC = b"BYBITREC\x01"
+RECORD_HEADER = struct.Struct("<dBHI")
+METHODS = ("get_tickers", "get_kline")
+INTERVAL_MS = {"D": 86_400_000, "W": 604_800_000}
+
+
+def _interval_ms(interval: str) -> int:
+    return INTERVAL_MS.get(str(interval), int(interval) * 60_000 if str(interval).isdigit() else 60_000)
+
+
+class MarketRecorder:
+    """
+    Pembungkus sesi pybit: get_tickers dan get_kline diteruskan ke sesi asli dan
+    setiap respons ditambahkan ke log biner (satu write + flush per record, aman
+    dipakai dari banyak thread). Metode lain diteruskan apa adanya.
+    """
+
+    def __init__(self, path: str, session: Any):
+        self.path = path
+        self.session = session
+        self.records = 0
+        self._lock = threading.Lock()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def _record(self, method: str, params: Dict[str, Any], response: Dict[str, Any]):
+        params_bytes = json.dumps(params, separators=(",", ":")).encode("utf-8")
+        payload = zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf-8"))
+        header = RECORD_HEADER.pack(clock.time(), METHODS.index(method), len(params_bytes), len(payload))
+        with self._lock:
+            self._file.write(header + params_bytes + payload)
+            self._file.flush()
+            self.records += 1
+
+    def get_tickers(self, **params) -> Dict[str, Any]:
+        response = self.session.get_tickers(**params)
+        self._record("get_tickers", params, response)
+        return response
+
+    def get_kline(self, **params) -> Dict[str, Any]:
+        response = self.session.get_kline(**params)
+        self._record("get_kline", params, response)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+def read_records(path: str) -> Iterator[Tuple[float, str, Dict[str, Any], Dict[str, Any]]]:
+    """(waktu rekam, metode, parameter, respons) per record; record terakhir yang terpotong diabaikan."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' bukan log rekaman pasar.")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            recorded_at, method_id, params_len, payload_len = RECORD_HEADER.unpack(header)
+            body = f.read(params_len + payload_len)
+            if len(body) < params_len + payload_len:
+                return
+            try:
+                params = json.loads(body[:params_len])
+                response = json.loads(zlib.decompress(body[params_len:]))
+            except (ValueError, zlib.error):
+                return
+            yield recorded_at, METHODS[method_id], params, response
+
+
+class ReplayExchange:
+    """
+    Pengganti sesi pybit yang melayani get_tickers/get_kline dari log rekaman
+    menurut clock.time(), sehingga loop trading asli bisa dijalankan ulang pada
+    jam virtual jauh lebih cepat dari waktu nyata.
+    - get_tickers: respons ticker terakhir yang direkam pada atau sebelum waktu virtual.
+    - get_kline: semua respons k-line digabung per simbol/interval. Bar yang sudah
+      tutup memakai versi terakhirnya; bar yang masih berjalan memakai versi yang
+      terekam sebelum waktu virtual (tidak pernah mengintip data masa depan).
+    """
+
+    def __init__(self):
+        self._ticker_times: List[float] = []
+        self._ticker_lists: List[List[Dict[str, Any]]] = []
+        self._ticker_bulk: List[bool] = []
+        self._bars: Dict[Tuple[str, str], Dict[int, List[Tuple[float, list]]]] = {}
+        self._bar_index: Dict[Tuple[str, str], List[int]] = {}
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayExchange":
+        exchange = cls()
+        for recorded_at, method, params, response in read_records(path):
+            exchange.add(recorded_at, method, params, response)
+        exchange._build_index()
+        print(f"📼 Rekaman {path}: {len(exchange._ticker_times)} snapshot ticker, "
+              f"{len(exchange._bars)} seri k-line, "
+              f"{pd.Timestamp.fromtimestamp(exchange.start_time or 0)} → "
+              f"{pd.Timestamp.fromtimestamp(exchange.end_time or 0)}")
+        return exchange
+
+    def add(self, recorded_at: float, method: str, params: Dict[str, Any], response: Dict[str, Any]):
+        if not response or response.get('retCode') != 0:
+            return
+        self.start_time = recorded_at if self.start_time is None else min(self.start_time, recorded_at)
+        self.end_time = recorded_at if self.end_time is None else max(self.end_time, recorded_at)
+        result_list = response['result']['list']
+        if method == "get_tickers":
+            index = bisect.bisect_right(self._ticker_times, recorded_at)
+            self._ticker_times.insert(index, recorded_at)
+            self._ticker_lists.insert(index, result_list)
+            self._ticker_bulk.insert(index, params.get('symbol') is None)
+        else:
+            versions = self._bars.setdefault((params['symbol'], str(params['interval'])), {})
+            for row in result_list:
+                versions.setdefault(int(row[0]), []).append((recorded_at, row))
+
+    def _build_index(self):
+        for key, versions in self._bars.items():
+            for history in versions.values():
+                history.sort(key=lambda item: item[0])
+            self._bar_index[key] = sorted(versions)
+
+    @staticmethod
+    def _response(result_list: List[Any]) -> Dict[str, Any]:
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": result_list}, "time": int(clock.time() * 1000)}
+
+    def get_tickers(self, category: str = "linear", symbol: Optional[str] = None, **_) -> Dict[str, Any]:
+        end = bisect.bisect_right(self._ticker_times, clock.time())
+        for i in range(end - 1, -1, -1):
+            if symbol is None:
+                if self._ticker_bulk[i]:
+                    return self._response(self._ticker_lists[i])
+                continue
+            matches = [t for t in self._ticker_lists[i] if t.get('symbol') == symbol]
+            if matches:
+                return self._response(matches)
+        return self._response([])
+
+    def get_kline(self, category: str = "linear", symbol: str = "", interval: str = "1", limit: int = 200,
+                  start: Optional[int] = None, end: Optional[int] = None, **_) -> Dict[str, Any]:
+        key = (symbol, str(interval))
+        opens = self._bar_index.get(key, [])
+        now = clock.time()
+        now_ms = now * 1000
+        hi = bisect.bisect_right(opens, now_ms if end is None else min(now_ms, end))
+        lo = 0 if start is None else bisect.bisect_left(opens, start)
+        interval_ms = _interval_ms(interval)
+        rows = []
+        for open_ms in reversed(opens[lo:hi]):  # Bybit: terbaru di depan
+            history = self._bars[key][open_ms]
+            if open_ms + interval_ms > now_ms:
+                known = [row for recorded_at, row in history if recorded_at <= now]
+                if not known:
+                    continue
+                rows.append(known[-1])
+            else:
+                rows.append(history[-1][1])
+            if len(rows) >= int(limit):
+                break
+        return self._response(rows)
+
+
+def summarize(path: str) -> Dict[str, Any]:
+    """Ringkasan isi log rekaman (jumlah record per metode, rentang waktu, ukuran)."""
+    counts = {method: 0 for method in METHODS}
+    first = last = None
+    for recorded_at, method, _, _ in read_records(path):
+        counts[method] += 1
+        first = recorded_at if first is None else first
+        last = recorded_at
+    return {"path": path, "bytes": os.path.getsize(path), "records": counts,
+            "start": pd.Timestamp.fromtimestamp(first).isoformat() if first else None,
+            "end": pd.Timestamp.fromtimestamp(last).isoformat() if last else None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Informasi log rekaman pasar (main.py --record/--replay).")
+    parser.add_argument("path", help="File log rekaman")
+    args = parser.parse_args()
+    print(json.dumps(summarize(args.path), indent=2))
@@ -0,0 +1,161 @@
+# market_store.py — Penyimpanan data pasar kolumnar berbasis memory-map
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "market_data"
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+COLUMN_DTYPES = {col: np.dtype(np.int64 if col == 'timestamp' else np.float64) for col in COLUMNS}
+META_FILE = "meta.json"
+
+
+class MarketDataStore:
+    """
+    Data k-line per simbol/interval disimpan sebagai satu file biner per kolom
+    (market_data/<SIMBOL>/<interval>m/<kolom>.bin) plus meta.json kecil berisi
+    jumlah baris dan rentang waktu. File kolom hanya ditambah di ujung; meta.json
+    ditulis atomik setelahnya sehingga data yang terpotong karena crash diabaikan.
+    Pembacaan memakai np.memmap sehingga tidak ada parsing maupun salinan.
+    Timestamp disimpan sebagai int64 milidetik (UTC) dan selalu naik tanpa duplikat.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def series_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, f"{interval}m")
+
+    def _column_path(self, symbol: str, interval: str, column: str) -> str:
+        return os.path.join(self.series_path(symbol, interval), f"{column}.bin")
+
+    # --- Metadata ---
+    def meta(self, symbol: str, interval: str) -> Optional[Dict]:
+        path = os.path.join(self.series_path(symbol, interval), META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol: str, interval: str, meta: Dict):
+        path = os.path.join(self.series_path(symbol, interval), META_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def rows(self, symbol: str, interval: str) -> int:
+        meta = self.meta(symbol, interval)
+        return meta['rows'] if meta else 0
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        meta = self.meta(symbol, interval)
+        return meta['last_timestamp'] if meta and meta['rows'] else None
+
+    def series(self) -> List[Dict]:
+        """Daftar semua seri yang tersimpan beserta metadatanya."""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for name in sorted(os.listdir(symbol_dir)):
+                meta = self.meta(symbol, name[:-1]) if name.endswith("m") else None
+                if meta:
+                    result.append({"symbol": symbol, "interval": name[:-1], **meta})
+        return result
+
+    # --- Penulisan ---
+    def append(self, symbol: str, interval: str, bars: np.ndarray) -> int:
+        """
+        Menambahkan bar (array n x COLUMNS, urutan bebas). Bar yang lebih lama dari
+        data tersimpan diabaikan; bar dengan timestamp terakhir menimpa baris terakhir.
+        Mengembalikan jumlah baris baru.
+        """
+        if bars is None or not len(bars):
+            return 0
+        bars = np.asarray(bars, dtype=np.float64)
+        # Urutkan & buang duplikat (ambil kemunculan terakhir)
+        bars = bars[np.argsort(bars[:, 0], kind='stable')]
+        keep = np.r_[bars[1:, 0] != bars[:-1, 0], True]
+        bars = bars[keep]
+
+        os.makedirs(self.series_path(symbol, interval), exist_ok=True)
+        meta = self.meta(symbol, interval) or {"symbol": symbol, "interval": interval, "rows": 0,
+                                               "first_timestamp": None, "last_timestamp": None}
+        rows = meta['rows']
+        timestamps = bars[:, 0].astype(np.int64)
+        if rows:
+            last_ts = meta['last_timestamp']
+            overwrite = timestamps == last_ts
+            if overwrite.any():
+                self._overwrite_row(symbol, interval, rows - 1, bars[overwrite][-1])
+            newer = timestamps > last_ts
+            bars, timestamps = bars[newer], timestamps[newer]
+        if not len(bars):
+            return 0
+
+        for i, col in enumerate(COLUMNS):
+            path = self._column_path(symbol, interval, col)
+            values = timestamps if col == 'timestamp' else bars[:, i]
+            with open(path, "ab") as f:
+                # Buang ekor yang tidak tercatat di meta (sisa penulisan yang terputus)
+                f.truncate(rows * COLUMN_DTYPES[col].itemsize)
+                f.write(np.ascontiguousarray(values, dtype=COLUMN_DTYPES[col]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta['rows'] = rows + len(bars)
+        meta['first_timestamp'] = meta['first_timestamp'] if rows else int(timestamps[0])
+        meta['last_timestamp'] = int(timestamps[-1])
+        self._write_meta(symbol, interval, meta)
+        return len(bars)
+
+    def _overwrite_row(self, symbol: str, interval: str, row: int, bar: np.ndarray):
+        for i, col in enumerate(COLUMNS[1:], start=1):
+            mm = np.memmap(self._column_path(symbol, interval, col), dtype=COLUMN_DTYPES[col], mode='r+',
+                           offset=row * COLUMN_DTYPES[col].itemsize, shape=(1,))
+            mm[0] = bar[i]
+            mm.flush()
+            del mm
+
+    def import_csv(self, path: str, symbol: str, interval: str) -> int:
+        """Mengimpor file CSV lama ({symbol}_{interval}m_data.csv) ke store."""
+        df = pd.read_csv(path, parse_dates=['timestamp'])
+        if 'turnover' not in df.columns:
+            df['turnover'] = np.nan
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        values = df[COLUMNS[1:]].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        return self.append(symbol, interval, np.column_stack([timestamps.astype(np.float64), values]))
+
+    # --- Pembacaan ---
+    def load(self, symbol: str, interval: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Memuat kolom sebagai array memory-map read-only (tanpa salinan), opsional
+        dibatasi rentang waktu [start, end] dalam milidetik.
+        """
+        rows = self.rows(symbol, interval)
+        if not rows:
+            return {col: np.empty(0, dtype=COLUMN_DTYPES[col]) for col in COLUMNS}
+        columns = {col: np.memmap(self._column_path(symbol, interval, col), dtype=COLUMN_DTYPES[col],
+                                  mode='r', shape=(rows,))
+                   for col in COLUMNS}
+        timestamps = columns['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = rows if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return {col: values[lo:hi] for col, values in columns.items()}
+
+    def load_frame(self, symbol: str, interval: str, start: Optional[int] = None,
+                   end: Optional[int] = None) -> pd.DataFrame:
+        """Seperti load(), tetapi dalam bentuk DataFrame dengan kolom timestamp datetime."""
+        columns = self.load(symbol, interval, start, end)
+        df = pd.DataFrame({col: np.asarray(columns[col]) for col in COLUMNS[1:]})
+        df.insert(0, 'timestamp', pd.to_datetime(np.asarray(columns['timestamp']), unit='ms'))
+        return df
@@ -0,0 +1,249 @@
+# market_stream.py
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+import websocket
+
+from api_clients import (
+    LIVE_BARS, PriceSnapshot, _bars_to_frame, interval_to_ms,
+    get_cached_historical_data, get_kline_buffer,
+)
+from bar_service import BASE_INTERVAL
+
+BYBIT_PUBLIC_WS_URL = "wss://stream.bybit.com/v5/public/linear"
+SUBSCRIBE_BATCH_SIZE = 10    # jumlah topik per pesan subscribe
+HEARTBEAT_INTERVAL = 20      # Bybit menyarankan ping setiap 20 detik
+HEARTBEAT_TIMEOUT = 60       # tanpa pesan apa pun (termasuk pong) selama ini -> koneksi dianggap mati
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+
+class MarketDataStream:
+    """
+    Feed data pasar berbasis WebSocket (push) untuk topik kline.<interval> dan tickers.
+    - Bar disimpan di ring buffer k-line yang sama dengan api_clients, jadi
+      make_decision bisa memakai data tanpa request REST tambahan.
+    - on_candle_close(symbol) dipanggil saat Bybit mengirim bar dengan confirm=true.
+    - on_tick(symbol, price) dipanggil untuk setiap update lastPrice.
+    - Koneksi otomatis tersambung ulang (backoff eksponensial) dan semua topik
+      di-subscribe ulang. Koneksi yang diam lebih dari heartbeat_timeout detik
+      (pong pun tidak datang) ditutup paksa lalu disambung ulang.
+    - klines=False hanya men-subscribe tickers (mis. pemantau SL/TP di luar engine stream).
+    `url` bisa diarahkan ke server lokal yang memutar ulang pesan rekaman, dan
+    handle_message() bisa dipanggil langsung dengan pesan mentah.
+    """
+
+    def __init__(self, on_candle_close: Optional[Callable[[str], None]] = None,
+                 on_tick: Optional[Callable[[str, float], None]] = None,
+                 url: str = BYBIT_PUBLIC_WS_URL, interval: str = '1',
+                 record_path: Optional[str] = None, klines: bool = True,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL, heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+                 reconnect_delay: float = RECONNECT_DELAY):
+        self.url = url
+        self.interval = interval
+        self.klines = klines
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.reconnect_delay = reconnect_delay
+        self._last_message = time.monotonic()
+        self.on_candle_close = on_candle_close
+        self.on_tick = on_tick
+        self._symbols: set = set()
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ws: Optional[websocket.WebSocketApp] = None
+        self._connected = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._record_file = open(record_path, "a", encoding="utf-8") if record_path else None
+
+    # --- Subscription ---
+    def _topics(self, symbols: Iterable[str]) -> List[str]:
+        topics = []
+        for symbol in sorted(symbols):
+            if self.klines:
+                topics.append(f"kline.{self.interval}.{symbol}")
+            topics.append(f"tickers.{symbol}")
+        return topics
+
+    def _send_op(self, op: str, topics: List[str]):
+        if not topics or not self._connected.is_set():
+            return
+        for i in range(0, len(topics), SUBSCRIBE_BATCH_SIZE):
+            try:
+                self._ws.send(json.dumps({"op": op, "args": topics[i:i + SUBSCRIBE_BATCH_SIZE]}))
+            except Exception as e:
+                print(f"⚠️ Gagal mengirim {op} WebSocket: {e}")
+                return
+
+    def set_symbols(self, symbols: Iterable[str]):
+        """Menyamakan daftar simbol yang di-subscribe (subscribe baru, unsubscribe yang hilang)."""
+        symbols = set(symbols)
+        with self._lock:
+            added = symbols - self._symbols
+            removed = self._symbols - symbols
+            self._symbols = symbols
+            for symbol in removed:
+                self._tickers.pop(symbol, None)
+        self._send_op("unsubscribe", self._topics(removed))
+        self._send_op("subscribe", self._topics(added))
+
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._symbols)
+
+    # --- Koneksi ---
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+        threading.Thread(target=self._heartbeat, name="market-stream-ping", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._ws:
+            self._ws.close()
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=lambda ws, message: self.handle_message(message),
+                on_error=lambda ws, error: print(f"⚠️ Error WebSocket: {error}"),
+                on_close=lambda ws, code, msg: self._connected.clear(),
+            )
+            opened_at = time.monotonic()
+            # ping_timeout di websocket-client juga menjadi batas select(): tanpa itu run_forever
+            # tidak pernah bangun setelah close() dari thread heartbeat/stop pada socket yang diam
+            self._ws.run_forever(ping_timeout=self.heartbeat_interval)
+            self._connected.clear()
+            if self._stopped.is_set():
+                break
+            # Reset backoff jika koneksi sebelumnya sempat stabil
+            delay = self.reconnect_delay if time.monotonic() - opened_at > MAX_RECONNECT_DELAY else min(delay * 2, MAX_RECONNECT_DELAY)
+            print(f"🔌 WebSocket terputus, menyambung ulang dalam {delay:.0f} detik...")
+            self._stopped.wait(delay)
+
+    def _on_open(self, ws):
+        print("🔌 WebSocket tersambung, subscribe ulang semua topik...")
+        self._last_message = time.monotonic()
+        self._connected.set()
+        self._send_op("subscribe", self._topics(self.symbols))
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            if not self._connected.is_set():
+                continue
+            if time.monotonic() - self._last_message > self.heartbeat_timeout:
+                # Socket setengah terbuka: run_forever tidak akan selesai sendiri tanpa close()
+                print(f"💔 Tidak ada pesan WebSocket selama {self.heartbeat_timeout:.0f} detik, menyambung ulang...")
+                self._connected.clear()
+                self._ws.close()
+                continue
+            try:
+                self._ws.send(json.dumps({"op": "ping"}))
+            except Exception:
+                pass
+
+    # --- Pemrosesan Pesan ---
+    def handle_message(self, message: str):
+        """Memproses satu pesan mentah dari Bybit (atau dari rekaman)."""
+        self._last_message = time.monotonic()
+        if self._record_file:
+            self._record_file.write(message.rstrip("\n") + "\n")
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+        topic = msg.get("topic", "")
+        if topic.startswith("kline."):
+            self._handle_kline(topic.rsplit(".", 1)[-1], msg.get("data", []))
+        elif topic.startswith("tickers."):
+            self._handle_ticker(topic.split(".", 1)[1], msg.get("data", {}))
+        elif msg.get("op") == "subscribe" and not msg.get("success", True):
+            print(f"⚠️ Subscribe WebSocket gagal: {msg.get('ret_msg')}")
+
+    def _handle_kline(self, symbol: str, bars: List[Dict[str, Any]]):
+        if not bars:
+            return
+        rows = np.array([[float(b['start']), float(b['open']), float(b['high']), float(b['low']),
+                          float(b['close']), float(b['volume']), float(b['turnover'])] for b in bars])
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        buffer = get_kline_buffer(symbol, self.interval)
+        with buffer.lock:
+            buffer.extend(rows)
+        if self.interval == BASE_INTERVAL:
+            LIVE_BARS.ingest(symbol, rows)  # agregat 3m/5m/15m/... ikut diperbarui dari push 1m
+        if self.on_candle_close and any(b.get('confirm') for b in bars):
+            self.on_candle_close(symbol)
+
+    def _handle_ticker(self, symbol: str, data: Dict[str, Any]):
+        # Pesan "snapshot" berisi semua field, "delta" hanya field yang berubah
+        with self._lock:
+            ticker = self._tickers.setdefault(symbol, {"symbol": symbol})
+            ticker.update(data)
+        if self.on_tick and 'lastPrice' in data:
+            try:
+                price = float(data['lastPrice'])
+            except (TypeError, ValueError):
+                return
+            self.on_tick(symbol, price)
+
+    # --- Akses Data ---
+    def last_price(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+        try:
+            return float(ticker['lastPrice']) if ticker else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def snapshot(self) -> PriceSnapshot:
+        """Snapshot harga dari data ticker yang sudah diterima lewat stream."""
+        with self._lock:
+            tickers = [dict(t) for t in self._tickers.values()]
+        return PriceSnapshot(tickers)
+
+    def get_bars(self, symbol: str, limit: int = 50) -> Optional[pd.DataFrame]:
+        """
+        Jendela `limit` bar terakhir dari memori. Jika bar belum lengkap atau ada
+        celah (mis. setelah reconnect), ambil bar yang hilang lewat REST. Celah di
+        tengah buffer tidak bisa ditambal plan_fetch (hanya mengambil bar setelah bar
+        terakhir), jadi buffer dikosongkan dan jendela penuh diambil ulang.
+        Mengembalikan None jika jendela dari REST pun masih berlubang.
+        """
+        step = interval_to_ms(self.interval)
+        buffer = get_kline_buffer(symbol, self.interval)
+        with buffer.lock:
+            bars = buffer.view(limit)
+            contiguous = _is_contiguous(bars, step)
+            if contiguous and len(bars) == limit:
+                return _bars_to_frame(bars)
+            if not contiguous:
+                buffer.clear()
+        data = get_cached_historical_data(symbol, self.interval, limit)
+        if data is None:
+            return None
+        timestamps = data['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        if not _is_contiguous(timestamps[:, None], step):
+            print(f"⚠️ Data k-line {symbol} masih berlubang setelah diambil ulang, evaluasi dilewati.")
+            return None
+        return data
+
+
+def _is_contiguous(bars: np.ndarray, step: int) -> bool:
+    """True jika timestamp (kolom 0) naik tepat satu interval per bar."""
+    return bool(np.all(np.diff(bars[:, 0]) == step))
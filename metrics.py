@@ -0,0 +1,260 @@
+# metrics.py — Metrik latensi & throughput dalam format teks Prometheus
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Seluruh instrumentasi memeriksa flag ini lebih dulu; saat False tidak ada yang dicatat
+ENABLED = False
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOCK_WAIT_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+DEFAULT_PORT = 9108
+DEFAULT_FLUSH_SECONDS = 15.0
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != float('inf') else "+Inf"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines += self._samples()
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Summary(_Metric):
+    """Hanya _sum dan _count (tanpa kuantil); murah untuk label berkardinalitas tinggi seperti simbol."""
+    kind = "summary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            stats = self._values.setdefault(key, [0.0, 0])
+            stats[0] += value
+            stats[1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (total, count) in self._values.items():
+            labels = _format_labels(self.labelnames, key)
+            lines += [f"{self.name}_sum{labels} {_format_value(total)}", f"{self.name}_count{labels} {count}"]
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            stats = self._values.get(key)
+            if stats is None:
+                stats = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            stats[0][index] += 1
+            stats[1] += value
+            stats[2] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines += [f"{self.name}_sum{labels} {_format_value(total)}", f"{self.name}_count{labels} {count}"]
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+# --- Metrik Agent ---
+API_REQUEST_SECONDS = Histogram("api_request_duration_seconds", "Latensi request REST Bybit per endpoint.",
+                                ("endpoint",))
+API_ERRORS = Counter("api_request_errors_total", "Request REST Bybit yang gagal per endpoint dan jenis error.",
+                     ("endpoint", "kind"))
+DECISION_SECONDS = Histogram("decision_duration_seconds", "Durasi make_decision (termasuk data k-line).")
+DECISION_SYMBOL_SECONDS = Summary("decision_symbol_duration_seconds", "Durasi make_decision per simbol.",
+                                  ("symbol",))
+CYCLE_SECONDS = Histogram("cycle_duration_seconds", "Durasi satu siklus loop trading.", ("engine",))
+SYMBOLS_PER_SECOND = Gauge("cycle_symbols_per_second", "Jumlah simbol yang dianalisis per detik pada siklus terakhir.",
+                           ("engine",))
+LOCK_WAIT_SECONDS = Histogram("lock_wait_seconds", "Waktu menunggu lock sebelum berhasil diambil.", ("lock",),
+                              buckets=LOCK_WAIT_BUCKETS)
+
+
+def render() -> str:
+    """Semua metrik dalam format teks eksposisi Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# --- Lock Terinstrumentasi ---
+class InstrumentedLock:
+    """Pengganti threading.Lock yang mencatat lama menunggu acquire ke LOCK_WAIT_SECONDS."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            LOCK_WAIT_SECONDS.observe(0.0, lock=self.name)
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - started, lock=self.name)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+def instrumented_lock(name: str):
+    """Lock biasa saat metrik mati (tanpa overhead sama sekali), InstrumentedLock saat aktif."""
+    return InstrumentedLock(name) if ENABLED else threading.Lock()
+
+
+# --- Eksposisi ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _flush_loop(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(render())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Gagal menulis metrik ke {path}: {e}")
+
+
+def configure(settings: Optional[Dict[str, Any]]):
+    """
+    Mengaktifkan/mematikan metrik sesuai bagian `metrics` di settings.json. Harus
+    dipanggil sebelum lock terinstrumentasi dibuat; tidak memulai eksporter.
+    """
+    global ENABLED
+    ENABLED = bool((settings or {}).get("enabled", False))
+
+
+def start_exporter(settings: Optional[Dict[str, Any]]):
+    """
+    Mengekspos metrik jika aktif: {"port": 9108} untuk endpoint HTTP /metrics di
+    localhost, dan/atau {"file": "metrics.prom", "flush_seconds": 15} untuk file
+    yang ditulis ulang secara atomik secara berkala.
+    """
+    if not ENABLED:
+        return
+    settings = settings or {}
+    port = settings.get("port", DEFAULT_PORT)
+    if port:
+        server = ThreadingHTTPServer((settings.get("host", "127.0.0.1"), port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📊 Metrik tersedia di http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    if settings.get("file"):
+        interval = settings.get("flush_seconds", DEFAULT_FLUSH_SECONDS)
+        threading.Thread(target=_flush_loop, name="metrics-file", daemon=True,
+                         args=(settings["file"], interval)).start()
+        print(f"📊 Metrik ditulis ke {settings['file']} setiap {interval} detik")
@@ -0,0 +1,144 @@
+# position_book.py — Buku posisi terbuka dengan snapshot immutable berversi (copy-on-write)
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+POSITION_FIELDS = ("symbol", "side", "entry_price", "size", "margin", "stop_loss_price", "take_profit_price")
+FLOAT_FIELDS = frozenset(POSITION_FIELDS[2:])
+
+
+class Position:
+    """Satu posisi terbuka. Dianggap immutable setelah dibuat: perubahan = ganti record di book."""
+    __slots__ = POSITION_FIELDS
+
+    def __init__(self, symbol: str, side: str, entry_price: float, size: float, margin: float,
+                 stop_loss_price: float, take_profit_price: float):
+        self.symbol = symbol
+        self.side = side
+        self.entry_price = entry_price
+        self.size = size
+        self.margin = margin
+        self.stop_loss_price = stop_loss_price
+        self.take_profit_price = take_profit_price
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Position":
+        """Dari dict jurnal/CSV; kolom angka dikonversi ke float, kolom tak dikenal diabaikan."""
+        return cls(**{field: float(data[field]) if field in FLOAT_FIELDS else data[field]
+                      for field in POSITION_FIELDS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in POSITION_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"Position({self.symbol} {self.side} @ {self.entry_price})"
+
+
+class BookSnapshot:
+    """
+    Tampilan read-only atas isi book pada satu versi. Tidak pernah berubah setelah
+    diterbitkan, sehingga bisa dibaca dari thread mana pun tanpa lock. Mendukung
+    operasi baca seperti dict: `in`, len, iterasi simbol, get, items, keys, values.
+    """
+    __slots__ = ("version", "_positions")
+
+    def __init__(self, version: int, positions: Dict[str, Position]):
+        self.version = version
+        self._positions = positions
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __getitem__(self, symbol: str) -> Position:
+        return self._positions[symbol]
+
+    def get(self, symbol: str, default: Optional[Position] = None) -> Optional[Position]:
+        return self._positions.get(symbol, default)
+
+    def keys(self):
+        return self._positions.keys()
+
+    def values(self):
+        return self._positions.values()
+
+    def items(self):
+        return self._positions.items()
+
+    def to_dicts(self) -> Dict[str, Dict[str, Any]]:
+        """Serialisasi seluruh isi snapshot sekaligus (untuk jurnal, feed, dan file status)."""
+        return {symbol: pos.to_dict() for symbol, pos in self._positions.items()}
+
+    def to_rows(self) -> List[Tuple[Any, ...]]:
+        """Satu tuple per posisi dengan urutan kolom POSITION_FIELDS (untuk CSV)."""
+        return [tuple(getattr(pos, field) for field in POSITION_FIELDS) for pos in self._positions.values()]
+
+
+class PositionBook:
+    """
+    Posisi terbuka per simbol dengan pembaca tanpa lock:
+    - snapshot() hanya membaca satu atribut; hasilnya immutable dan tetap konsisten
+      walau book berubah sesudahnya.
+    - Penulis (add/pop/load) menyalin dict internal, mengubah salinannya, lalu
+      menerbitkan snapshot baru dengan versi +1 (copy-on-write). Posisi dibuka/ditutup
+      jauh lebih jarang daripada dibaca, jadi biaya salinan hanya ada di jalur tulis.
+    Membaca langsung dari book (`in`, len, get) sama dengan membaca snapshot terbaru.
+    """
+
+    def __init__(self, positions: Optional[Iterable[Position]] = None):
+        self._write_lock = threading.Lock()
+        self._current = BookSnapshot(0, {pos.symbol: pos for pos in positions or ()})
+
+    def snapshot(self) -> BookSnapshot:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._current
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def get(self, symbol: str) -> Optional[Position]:
+        return self._current.get(symbol)
+
+    def symbols(self) -> List[str]:
+        return list(self._current.keys())
+
+    def _publish(self, positions: Dict[str, Position]):
+        self._current = BookSnapshot(self._current.version + 1, positions)
+
+    def add(self, position: Position) -> bool:
+        """Menambahkan posisi; False jika simbol sudah punya posisi terbuka."""
+        with self._write_lock:
+            if position.symbol in self._current:
+                return False
+            positions = dict(self._current._positions)
+            positions[position.symbol] = position
+            self._publish(positions)
+            return True
+
+    def pop(self, symbol: str) -> Optional[Position]:
+        """Menghapus dan mengembalikan posisi simbol (None jika tidak ada)."""
+        with self._write_lock:
+            position = self._current.get(symbol)
+            if position is None:
+                return None
+            positions = dict(self._current._positions)
+            del positions[symbol]
+            self._publish(positions)
+            return position
+
+    def load(self, positions: Dict[str, Dict[str, Any]]):
+        """Mengganti seluruh isi book dari dict serialisasi (mis. hasil StateJournal.recover())."""
+        records = {symbol: Position.from_dict({**data, "symbol": data.get("symbol", symbol)})
+                   for symbol, data in positions.items()}
+        with self._write_lock:
+            self._publish(records)
@@ -0,0 +1,109 @@
+# risk_engine.py — Evaluasi SL/TP semua posisi terbuka secara vektor pada setiap update harga
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from position_book import BookSnapshot, Position, PositionBook
+
+STOP_LOSS = "Stop Loss"
+TAKE_PROFIT = "Take Profit"
+
+ExitEvent = Tuple[str, float, str]  # (simbol, harga, alasan)
+
+
+class RiskEngine:
+    """
+    Menyimpan arah, stop loss, dan take profit semua posisi di book sebagai array
+    NumPy dan membandingkan seluruhnya dengan harga baru dalam satu operasi vektor.
+    - Array dibangun ulang hanya saat versi PositionBook berubah (posisi dibuka/ditutup).
+    - Setiap posisi hanya memicu satu event; on_exit(simbol, harga, alasan) dipanggil
+      di luar lock, mis. main.close_position.
+    - LONG kena SL jika harga <= SL dan TP jika harga >= TP (SHORT sebaliknya);
+      SL didahulukan jika keduanya kena.
+    """
+
+    def __init__(self, book: PositionBook, on_exit: Optional[Callable[[str, float, str], None]] = None):
+        self.book = book
+        self.on_exit = on_exit
+        self._lock = threading.Lock()
+        self._version = -1
+        self._positions: List[Position] = []
+        self._symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._direction = np.empty(0)  # +1 LONG, -1 SHORT
+        self._stop = np.empty(0)
+        self._target = np.empty(0)
+        self._fired = np.empty(0, dtype=bool)
+
+    def _sync(self) -> BookSnapshot:
+        snapshot = self.book.snapshot()
+        if snapshot.version != self._version:
+            positions = list(snapshot.values())
+            fired = {pos for pos, done in zip(self._positions, self._fired) if done}
+            self._positions = positions
+            self._symbols = [pos.symbol for pos in positions]
+            self._index = {symbol: i for i, symbol in enumerate(self._symbols)}
+            self._direction = np.array([1.0 if pos.side == 'LONG' else -1.0 for pos in positions])
+            self._stop = np.array([pos.stop_loss_price for pos in positions], dtype=float)
+            self._target = np.array([pos.take_profit_price for pos in positions], dtype=float)
+            # Event yang sudah dikirim tetap ditandai sampai record posisinya hilang dari book
+            self._fired = np.array([pos in fired for pos in positions], dtype=bool)
+            self._version = snapshot.version
+        return snapshot
+
+    def _evaluate(self, index: np.ndarray, prices: np.ndarray) -> List[ExitEvent]:
+        direction = self._direction[index]
+        stop_hit = direction * (prices - self._stop[index]) <= 0
+        target_hit = direction * (prices - self._target[index]) >= 0
+        hit = (stop_hit | target_hit) & ~self._fired[index]  # harga NaN tidak pernah memicu
+        if not hit.any():
+            return []
+        positions = np.flatnonzero(hit)
+        # Simbol yang muncul beberapa kali dalam satu batch hanya memicu satu event (tick pertama yang kena)
+        _, first = np.unique(index[positions], return_index=True)
+        positions = positions[np.sort(first)]
+        self._fired[index[positions]] = True
+        return [(self._symbols[index[k]], float(prices[k]), STOP_LOSS if stop_hit[k] else TAKE_PROFIT)
+                for k in positions]
+
+    def _emit(self, events: List[ExitEvent]) -> List[ExitEvent]:
+        if self.on_exit:
+            for symbol, price, reason in events:
+                self.on_exit(symbol, price, reason)
+        return events
+
+    def on_tick(self, symbol: str, price: float) -> List[ExitEvent]:
+        """Satu update harga (mis. dari WebSocket). Simbol tanpa posisi hanya biaya lookup dict."""
+        with self._lock:
+            self._sync()
+            i = self._index.get(symbol)
+            if i is None or not price:
+                return []
+            events = self._evaluate(np.array([i]), np.array([price], dtype=float))
+        return self._emit(events)
+
+    def update_prices(self, symbols: Iterable[str], prices: Iterable[float]) -> List[ExitEvent]:
+        """Sekumpulan update harga sekaligus; simbol tanpa posisi diabaikan."""
+        with self._lock:
+            self._sync()
+            pairs = [(self._index[s], p) for s, p in zip(symbols, prices) if s in self._index and p]
+            if not pairs:
+                return []
+            index, values = zip(*pairs)
+            events = self._evaluate(np.array(index), np.array(values, dtype=float))
+        return self._emit(events)
+
+    def check_prices(self, prices: Mapping[str, Optional[float]]) -> List[ExitEvent]:
+        """Semua posisi terhadap peta harga (mis. snapshot ticker); posisi tanpa harga dilewati."""
+        with self._lock:
+            self._sync()
+            values = np.array([prices.get(symbol) or np.nan for symbol in self._symbols], dtype=float)
+            events = self._evaluate(np.arange(len(self._symbols)), values)
+        return self._emit(events)
+
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            self._sync()
+            return list(self._symbols)
@@ -0,0 +1,311 @@
+# sharded_engine.py — Pemindaian universe koin yang dibagi ke beberapa proses worker
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+DEFAULT_THREADS_PER_WORKER = 4
+CONNECT_TIMEOUT = 30.0  # detik; batas worker baru tersambung balik ke coordinator
+SCAN_TIMEOUT = 60.0     # detik; batas semua shard membalas satu siklus scan
+ScanResult = Tuple[str, str, str]  # (simbol, keputusan, pesan)
+
+
+def shard_for(symbol: str, n_shards: int) -> int:
+    """Shard stabil untuk simbol (crc32, sama di semua proses/host), jadi cache k-line worker tetap hangat."""
+    return zlib.crc32(symbol.encode("utf-8")) % n_shards
+
+
+def partition(symbols: Sequence[str], n_shards: int) -> List[List[str]]:
+    shards: List[List[str]] = [[] for _ in range(n_shards)]
+    for symbol in symbols:
+        shards[shard_for(symbol, n_shards)].append(symbol)
+    return shards
+
+
+# --- Sisi Worker ---
+class ShardScanner:
+    """
+    Logika satu worker: mengambil k-line dan mengevaluasi simbol di shard-nya
+    (dengan CandleScheduler), tanpa state trading. Keputusan GO_* hanya berupa
+    permintaan entry; coordinator yang memutuskan apakah posisi benar-benar dibuka.
+    """
+
+    def __init__(self, threads: int = DEFAULT_THREADS_PER_WORKER, use_scheduler: bool = True,
+                 interval: str = '1'):
+        from candle_scheduler import CandleScheduler
+        self.interval = interval
+        self.scheduler = CandleScheduler(interval)
+        self.use_scheduler = use_scheduler
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def _evaluate(self, symbol: str, price: float, open_symbols: frozenset, now_ms: int) -> ScanResult:
+        from api_clients import get_resampled_data
+        from strategy import REASON_HAS_POSITION, REASON_TEMPLATES
+        if symbol in open_symbols:
+            return symbol, "HOLD", REASON_TEMPLATES[REASON_HAS_POSITION].format(symbol=symbol)
+        if self.use_scheduler and not self.scheduler.should_evaluate(symbol, price, now_ms):
+            return symbol, "HOLD", ""
+        data = get_resampled_data(symbol, self.interval, 50)
+        decision, msg = self.scheduler.decide(symbol, open_symbols, data)
+        return (symbol, decision, msg)
+
+    def scan(self, request: Dict[str, Any]) -> List[ScanResult]:
+        open_symbols = frozenset(request['open_symbols'])
+        now_ms = int(request['now'] * 1000)
+        prices = request['prices']
+        return list(self.executor.map(lambda s: self._evaluate(s, prices[s], open_symbols, now_ms),
+                                      request['symbols']))
+
+
+def worker_main(address: Any, authkey: bytes, worker_id: int, settings: Dict[str, Any],
+                threads: int = DEFAULT_THREADS_PER_WORKER, use_scheduler: bool = True,
+                session_factory: Optional[Callable[[], Any]] = None):
+    """
+    Titik masuk proses worker. Tersambung ke coordinator lewat
+    multiprocessing.connection (Unix socket atau TCP), jadi worker yang sama bisa
+    dijalankan dari host lain dengan alamat dan authkey coordinator.
+    """
+    config.set_settings(settings)
+    if session_factory is not None:
+        config.set_bybit_session(session_factory())
+    scanner = ShardScanner(threads, use_scheduler, settings.get('trading_settings', {}).get('interval', '1'))
+    with Client(address, authkey=authkey) as conn:
+        conn.send({"type": "hello", "worker": worker_id, "pid": os.getpid()})
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request['type'] == "stop":
+                break
+            try:
+                conn.send({"type": "result", "cycle": request['cycle'], "results": scanner.scan(request)})
+            except Exception as e:
+                conn.send({"type": "error", "cycle": request['cycle'], "error": repr(e)})
+
+
+# --- Sisi Coordinator ---
+class ShardCoordinator:
+    """
+    Membagi daftar simbol setiap siklus ke N worker (shard crc32 stabil), mengirim
+    harga snapshot dan daftar posisi terbuka, lalu menggabungkan hasilnya dalam
+    urutan simbol semula. Coordinator tidak memegang state trading; pemanggil
+    (main.run_sharded_loop) yang mengelola saldo, posisi, batas posisi, dan cooldown.
+    - Koneksi worker diterima thread acceptor; worker yang dijalankan ulang tidak
+      ditunggu di dalam scan(), shard-nya ERROR sampai worker tersambung (siklus
+      berikutnya), jadi satu shard yang mati tidak menahan siklus.
+    - Worker yang mati, gagal tersambung dalam connect_timeout, atau tidak membalas
+      dalam scan_timeout dijalankan ulang.
+    - Setiap request dan balasan membawa nomor siklus; balasan dari siklus lama dibuang.
+    """
+
+    def __init__(self, workers: int, settings: Dict[str, Any], threads_per_worker: int = DEFAULT_THREADS_PER_WORKER,
+                 use_scheduler: bool = True, session_factory: Optional[Callable[[], Any]] = None,
+                 address: Any = None, authkey: Optional[bytes] = None,
+                 connect_timeout: float = CONNECT_TIMEOUT, scan_timeout: float = SCAN_TIMEOUT):
+        self.n_workers = max(1, workers)
+        self.connect_timeout = connect_timeout
+        self.scan_timeout = scan_timeout
+        self.address = address  # None = Unix socket sementara; (host, port) agar worker bisa dari host lain
+        self.settings = settings
+        self.threads_per_worker = threads_per_worker
+        self.use_scheduler = use_scheduler
+        self.session_factory = session_factory
+        self._authkey = authkey or os.urandom(16)
+        self._context = multiprocessing.get_context("spawn")
+        self._listener: Optional[Listener] = None
+        self._acceptor: Optional[threading.Thread] = None
+        self._closing = False
+        self._conns: Dict[int, Connection] = {}
+        self._processes: Dict[int, Any] = {}
+        # Worker yang sedang dijalankan: (proses, waktu mulai) dan koneksi yang sudah menyapa
+        self._starting: Dict[int, Tuple[Any, float]] = {}
+        self._arrived: Dict[int, Connection] = {}
+        self._cond = threading.Condition()
+        self._cycle = 0
+
+    def start(self):
+        if self.address is not None:
+            self._listener = Listener(self.address, authkey=self._authkey)
+        elif hasattr(socket, "AF_UNIX"):
+            self._listener = Listener(family="AF_UNIX", authkey=self._authkey)
+        else:
+            self._listener = Listener(("127.0.0.1", 0), authkey=self._authkey)
+        self._closing = False
+        self._acceptor = threading.Thread(target=self._accept_loop, name="shard-acceptor", daemon=True)
+        self._acceptor.start()
+        for worker_id in range(self.n_workers):
+            self._spawn(worker_id)
+        for worker_id in range(self.n_workers):
+            self._collect(worker_id, self.connect_timeout)
+        print(f"🧩 {len(self._conns)}/{self.n_workers} worker shard aktif "
+              f"(PID {', '.join(str(p.pid) for p in self._processes.values())})")
+
+    def _accept_loop(self):
+        """Thread acceptor: menerima koneksi masuk dan mencocokkan salamnya dengan worker yang sedang dijalankan."""
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self._closing:
+                    return
+                continue
+            if self._closing:
+                conn.close()
+                return
+            try:
+                hello = conn.recv() if conn.poll(self.connect_timeout) else {}
+            except (EOFError, OSError):
+                hello = {}
+            with self._cond:
+                starting = self._starting.get(hello.get('worker'))
+                if starting is None or starting[0].pid != hello.get('pid'):
+                    conn.close()  # salam dari worker lama yang sudah diganti, atau bukan worker
+                    continue
+                self._arrived[hello['worker']] = conn
+                self._cond.notify_all()
+
+    def _spawn(self, worker_id: int):
+        """Menjalankan proses worker tanpa menunggu; koneksinya diambil _collect()."""
+        process = self._context.Process(
+            target=worker_main, name=f"shard-worker-{worker_id}", daemon=True,
+            args=(self._listener.address, self._authkey, worker_id, self.settings, self.threads_per_worker,
+                  self.use_scheduler, self.session_factory))
+        process.start()
+        with self._cond:
+            self._starting[worker_id] = (process, time.monotonic())
+
+    def _collect(self, worker_id: int, timeout: float = 0.0) -> bool:
+        """
+        Memindahkan worker yang sudah tersambung ke daftar aktif, menunggu paling lama
+        `timeout` detik. Worker yang mati atau melewati connect_timeout dihentikan
+        (False; dijalankan ulang pada siklus berikutnya).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if worker_id not in self._starting:
+                    return worker_id in self._conns
+                process, started = self._starting[worker_id]
+                conn = self._arrived.pop(worker_id, None)
+                if conn is not None:
+                    del self._starting[worker_id]
+                    self._conns[worker_id] = conn
+                    self._processes[worker_id] = process
+                    return True
+                if not process.is_alive() or time.monotonic() - started >= self.connect_timeout:
+                    del self._starting[worker_id]
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.2))
+        process.kill()
+        process.join()
+        print(f"⚠️ Worker shard {worker_id} tidak tersambung dalam {self.connect_timeout:.0f} detik "
+              f"(exit code: {process.exitcode})")
+        return False
+
+    def _restart(self, worker_id: int, reason: str = "mati"):
+        """Menghentikan worker lalu menjalankannya lagi tanpa menunggu koneksinya."""
+        print(f"⚠️ Worker shard {worker_id} {reason}, menjalankan ulang...")
+        conn = self._conns.pop(worker_id, None)
+        if conn is not None:
+            conn.close()
+        process = self._processes.pop(worker_id, None)
+        if process is not None:
+            process.kill()
+            process.join()
+        self._spawn(worker_id)
+
+    def _ready(self, worker_id: int) -> bool:
+        """True jika worker siap menerima scan; worker yang belum jalan dijalankan tanpa menunggu."""
+        if worker_id in self._conns or self._collect(worker_id):
+            return True
+        if worker_id not in self._starting:
+            self._spawn(worker_id)
+        return False
+
+    def _receive(self, worker_id: int, deadline: float) -> Optional[Dict[str, Any]]:
+        """Balasan worker untuk siklus berjalan; None (worker dijalankan ulang) jika mati atau melewati batas."""
+        conn = self._conns[worker_id]
+        while True:
+            try:
+                if not conn.poll(max(0.0, deadline - time.monotonic())):
+                    self._restart(worker_id, f"tidak membalas dalam {self.scan_timeout:.0f} detik")
+                    return None
+                reply = conn.recv()
+            except (EOFError, OSError):
+                self._restart(worker_id)
+                return None
+            if reply.get('cycle') == self._cycle:
+                return reply
+            # Balasan siklus sebelumnya (mis. request yang tertinggal) tidak boleh dipakai untuk harga sekarang
+
+    def scan(self, symbols: Sequence[str], prices: Dict[str, float], open_symbols: Sequence[str],
+             now: float) -> List[ScanResult]:
+        self._cycle += 1
+        shards = partition(symbols, self.n_workers)
+        pending = []
+        for worker_id, shard in enumerate(shards):
+            if not shard or not self._ready(worker_id):
+                continue  # worker belum tersambung; shard-nya ERROR siklus ini
+            request = {"type": "scan", "cycle": self._cycle, "symbols": shard, "now": now,
+                       "prices": {s: prices[s] for s in shard}, "open_symbols": list(open_symbols)}
+            try:
+                self._conns[worker_id].send(request)
+                pending.append(worker_id)
+            except OSError:
+                self._restart(worker_id)
+
+        results: Dict[str, ScanResult] = {}
+        deadline = time.monotonic() + self.scan_timeout
+        for worker_id in pending:
+            reply = self._receive(worker_id, deadline)
+            if reply is None:
+                continue
+            if reply['type'] == "error":
+                print(f"⚠️ Worker shard {worker_id} gagal: {reply['error']}")
+                continue
+            results.update((r[0], tuple(r)) for r in reply['results'])
+        return [results.get(s, (s, "ERROR", f"Worker shard gagal untuk {s}")) for s in symbols]
+
+    def stop(self):
+        for conn in self._conns.values():
+            try:
+                conn.send({"type": "stop"})
+            except OSError:
+                pass
+            conn.close()
+        with self._cond:
+            starting = [process for process, _ in self._starting.values()]
+            for conn in self._arrived.values():
+                conn.close()
+            self._starting.clear()
+            self._arrived.clear()
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        for process in starting:
+            process.kill()
+            process.join()
+        self._conns.clear()
+        self._processes.clear()
+        if self._listener is not None:
+            self._closing = True
+            try:
+                # accept() yang sedang memblok tidak selalu bangun saat listener ditutup; bangunkan dengan koneksi kosong
+                Client(self._listener.address, authkey=self._authkey).close()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                pass
+            self._acceptor.join(timeout=5)
+            self._listener.close()
+            self._listener = None
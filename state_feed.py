@@ -0,0 +1,205 @@
+# state_feed.py — Feed state agent ke dashboard lewat Unix domain socket lokal
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+FEED_SOCKET = "agent_feed.sock"
+SEND_BUFFER_BYTES = 1 << 20
+MAX_PENDING_MESSAGES = 1000
+RECENT_TRADES_CAPACITY = 100
+RECONNECT_DELAY_SECONDS = 1.0
+CACHED_TYPES = ("state", "prices")  # dikirim ulang ke subscriber yang baru tersambung
+
+
+def _encode(message_type: str, ts: float, payload: Dict[str, Any]) -> bytes:
+    message = {"type": message_type, "ts": ts, **payload}
+    return (json.dumps(message, default=float) + "\n").encode("utf-8")
+
+
+class StateFeedPublisher:
+    """
+    Sisi agent: menyiarkan pesan JSON per baris (saldo/posisi, snapshot harga, trade)
+    ke semua subscriber yang tersambung ke Unix socket.
+    - publish() tidak pernah memblok loop trading: pesan hanya dimasukkan ke antrean
+      (dibuang jika antrean penuh), lalu di-encode dan dikirim oleh thread terpisah.
+      Payload tidak boleh diubah lagi oleh pemanggil setelah publish().
+    - Socket klien non-blocking; subscriber yang terlalu lambat (buffer kirim penuh)
+      diputus dan boleh tersambung lagi kapan saja.
+    - Subscriber baru langsung menerima state dan snapshot harga terakhir.
+    Tanpa start() (mis. feed dimatikan di settings) semua publish adalah no-op.
+    """
+
+    def __init__(self, path: str = FEED_SOCKET, max_pending: int = MAX_PENDING_MESSAGES):
+        self.path = path
+        self._queue: "queue.Queue[Tuple[str, float, Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._clients: List[socket.socket] = []
+        self._clients_lock = threading.Lock()
+        self._latest: Dict[str, bytes] = {}
+        self._server: Optional[socket.socket] = None
+        self._running = False
+        self.dropped = 0
+
+    def start(self) -> bool:
+        if not hasattr(socket, "AF_UNIX"):
+            print("⚠️ Unix socket tidak didukung di platform ini, feed state dinonaktifkan.")
+            return False
+        if os.path.exists(self.path):
+            os.remove(self.path)  # socket sisa proses sebelumnya
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        self._running = True
+        threading.Thread(target=self._accept_loop, name="state-feed-accept", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="state-feed-send", daemon=True).start()
+        print(f"📡 Feed state aktif di {self.path}")
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._running = False
+        self._server.close()
+        self._server = None
+        with self._clients_lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # --- Publish (dipanggil dari loop trading) ---
+    def publish(self, message_type: str, **payload: Any):
+        if not self._running:
+            return
+        try:
+            self._queue.put_nowait((message_type, time.time(), payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def publish_state(self, balance: float, positions: Dict[str, Dict[str, Any]]):
+        self.publish("state", balance=balance, positions=positions)
+
+    def publish_prices(self, prices: Dict[str, float]):
+        self.publish("prices", prices=prices)
+
+    def publish_trade(self, trade: Dict[str, Any]):
+        self.publish("trade", trade=trade)
+
+    # --- Thread internal ---
+    def _accept_loop(self):
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+            client.setblocking(False)
+            with self._clients_lock:
+                if self._send(client, b"".join(self._latest.values())):
+                    self._clients.append(client)
+
+    def _send_loop(self):
+        while self._running:
+            try:
+                message_type, ts, payload = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            data = _encode(message_type, ts, payload)
+            with self._clients_lock:
+                if message_type in CACHED_TYPES:
+                    self._latest[message_type] = data
+                self._clients = [client for client in self._clients if self._send(client, data)]
+
+    @staticmethod
+    def _send(client: socket.socket, data: bytes) -> bool:
+        """Kirim tanpa blok; False (dan tutup) jika klien terputus atau terlalu lambat."""
+        try:
+            client.sendall(data)
+            return True
+        except (BlockingIOError, OSError):
+            client.close()
+            return False
+
+
+class StateFeedSubscriber:
+    """
+    Sisi dashboard: thread latar yang tersambung (dan menyambung ulang) ke feed
+    agent, lalu menyimpan state terakhir, harga terakhir, dan trade terbaru.
+    wait_for_update() bisa dipakai sebagai pengganti sleep agar tampilan
+    diperbarui begitu ada pesan baru.
+    """
+
+    def __init__(self, path: str = FEED_SOCKET, trade_capacity: int = RECENT_TRADES_CAPACITY):
+        self.path = path
+        self.balance: Optional[float] = None
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self.prices: Dict[str, float] = {}
+        self.trades: Deque[Dict[str, Any]] = deque(maxlen=trade_capacity)
+        self.updated_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._updated = threading.Event()
+        self._connected = threading.Event()
+        self._stopped = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    @property
+    def has_state(self) -> bool:
+        return self.connected and self.balance is not None
+
+    def start(self) -> "StateFeedSubscriber":
+        if hasattr(socket, "AF_UNIX"):
+            threading.Thread(target=self._run, name="state-feed-subscriber", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self) -> Tuple[Optional[float], Dict[str, Dict[str, Any]], Dict[str, float]]:
+        """(saldo, posisi, harga) terakhir yang diterima dari agent."""
+        with self._lock:
+            return self.balance, dict(self.positions), dict(self.prices)
+
+    def wait_for_update(self, timeout: float) -> bool:
+        updated = self._updated.wait(timeout)
+        self._updated.clear()
+        return updated
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.path)
+                    self._connected.set()
+                    with sock.makefile("r", encoding="utf-8") as stream:
+                        for line in stream:
+                            self.handle_message(line)
+                            if self._stopped.is_set():
+                                break
+            except OSError:
+                pass
+            self._connected.clear()
+            self._stopped.wait(RECONNECT_DELAY_SECONDS)
+
+    def handle_message(self, line: str):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        with self._lock:
+            if message['type'] == "state":
+                self.balance = message['balance']
+                self.positions = message['positions']
+            elif message['type'] == "prices":
+                self.prices = message['prices']
+            elif message['type'] == "trade":
+                self.trades.append(message['trade'])
+            self.updated_at = message.get('ts')
+        self._updated.set()
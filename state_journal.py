@@ -0,0 +1,174 @@
+# state_journal.py — Jurnal state append-only (write-ahead log) untuk saldo dan posisi
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import clock
+
+STATE_DIR = "state"
+JOURNAL_FILE = "journal.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+COMPACT_EVERY = 1000  # jumlah event sebelum jurnal dipadatkan menjadi snapshot
+
+
+def write_atomic(path: str, text: str):
+    """Menulis file lewat file sementara + os.replace sehingga pembaca tidak pernah melihat file setengah jadi."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class StateJournal:
+    """
+    Menyimpan perubahan state (saldo dan posisi) sebagai event JSONL bernomor urut.
+    - record() hanya menambahkan satu baris ke buffer file; commit() melakukan satu
+      fsync untuk semua event sejak commit terakhir dan tidak melakukan apa pun jika
+      tidak ada perubahan.
+    - Setiap COMPACT_EVERY event, state lengkap ditulis atomik ke snapshot.json dan
+      jurnal dikosongkan, sehingga recover() hanya memutar ulang sedikit event
+      berapa lama pun bot sudah berjalan.
+    - Baris terakhir yang terpotong karena crash diabaikan dan dibuang saat recover(),
+      begitu juga file .tmp sisa pemadatan yang terputus.
+    """
+
+    def __init__(self, directory: str = STATE_DIR, compact_every: int = COMPACT_EVERY):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.balance: Optional[float] = None
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._pending = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_FILE)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    @property
+    def is_empty(self) -> bool:
+        """True jika belum ada state yang pernah disimpan (snapshot maupun event)."""
+        return self._seq == 0 and self.balance is None
+
+    # --- Pemulihan ---
+    def _apply(self, event: Dict[str, Any]):
+        self.balance = event['balance']
+        if event['type'] == 'open':
+            self.positions[event['symbol']] = event['position']
+        elif event['type'] == 'close':
+            self.positions.pop(event['symbol'], None)
+        self._seq = event['seq']
+
+    def recover(self) -> Tuple[Optional[float], Dict[str, Dict[str, Any]]]:
+        """
+        Memuat snapshot terakhir lalu memutar ulang event yang lebih baru. Mengembalikan
+        (saldo, posisi); saldo None jika belum ada state tersimpan.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            for path in (self.snapshot_path, self.journal_path):
+                if os.path.exists(path + ".tmp"):
+                    # Sisa write_atomic yang terputus crash (mis. saat pemadatan); file aslinya masih utuh
+                    print(f"⚠️ Membuang file sementara sisa crash ({path}.tmp)")
+                    os.remove(path + ".tmp")
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    snapshot = json.load(f)
+                self.balance = snapshot['margin_balance']
+                self.positions = snapshot['positions']
+                self._seq = self._snapshot_seq = snapshot['seq']
+
+            replayed = 0
+            valid_bytes = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "rb") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            break
+                        if not line.endswith(b"\n"):
+                            break
+                        valid_bytes += len(line)
+                        # Event yang sudah termasuk snapshot (crash saat pemadatan) dilewati
+                        if event['seq'] > self._seq:
+                            self._apply(event)
+                            replayed += 1
+                if valid_bytes < os.path.getsize(self.journal_path):
+                    print(f"⚠️ Membuang ekor jurnal yang tidak lengkap ({self.journal_path})")
+                    with open(self.journal_path, "r+b") as f:
+                        f.truncate(valid_bytes)
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+            if replayed:
+                print(f"🔁 {replayed} event jurnal diputar ulang setelah snapshot seq {self._snapshot_seq}")
+            return self.balance, {symbol: dict(pos) for symbol, pos in self.positions.items()}
+
+    # --- Penulisan ---
+    def record(self, event_type: str, balance: float, symbol: Optional[str] = None,
+               position: Optional[Dict[str, Any]] = None, trade: Optional[Dict[str, Any]] = None):
+        """Menambahkan event 'open', 'close' atau 'balance' beserta saldo sesudahnya (belum di-fsync)."""
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("StateJournal.recover() harus dipanggil sebelum record()")
+            event = {"seq": self._seq + 1, "ts": clock.now().isoformat(), "type": event_type,
+                     "balance": balance}
+            if symbol is not None:
+                event['symbol'] = symbol
+            if position is not None:
+                event['position'] = dict(position)
+            if trade is not None:
+                event['trade'] = trade
+            self._file.write(json.dumps(event, default=float) + "\n")
+            self._apply(event)
+            self._pending += 1
+
+    def commit(self) -> bool:
+        """fsync semua event yang tertunda (sekali per batch). False jika tidak ada perubahan."""
+        with self._lock:
+            if not self._pending:
+                return False
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            if self._seq - self._snapshot_seq >= self.compact_every:
+                self._compact()
+            return True
+
+    def snapshot(self, balance: float, positions: Dict[str, Dict[str, Any]]):
+        """Menetapkan state lengkap (mis. migrasi dari file lama) dan langsung memadatkannya."""
+        with self._lock:
+            self.balance = balance
+            self.positions = {symbol: dict(pos) for symbol, pos in positions.items()}
+            self._compact()
+
+    def _compact(self):
+        started = time.perf_counter()
+        state = {"seq": self._seq, "margin_balance": self.balance, "positions": self.positions}
+        write_atomic(self.snapshot_path, json.dumps(state, default=float))
+        # Snapshot sudah aman di disk; jurnal boleh dikosongkan
+        self._file.close()
+        write_atomic(self.journal_path, "")
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._snapshot_seq = self._seq
+        print(f"🗜️ Jurnal state dipadatkan (seq {self._seq}) dalam {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def close(self):
+        """Commit terakhir dan pemadatan, dipanggil saat bot berhenti."""
+        self.commit()
+        with self._lock:
+            if self._file is None:
+                return
+            if self._seq > self._snapshot_seq:
+                self._compact()
+            self._file.close()
+            self._file = None
@@ -1,83 +1,287 @@
 # strategy.py — Versi Perbaikan: "Tren + Volume + Reversi"
-from typing import Dict, Any, Tuple, List
+import math
+from typing import Container, Dict, Any, Tuple, List, Optional
+import numpy as np
 import pandas as pd
-import talib
-from api_clients import get_historical_data
+from api_clients import get_cached_historical_data
+from indicators import EMA, NAN
 
-def find_potential_coins(tickers: List[Dict[str, Any]]) -> List[str]:
+# --- Pra-seleksi Koin (tahap 1, hanya dari data ticker massal) ---
+DEFAULT_SCANNER = {
+    "min_coin_price": 0.1,
+    "min_volume_usdt": 100_000,
+    "max_spread_pct": None,   # mis. 0.002 = 0.2%; None = tanpa filter spread
+    "max_candidates": None,   # jumlah koin terbaik yang diteruskan ke tahap k-line; None = semua
+    "weights": {"change": 1.0, "range": 1.0, "turnover": 1.0, "spread": 1.0, "funding": 0.5},
+}
+TICKER_NUMERIC_FIELDS = ['lastPrice', 'turnover24h', 'price24hPcnt', 'highPrice24h', 'lowPrice24h',
+                         'bid1Price', 'ask1Price', 'fundingRate']
+
+def _rank_score(values: np.ndarray) -> np.ndarray:
+    """Peringkat persentil [0, 1] (1 = nilai terbesar); NaN mendapat 0 dan tidak memengaruhi peringkat lain."""
+    scores = np.zeros(len(values))
+    valid = ~np.isnan(values)
+    n = int(valid.sum())
+    if n > 1:
+        scores[valid] = np.argsort(np.argsort(values[valid], kind='stable'), kind='stable') / (n - 1)
+    elif n == 1:
+        scores[valid] = 1.0
+    return scores
+
+def score_tickers(tickers: List[Dict[str, Any]], scanner: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Filter ambang + skor gabungan untuk seluruh universe dalam satu pass NumPy.
+    Skor = jumlah berbobot peringkat persentil dari: |perubahan 24 jam|, range 24 jam
+    relatif harga, turnover, spread bid/ask (makin sempit makin baik), dan |funding|
+    (makin netral makin baik). Mengembalikan (mask lolos filter, skor) per ticker.
+    """
+    scanner = {**DEFAULT_SCANNER, **(scanner or {})}
+    weights = {**DEFAULT_SCANNER['weights'], **(scanner.get('weights') or {})}
+    df = pd.DataFrame(tickers, columns=['symbol'] + TICKER_NUMERIC_FIELDS)
+    values = df[TICKER_NUMERIC_FIELDS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    last, turnover, change, high, low, bid, ask, funding = values.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spread = (ask - bid) / ((ask + bid) / 2)
+        spread[~(bid > 0) | ~(ask > 0)] = np.nan  # ticker tanpa order book tidak difilter spread
+        day_range = (high - low) / last
+    passed = (df['symbol'].fillna('').str.endswith('USDT').to_numpy()
+              & (last >= scanner['min_coin_price'])
+              & (turnover > scanner['min_volume_usdt']))
+    if scanner.get('max_spread_pct') is not None:
+        passed &= ~(spread > scanner['max_spread_pct'])
+
+    scores = np.zeros(len(df))
+    features = {"change": np.abs(change), "range": day_range, "turnover": turnover,
+                "spread": -spread, "funding": -np.abs(funding)}
+    for name, feature in features.items():
+        weight = weights.get(name, 0.0)
+        if weight:
+            ranked = np.where(passed, feature, np.nan)  # peringkat hanya di antara koin yang lolos filter
+            scores += weight * _rank_score(ranked)
+    return passed, scores
+
+def find_potential_coins(tickers: List[Dict[str, Any]], scanner: Optional[Dict[str, Any]] = None) -> List[str]:
     """
-    PINDAI SEMUA koin USDT dengan filter dasar (tanpa batas jumlah).
+    Tahap 1 funnel pemindaian: koin USDT yang lolos ambang `market_scanner`
+    (harga, turnover, spread), diurutkan dari skor tertinggi dan dibatasi
+    `max_candidates`, sehingga jumlah koin yang masuk tahap k-line tetap terkendali.
     """
     if not tickers:
         return []
-    df = pd.DataFrame(tickers)
-    df['turnover24h'] = pd.to_numeric(df['turnover24h'], errors='coerce')
-    df['lastPrice'] = pd.to_numeric(df['lastPrice'], errors='coerce')
-    df = df[
-        (df['symbol'].str.endswith('USDT')) &
-        (df['lastPrice'] >= 0.1) &
-        (df['turnover24h'] > 100_000)  # longgarkan volume
-    ]
-    # 🔥 HAPUS .head(5) → proses SEMUA koin
-    return df['symbol'].tolist()
-
-def make_decision(symbol: str, open_positions: Dict[str, Any], current_price: float) -> Tuple[str, str, float]:
+    scanner = {**DEFAULT_SCANNER, **(scanner or {})}
+    passed, scores = score_tickers(tickers, scanner)
+    candidates = np.flatnonzero(passed)
+    order = candidates[np.argsort(-scores[candidates], kind='stable')]
+    if scanner.get('max_candidates'):
+        order = order[:int(scanner['max_candidates'])]
+    return [tickers[i]['symbol'] for i in order]
+
+# --- Evaluasi Batch (vektor) ---
+DECISION_HOLD, DECISION_LONG, DECISION_SHORT = 0, 1, 2
+DECISION_NAMES = ("HOLD", "GO_LONG", "GO_SHORT")
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MIN_BARS = 30
+EMA_FAST, EMA_SLOW = 8, 21
+
+def _last_ema(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Nilai EMA terakhir untuk setiap baris (simbol), identik dengan talib.EMA:
+    diseed dengan SMA `period` bar pertama yang valid, lalu k = 2 / (period + 1).
+    Baris boleh diawali NaN (data lebih pendek dari lebar batch).
+    """
+    n_rows, n_bars = values.shape
+    start = np.argmax(~np.isnan(values), axis=1)
+    seed_idx = np.minimum(start[:, None] + np.arange(period), n_bars - 1)
+    window = np.take_along_axis(values, seed_idx, axis=1)
+    ema = np.zeros(n_rows)
+    for j in range(period):  # dijumlah berurutan seperti TA-Lib agar hasilnya identik
+        ema = ema + window[:, j]
+    ema = ema / period
+    ema[start + period > n_bars] = np.nan
+
+    k = 2.0 / (period + 1)
+    first_update = start + period
+    for t in range(int(first_update.min(initial=n_bars)), n_bars):
+        ema = np.where(t >= first_update, ((values[:, t] - ema) * k) + ema, ema)
+    return ema
+
+def _ohlcv_array(data: pd.DataFrame) -> np.ndarray:
+    """Kolom OHLCV sebagai array (bar x 5); per kolom, jauh lebih murah daripada data[OHLCV_COLUMNS]."""
+    return np.column_stack([data[col].to_numpy(dtype=float) for col in OHLCV_COLUMNS])
+
+def frames_to_batch(frames: List[Optional[pd.DataFrame]], n_bars: int = 50) -> np.ndarray:
+    """Menyusun beberapa DataFrame k-line menjadi array (simbol x bar x OHLCV), rata kanan dengan NaN."""
+    batch = np.full((len(frames), n_bars, len(OHLCV_COLUMNS)), np.nan)
+    for i, df in enumerate(frames):
+        if df is None or df.empty:
+            continue
+        values = _ohlcv_array(df)[-n_bars:]
+        batch[i, n_bars - len(values):] = values
+    return batch
+
+# Kode alasan keputusan, urut sesuai prioritas pengecekan di make_decision
+(REASON_NO_DATA, REASON_NO_TREND, REASON_HAS_POSITION, REASON_LOW_VOLUME,
+ REASON_BULLISH, REASON_BEARISH, REASON_NO_SETUP) = range(7)
+REASON_TEMPLATES = (
+    "🟡 Data tidak cukup untuk {symbol}",
+    "⏸️ {symbol} | Tren tidak jelas",
+    "🔒 {symbol} | Sudah ada posisi",
+    "🔇 {symbol} | Volume rendah",
+    "✅ {symbol} | BULLISH REVERSAL DI TREN NAIK",
+    "✅ {symbol} | BEARISH REVERSAL DI TREN TURUN",
+    "⏸️ {symbol} | Tidak ada setup valid",
+)
+
+def decision_codes(batch: np.ndarray, has_position: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Inti vektor dari strategi. `batch` berbentuk (simbol x bar x OHLCV), bar terbaru
+    di akhir; simbol dengan data lebih pendek diawali NaN. Mengembalikan kode
+    keputusan (DECISION_*) dan kode alasan (REASON_*) per simbol.
+    """
+    opn, high, low, close, volume = (batch[:, :, i] for i in range(len(OHLCV_COLUMNS)))
+    n_valid = (~np.isnan(close)).sum(axis=1)
+    if has_position is None:
+        has_position = np.zeros(len(batch), dtype=bool)
+
+    # --- Filter: Tren jelas (EMA8 vs EMA21) ---
+    ema8 = _last_ema(close, EMA_FAST)
+    ema21 = _last_ema(close, EMA_SLOW)
+    is_uptrend = ema8 > ema21
+    is_downtrend = ema8 < ema21
+
+    # --- Filter volume ---
+    current_vol = volume[:, -1]
+    avg_vol = volume[:, -10:-1].mean(axis=1)
+    low_volume = current_vol < 0.8 * avg_vol
+
+    # --- Candle terakhir & area support/resistance (10 bar) ---
+    c0_open, c0_high, c0_low, c0_close = opn[:, -1], high[:, -1], low[:, -1], close[:, -1]
+    c0_range = c0_high - c0_low
+    support = low[:, -10:].min(axis=1)
+    resistance = high[:, -10:].max(axis=1)
+    go_long = (is_uptrend & (c0_close > c0_open) & ((c0_close - c0_open) > 0.6 * c0_range)
+               & (c0_low <= support * 1.001))
+    go_short = (is_downtrend & (c0_close < c0_open) & ((c0_open - c0_close) > 0.6 * c0_range)
+                & (c0_high >= resistance * 0.999))
+
+    reasons = np.select(
+        [n_valid < MIN_BARS, ~(is_uptrend | is_downtrend), has_position, low_volume, go_long, go_short],
+        [REASON_NO_DATA, REASON_NO_TREND, REASON_HAS_POSITION, REASON_LOW_VOLUME, REASON_BULLISH, REASON_BEARISH],
+        default=REASON_NO_SETUP,
+    ).astype(np.int8)
+    codes = np.full(len(batch), DECISION_HOLD, dtype=np.int8)
+    codes[reasons == REASON_BULLISH] = DECISION_LONG
+    codes[reasons == REASON_BEARISH] = DECISION_SHORT
+    return codes, reasons
+
+def make_decisions(symbols: List[str], batch: np.ndarray,
+                   open_positions: Container[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Versi vektor dari make_decision untuk seluruh universe sekaligus.
+    Mengembalikan kode keputusan (DECISION_*) dan pesan alasannya per simbol.
+    """
+    has_position = np.array([symbol in open_positions for symbol in symbols], dtype=bool)
+    codes, reasons = decision_codes(batch, has_position)
+    return codes, [REASON_TEMPLATES[r].format(symbol=symbol) for symbol, r in zip(symbols, reasons)]
+
+def make_decision(symbol: str, open_positions: Container[str], current_price: float,
+                  data: Optional[pd.DataFrame] = None) -> Tuple[str, str, float]:
     """
     Strategi baru:
     - Hanya trade jika tren jelas (EMA8 > EMA21 = uptrend, sebaliknya downtrend)
     - Entry hanya saat terjadi REVERSI KUAT (pinbar, engulfing) di area support/resistance
     - Konfirmasi volume tinggi
+    `data` bisa diisi k-line yang sudah diambil (mis. oleh engine async); jika kosong diambil di sini.
+    Aturannya sama dengan decision_codes; untuk satu simbol dihitung langsung dengan
+    ClosedBarState (skalar NumPy) tanpa membangun batch.
     """
-    data = get_historical_data(symbol, interval='1', limit=50)
-    if data is None or len(data) < 30:
+    if data is None:
+        data = get_cached_historical_data(symbol, interval='1', limit=50)
+    if data is None or len(data) < MIN_BARS:
         return "HOLD", f"🟡 Data tidak cukup untuk {symbol}", None
 
-    close = pd.to_numeric(data['close'])
-    high = pd.to_numeric(data['high'])
-    low = pd.to_numeric(data['low'])
-    opn = pd.to_numeric(data['open'])
-    volume = pd.to_numeric(data['volume'])
+    ohlcv = _ohlcv_array(data)
+    reason = ClosedBarState(ohlcv).decide(ohlcv[-1], symbol in open_positions)
+    code = {REASON_BULLISH: DECISION_LONG, REASON_BEARISH: DECISION_SHORT}.get(reason, DECISION_HOLD)
+    return DECISION_NAMES[code], REASON_TEMPLATES[reason].format(symbol=symbol), None
 
-    # --- Filter: Tren jelas (EMA8 vs EMA21) ---
-    ema8 = talib.EMA(close, timeperiod=8).iloc[-1]
-    ema21 = talib.EMA(close, timeperiod=21).iloc[-1]
-    is_uptrend = ema8 > ema21
-    is_downtrend = ema8 < ema21
+# --- Memo Bar Tertutup (dipakai candle_scheduler) ---
+class ClosedBarState:
+    """
+    Input make_decision yang hanya bergantung pada bar tertutup di jendela k-line
+    (semua bar kecuali bar terakhir yang masih berjalan), dihitung sekali per candle:
+    EMA sebelum bar berjalan, rata-rata volume 9 bar, dan low/high 9 bar. Juga
+    menyimpan open/high/low bar berjalan dari evaluasi terakhir untuk may_trigger().
+    """
+    __slots__ = ("key", "bar_ts", "n_valid", "ema_fast", "ema_slow", "avg_vol", "low9", "high9",
+                 "live_open", "live_high", "live_low")
 
-    if not (is_uptrend or is_downtrend):
-        return "HOLD", f"⏸️ {symbol} | Tren tidak jelas", None
+    def __init__(self, ohlcv: np.ndarray, key: Any = None, bar_ts: int = 0):
+        batch = ohlcv[None]
+        closes = ohlcv[:-1, 3]
+        valid = closes[~np.isnan(closes)]
+        self.key = key
+        self.bar_ts = bar_ts
+        self.n_valid = int((~np.isnan(batch[0, :, 3])).sum())
+        # indicators.EMA memakai seed SMA dan rumus update yang sama dengan _last_ema
+        self.ema_fast = EMA.seed(valid, period=EMA_FAST).value
+        self.ema_slow = EMA.seed(valid, period=EMA_SLOW).value
+        # Ekspresi yang sama dengan decision_codes agar hasil pembulatan identik
+        self.avg_vol = float(batch[:, -10:-1, 4].mean(axis=1)[0])
+        self.low9 = float(batch[:, -10:-1, 2].min(axis=1)[0])
+        self.high9 = float(batch[:, -10:-1, 1].max(axis=1)[0])
+        self.live_open = self.live_high = self.live_low = NAN
 
-    position_exists = symbol in open_positions
-    if position_exists:
-        return "HOLD", f"🔒 {symbol} | Sudah ada posisi", None
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, key: Any) -> "ClosedBarState":
+        """Dari jendela k-line DataFrame (kolom timestamp + OHLCV), seperti keluaran api_clients."""
+        return cls(_ohlcv_array(data), key,
+                   int(data['timestamp'].iloc[-1].value // 1_000_000))
 
-    # --- Filter volume ---
-    current_vol = volume.iloc[-1]
-    avg_vol = volume.iloc[-10:-1].mean()
-    if current_vol < 0.8 * avg_vol:
-        return "HOLD", f"🔇 {symbol} | Volume rendah", None
-
-    # --- Cek candle terakhir: apakah reversal kuat? ---
-    c0_open = opn.iloc[-1]
-    c0_close = close.iloc[-1]
-    c0_high = high.iloc[-1]
-    c0_low = low.iloc[-1]
-    c0_range = c0_high - c0_low
+    def live_emas(self, close: float) -> Tuple[float, float]:
+        """EMA cepat/lambat setelah bar berjalan ditutup di harga `close`."""
+        return (((close - self.ema_fast) * (2.0 / (EMA_FAST + 1))) + self.ema_fast,
+                ((close - self.ema_slow) * (2.0 / (EMA_SLOW + 1))) + self.ema_slow)
+
+    def decide(self, bar: np.ndarray, has_position: bool) -> int:
+        """Kode alasan (REASON_*) untuk bar berjalan [open, high, low, close, volume]; sama dengan decision_codes."""
+        c0_open, c0_high, c0_low, c0_close, current_vol = (float(x) for x in bar)
+        self.live_open, self.live_high, self.live_low = c0_open, c0_high, c0_low
+        if self.n_valid < MIN_BARS:
+            return REASON_NO_DATA
+        ema_fast, ema_slow = self.live_emas(c0_close)
+        is_uptrend, is_downtrend = ema_fast > ema_slow, ema_fast < ema_slow
+        if not (is_uptrend or is_downtrend):
+            return REASON_NO_TREND
+        if has_position:
+            return REASON_HAS_POSITION
+        if current_vol < 0.8 * self.avg_vol:
+            return REASON_LOW_VOLUME
+        c0_range = c0_high - c0_low
+        if (is_uptrend and c0_close > c0_open and (c0_close - c0_open) > 0.6 * c0_range
+                and c0_low <= min(self.low9, c0_low) * 1.001):
+            return REASON_BULLISH
+        if (is_downtrend and c0_close < c0_open and (c0_open - c0_close) > 0.6 * c0_range
+                and c0_high >= max(self.high9, c0_high) * 0.999):
+            return REASON_BEARISH
+        return REASON_NO_SETUP
 
-    # LONG: Bullish reversal di uptrend
-    if is_uptrend:
-        # Syarat: candle bullish kuat (close > open) dan dekat low
-        if c0_close > c0_open and (c0_close - c0_open) > 0.6 * c0_range:
-            # Dan harga dekat support (low 10 candle terakhir)
-            support = low.iloc[-10:].min()
-            if c0_low <= support * 1.001:
-                return "GO_LONG", f"✅ {symbol} | BULLISH REVERSAL DI TREN NAIK", None
-
-    # SHORT: Bearish reversal di downtrend
-    if is_downtrend:
-        if c0_close < c0_open and (c0_open - c0_close) > 0.6 * c0_range:
-            resistance = high.iloc[-10:].max()
-            if c0_high >= resistance * 0.999:
-                return "GO_SHORT", f"✅ {symbol} | BEARISH REVERSAL DI TREN TURUN", None
-
-    return "HOLD", f"⏸️ {symbol} | Tidak ada setup valid", None
\ No newline at end of file
+    def may_trigger(self, price: float) -> bool:
+        """
+        False jika bar berjalan pasti belum memenuhi syarat entry pada harga `price`,
+        dengan asumsi close bar = harga terakhir. High/low bar hanya bisa melebar, dan
+        entry long butuh low <= low9 * 1.001 (short: high >= high9 * 0.999), sehingga
+        range bar minimal bisa dihitung; syarat tren dan badan candle yang gagal pada
+        range minimal pasti gagal juga pada range aslinya.
+        """
+        if math.isnan(self.live_open):
+            return True
+        ema_fast, ema_slow = self.live_emas(price)
+        if ema_fast > ema_slow:
+            min_range = max(self.live_high, price) - min(self.live_low, price, self.low9 * 1.001)
+            return price > self.live_open and (price - self.live_open) > 0.6 * min_range
+        if ema_fast < ema_slow:
+            min_range = max(self.live_high, price, self.high9 * 0.999) - min(self.live_low, price)
+            return price < self.live_open and (self.live_open - price) > 0.6 * min_range
+        return False
@@ -0,0 +1,12 @@
+# tests/conftest.py — Modul proyek ada di root repo; settings.json dimuat tanpa kredensial API
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+with open(os.path.join(ROOT, "settings.json")) as f:
+    config.set_settings(json.load(f))
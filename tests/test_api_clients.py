@@ -0,0 +1,44 @@
+# tests/test_api_clients.py — Ring buffer k-line dan DataFrame yang dikembalikan ke pemanggil
+import numpy as np
+import pytest
+
+import api_clients
+import config
+from benchmark import MockExchange, synthetic_fixture
+from market_stream import MarketDataStream
+
+SYMBOL = "BENCH000USDT"
+
+
+@pytest.fixture
+def exchange():
+    exchange = MockExchange(synthetic_fixture(n_symbols=1, n_bars=200, seed=3))
+    config.set_bybit_session(exchange)
+    api_clients._kline_buffers.clear()
+    yield exchange
+    api_clients._kline_buffers.clear()
+    config.set_bybit_session(None)
+
+
+def overwrite_buffer(symbol):
+    """Seperti thread stream: menimpa bar terakhir dan menambah bar baru setelah lock dilepas."""
+    buffer = api_clients.get_kline_buffer(symbol, '1')
+    with buffer.lock:
+        last = buffer.view(1).copy()
+        last[:, 1:5] = -1.0
+        newer = last.copy()
+        newer[:, 0] += 60_000
+        buffer.extend(np.concatenate([last, newer]))
+
+
+@pytest.mark.parametrize("reader", [
+    lambda: api_clients.get_cached_historical_data(SYMBOL, '1', 50),
+    lambda: MarketDataStream().get_bars(SYMBOL, limit=50),
+], ids=["get_cached_historical_data", "get_bars"])
+def test_returned_frame_does_not_alias_ring_buffer(exchange, reader):
+    api_clients.get_cached_historical_data(SYMBOL, '1', 50)  # isi buffer
+    data = reader()
+    before = data.copy()
+    overwrite_buffer(SYMBOL)
+    assert (data[['open', 'high', 'low', 'close']].to_numpy() > 0).all()
+    assert data.equals(before)
@@ -0,0 +1,141 @@
+# tests/test_async_api_clients.py — AsyncBybitClient terhadap server HTTP mock lokal (aiohttp)
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from async_api_clients import AsyncBybitClient
+
+OK = {"retCode": 0, "retMsg": "OK", "result": {"list": [{"symbol": "BTCUSDT", "lastPrice": "100.5"}]}}
+
+
+class MockBybit:
+    """Server mock: setiap path punya antrean respons (status, body, jeda) yang dipakai berurutan."""
+
+    def __init__(self):
+        self.scripts = {}
+        self.hits = {}
+        self.arrivals = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+
+    def script(self, path, *responses):
+        self.scripts[path] = list(responses)
+
+    async def handle(self, request):
+        path = request.path
+        self.hits[path] = self.hits.get(path, 0) + 1
+        self.arrivals.append((path, time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            queue = self.scripts.get(path, [])
+            status, body, delay = queue.pop(0) if len(queue) > 1 else (queue[0] if queue else (200, OK, 0.0))
+            await asyncio.sleep(delay or self.delay)
+            return web.json_response(body, status=status)
+        finally:
+            self.in_flight -= 1
+
+
+def run_with_server(mock, scenario, **client_kwargs):
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", mock.handle)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            params = dict(backoff_base=0.01, endpoint_limits={}, requests_per_second=1000)
+            params.update(client_kwargs)
+            async with AsyncBybitClient(base_url=str(server.make_url("")), **params) as client:
+                return await scenario(client)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def get(path):
+    return lambda client: client._get(path, {"category": "linear"})
+
+
+@pytest.mark.parametrize("rate_limit", [
+    (429, {}, 0.0),
+    (403, {}, 0.0),
+    (200, {"retCode": 10006, "retMsg": "Too many visits!"}, 0.0),
+])
+def test_retries_rate_limit_responses(rate_limit):
+    mock = MockBybit()
+    mock.script("/v5/market/tickers", rate_limit, rate_limit, (200, OK, 0.0))
+    assert run_with_server(mock, get("/v5/market/tickers")) == OK
+    assert mock.hits["/v5/market/tickers"] == 3
+
+
+@pytest.mark.parametrize("transient", [(500, {}, 0.0), (503, {}, 0.0), (200, OK, 0.5)],
+                         ids=["500", "503", "timeout"])
+def test_retries_server_errors_and_timeouts(transient):
+    mock = MockBybit()
+    mock.script("/v5/market/kline", transient, (200, OK, 0.0))
+    assert run_with_server(mock, get("/v5/market/kline"), timeout=0.2) == OK
+    assert mock.hits["/v5/market/kline"] == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_client_errors_fail_fast(status):
+    mock = MockBybit()
+    mock.script("/v5/market/kline", (status, {"retMsg": "bad request"}, 0.0))
+    assert run_with_server(mock, get("/v5/market/kline")) is None
+    assert mock.hits["/v5/market/kline"] == 1
+
+
+def test_gives_up_after_max_retries():
+    mock = MockBybit()
+    mock.script("/v5/market/tickers", (429, {}, 0.0))
+    assert run_with_server(mock, get("/v5/market/tickers"), max_retries=2) is None
+    assert mock.hits["/v5/market/tickers"] == 3
+
+
+def test_rate_limit_pauses_all_requests():
+    # Backoff 0.4 detik (jitter 0.5-1x): request lain yang menyusul harus ikut tertahan >= 0.2 detik
+    mock = MockBybit()
+    mock.script("/v5/market/tickers", (429, {}, 0.0), (200, OK, 0.0))
+
+    async def scenario(client):
+        limited = asyncio.create_task(client._get("/v5/market/tickers", {}))
+        while not mock.hits.get("/v5/market/tickers"):
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+        await client._get("/v5/market/kline", {})
+        await limited
+
+    run_with_server(mock, scenario, backoff_base=0.4)
+    first_hit = mock.arrivals[0][1]
+    kline_hit = next(at for path, at in mock.arrivals if path == "/v5/market/kline")
+    assert kline_hit - first_hit >= 0.2
+
+
+def test_token_bucket_paces_requests():
+    mock = MockBybit()
+
+    async def scenario(client):
+        started = time.monotonic()
+        await asyncio.gather(*(client._get("/v5/market/kline", {}) for _ in range(75)))
+        return time.monotonic() - started
+
+    # Kapasitas 50 token langsung terpakai, 25 sisanya menunggu isi ulang 50/detik (~0.5 detik)
+    elapsed = run_with_server(mock, scenario, requests_per_second=1000, endpoint_limits={"/v5/market/kline": 50})
+    assert mock.hits["/v5/market/kline"] == 75
+    assert elapsed >= 0.45
+
+
+def test_semaphore_bounds_in_flight_requests():
+    mock = MockBybit()
+    mock.delay = 0.05
+
+    async def scenario(client):
+        return await asyncio.gather(*(client.get_latest_price("BTCUSDT") for _ in range(20)))
+
+    prices = run_with_server(mock, scenario, max_concurrency=3)
+    assert prices == [100.5] * 20
+    assert mock.max_in_flight == 3
@@ -0,0 +1,253 @@
+# tests/test_backtester.py — Paritas inti backtest berbasis array dengan loop per baris lama
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("talib")
+
+from backtester import (add_indicators, compute_signals, simulate_backtest, simulate_live_replay,
+                        trades_to_frame)
+from benchmark import synthetic_bars
+from strategy import DECISION_HOLD, DECISION_LONG, DECISION_SHORT
+
+PARAMS = dict(sl_multiplier=2.0, tp_multiplier=4.0, initial_balance=10.0, margin=1.0, leverage=10, fee_rate=0.00055)
+REPLAY_PARAMS = dict(initial_balance=10.0, margin=1.0, leverage=10, fee_rate=0.00055, sl_pct=0.01, tp_pct=0.02,
+                     cooldown_seconds=120, max_positions=8)
+MINUTE_MS = 60_000
+
+
+def reference_backtest(df, sl_multiplier, tp_multiplier, initial_balance, margin, leverage, fee_rate):
+    """Loop df.iterrows() dari run_backtest sebelum inti array, sebagai acuan paritas."""
+    balance = initial_balance
+    position = None
+    trades = []
+    balance_history = []
+    for i, row in df.iterrows():
+        current_price = row['close']
+        current_time = row['timestamp']
+
+        if position:
+            pnl = (current_price - position['entry_price']) * position['size'] if position['side'] == 'LONG' else (position['entry_price'] - current_price) * position['size']
+            sl_hit, tp_hit = False, False
+            if position['side'] == 'LONG':
+                if current_price <= position['stop_loss_price']: sl_hit = True
+                elif current_price >= position['take_profit_price']: tp_hit = True
+            elif position['side'] == 'SHORT':
+                if current_price >= position['stop_loss_price']: sl_hit = True
+                elif current_price <= position['take_profit_price']: tp_hit = True
+
+            if sl_hit or tp_hit:
+                entry_val = position['entry_price'] * position['size']
+                exit_val = current_price * position['size']
+                total_fee = (entry_val * fee_rate) + (exit_val * fee_rate)
+                net_pnl = pnl - total_fee
+                balance += position['margin'] + net_pnl
+                trades.append({'exit_time': current_time, 'exit_price': current_price, 'pnl': net_pnl, **position})
+                position = None
+
+        if not position:
+            adx = row['adx']
+            rsi = row['rsi']
+            upper_band = row['bband_upper']
+            lower_band = row['bband_lower']
+
+            decision = "HOLD"
+            if adx < 20:
+                if current_price <= lower_band and rsi < 30: decision = "GO_LONG"
+                elif current_price >= upper_band and rsi > 70: decision = "GO_SHORT"
+
+            if (decision in ["GO_LONG", "GO_SHORT"]) and balance >= margin:
+                side = "LONG" if decision == "GO_LONG" else "SHORT"
+                atr = row['atr']
+                if atr > 0:
+                    sl_price = current_price - (atr * sl_multiplier)
+                    tp_price = current_price + (atr * tp_multiplier)
+                    if side == 'SHORT':
+                        sl_price = current_price + (atr * sl_multiplier)
+                        tp_price = current_price - (atr * tp_multiplier)
+
+                    size = (margin * leverage) / current_price
+                    balance -= margin
+                    position = {'entry_time': current_time, 'entry_price': current_price, 'side': side, 'size': size, 'margin': margin, 'stop_loss_price': sl_price, 'take_profit_price': tp_price}
+
+        current_equity = balance
+        if position:
+            current_pnl = (current_price - position['entry_price']) * position['size'] if position['side'] == 'LONG' else (position['entry_price'] - current_price) * position['size']
+            current_equity += (position['margin'] + current_pnl)
+        balance_history.append(current_equity)
+    return pd.DataFrame(trades), np.array(balance_history)
+
+
+def run_array_backtest(df, **params):
+    columns = {col: df[col].to_numpy(dtype=float) for col in ('close', 'adx', 'rsi', 'bband_upper', 'bband_lower', 'atr')}
+    signals = compute_signals(columns['close'], columns['adx'], columns['rsi'], columns['bband_upper'],
+                              columns['bband_lower'], columns['atr'])
+    trades, equity = simulate_backtest(columns['close'], signals, columns['atr'], **params)
+    return trades_to_frame(trades, df['timestamp'].to_numpy()), equity
+
+
+def assert_backtest_parity(df, **overrides):
+    params = {**PARAMS, **overrides}
+    expected_trades, expected_equity = reference_backtest(df, **params)
+    trades, equity = run_array_backtest(df, **params)
+    assert len(trades) == len(expected_trades)
+    if len(trades):
+        pd.testing.assert_frame_equal(trades, expected_trades[trades.columns], check_dtype=False)
+    np.testing.assert_array_equal(equity, expected_equity)
+    return trades, equity
+
+
+def signal_frame(close, signals):
+    """Frame dengan kolom indikator buatan: sinyal 'L'/'S' per bar, ATR = 1, selalu ranging."""
+    n = len(close)
+    close = np.asarray(close, dtype=float)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-01', periods=n, freq='15min'),
+        'close': close, 'adx': np.full(n, 10.0), 'rsi': np.full(n, 50.0),
+        'bband_upper': close + 100, 'bband_lower': close - 100, 'atr': np.ones(n),
+    })
+    for i, signal in signals.items():
+        if signal == 'L':
+            df.loc[i, ['rsi', 'bband_lower']] = 20.0, close[i]
+        else:
+            df.loc[i, ['rsi', 'bband_upper']] = 80.0, close[i]
+    return df
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_reference_loop_on_synthetic_series(seed):
+    bars = synthetic_bars(4000, seed=seed)
+    df = pd.DataFrame(bars[:, 1:], columns=['open', 'high', 'low', 'close', 'volume', 'turnover'])
+    df.insert(0, 'timestamp', pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms'))
+    trades, _ = assert_backtest_parity(add_indicators(df))
+    assert len(trades) > 5
+
+
+def test_reenters_on_the_exit_bar():
+    # LONG di bar 1 (SL 98, TP 104), TP kena di bar 3 yang juga punya sinyal SHORT
+    df = signal_frame([100, 100, 101, 104.5, 103, 101, 100], {1: 'L', 3: 'S'})
+    trades, _ = assert_backtest_parity(df)
+    assert list(trades['side']) == ['LONG', 'SHORT']
+    assert trades['exit_time'].iloc[0] == trades['entry_time'].iloc[1]
+
+
+def test_stop_loss_checked_before_take_profit():
+    # Multiplier SL negatif membuat SL (105) di atas TP (104): bar 2 menyentuh keduanya
+    df = signal_frame([100, 100, 104.5, 104.5, 100], {1: 'L', 4: 'S'})
+    trades, _ = assert_backtest_parity(df, sl_multiplier=-5.0)
+    assert trades['exit_price'].iloc[0] == 104.5
+
+
+def test_skips_entries_without_enough_balance():
+    # Saldo awal = margin; setelah LONG pertama kena SL, sinyal berikutnya dilewati
+    df = signal_frame([100, 100, 97, 97, 90, 97], {1: 'L', 3: 'L', 5: 'S'})
+    trades, equity = assert_backtest_parity(df, initial_balance=1.0)
+    assert len(trades) == 1
+    assert equity[-1] < 1.0
+
+
+# --- Replay strategi live ---
+def reference_live_replay(symbol_data, initial_balance, margin, leverage, fee_rate, sl_pct, tp_pct,
+                          cooldown_seconds, max_positions):
+    """
+    Replay per bar di atas timeline gabungan dengan aturan main.py: setiap timestamp
+    memeriksa SL (lebih dulu) lalu TP semua posisi, kemudian entry per simbol.
+    """
+    timeline = np.unique(np.concatenate([ts for ts, _, _ in symbol_data.values()]))
+    bar_index = {symbol: {int(t): i for i, t in enumerate(ts)} for symbol, (ts, _, _) in symbol_data.items()}
+    balance = initial_balance
+    open_positions, last_trade_time, trades = {}, {}, []
+    for ts in timeline.astype(np.int64):
+        for symbol in sorted(open_positions):
+            i = bar_index[symbol].get(ts)
+            if i is None:
+                continue
+            pos = open_positions[symbol]
+            price = symbol_data[symbol][1][i]
+            if pos['side'] == 'LONG':
+                reason = "Stop Loss" if price <= pos['stop_loss_price'] else "Take Profit" if price >= pos['take_profit_price'] else None
+            else:
+                reason = "Stop Loss" if price >= pos['stop_loss_price'] else "Take Profit" if price <= pos['take_profit_price'] else None
+            if reason is None:
+                continue
+            del open_positions[symbol]
+            gross = (price - pos['entry_price']) * pos['size'] if pos['side'] == 'LONG' else (pos['entry_price'] - price) * pos['size']
+            net_pnl = gross - (pos['entry_price'] * pos['size'] + price * pos['size']) * fee_rate
+            balance += pos['margin'] + net_pnl
+            trades.append({**pos, 'exit_time': ts, 'exit_price': price, 'reason': reason,
+                           'pnl': net_pnl, 'balance': balance})
+        for symbol, (timestamps, close, codes) in symbol_data.items():
+            i = bar_index[symbol].get(ts)
+            if i is None or codes[i] == DECISION_HOLD or symbol in open_positions:
+                continue
+            if symbol in last_trade_time and ts - last_trade_time[symbol] < cooldown_seconds * 1000:
+                continue
+            if len(open_positions) >= max_positions or balance < margin:
+                continue
+            side = 'LONG' if codes[i] == DECISION_LONG else 'SHORT'
+            price = close[i]
+            balance -= margin
+            last_trade_time[symbol] = ts
+            open_positions[symbol] = {
+                'symbol': symbol, 'side': side, 'entry_time': ts, 'entry_price': price,
+                'size': (margin * leverage) / price, 'margin': margin,
+                'stop_loss_price': price * (1 - sl_pct) if side == 'LONG' else price * (1 + sl_pct),
+                'take_profit_price': price * (1 + tp_pct) if side == 'LONG' else price * (1 - tp_pct),
+            }
+    trades_df = pd.DataFrame(trades)
+    if not trades_df.empty:
+        for col in ('entry_time', 'exit_time'):
+            trades_df[col] = pd.to_datetime(trades_df[col], unit='ms')
+    return trades_df
+
+
+def assert_replay_parity(symbol_data, **overrides):
+    params = {**REPLAY_PARAMS, **overrides}
+    expected = reference_live_replay(symbol_data, **params)
+    trades = simulate_live_replay(symbol_data, **params)
+    assert len(trades) == len(expected)
+    if len(trades):
+        pd.testing.assert_frame_equal(trades, expected[trades.columns], check_dtype=False)
+    return trades
+
+
+def replay_data(closes, codes, start_ms=1_700_000_000_000):
+    return {symbol: (start_ms + MINUTE_MS * np.arange(len(close), dtype=np.int64), np.asarray(close, dtype=float),
+                     np.asarray(codes[symbol], dtype=np.int8))
+            for symbol, close in closes.items()}
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_live_replay_matches_reference_loop(seed):
+    rng = np.random.default_rng(seed)
+    closes, codes = {}, {}
+    for k in range(6):
+        symbol = f"BENCH{k:03d}USDT"
+        closes[symbol] = synthetic_bars(3000, seed=seed * 10 + k)[:, 4]
+        codes[symbol] = rng.choice([DECISION_HOLD, DECISION_LONG, DECISION_SHORT], 3000, p=[0.97, 0.015, 0.015])
+    trades = assert_replay_parity(replay_data(closes, codes), max_positions=3, sl_pct=0.003, tp_pct=0.005)
+    assert len(trades) > 20
+
+
+def test_live_replay_reenters_on_the_exit_bar():
+    L, H = DECISION_LONG, DECISION_HOLD
+    data = replay_data({"AUSDT": [100, 103, 100, 100]}, {"AUSDT": [L, L, H, H]})
+    trades = assert_replay_parity(data, cooldown_seconds=0)
+    assert len(trades) == 2 and trades['exit_time'].iloc[0] == trades['entry_time'].iloc[1]
+    # Dengan cooldown bawaan (120 dtk) entry 60 dtk setelah entry pertama ditolak
+    assert len(assert_replay_parity(data)) == 1
+
+
+def test_live_replay_stop_loss_before_take_profit():
+    L, H = DECISION_LONG, DECISION_HOLD
+    data = replay_data({"AUSDT": [100, 104.5, 100]}, {"AUSDT": [L, H, H]})
+    trades = assert_replay_parity(data, sl_pct=-0.05, tp_pct=0.04)  # SL 105 di atas TP 104
+    assert list(trades['reason']) == ["Stop Loss"]
+
+
+def test_live_replay_skips_entries_without_enough_balance():
+    L, H = DECISION_LONG, DECISION_HOLD
+    closes = {s: [100, 100, 100, 103] for s in ("AUSDT", "BUSDT", "CUSDT")}
+    codes = {s: [L, H, H, H] for s in closes}
+    trades = assert_replay_parity(replay_data(closes, codes), initial_balance=2.5)
+    assert sorted(trades['symbol']) == ["AUSDT", "BUSDT"]
@@ -0,0 +1,104 @@
+# tests/test_bar_service.py — resample_bars / BarAggregate dibandingkan dengan pandas resample
+import numpy as np
+import pandas as pd
+import pytest
+
+import api_clients
+import config
+from bar_service import BASE_INTERVAL_MS, BarAggregate, BarService, resample_bars
+from benchmark import MockExchange, synthetic_fixture
+from market_store import COLUMNS
+
+START_MS = 1_700_000_000_000 // BASE_INTERVAL_MS * BASE_INTERVAL_MS + 7 * BASE_INTERVAL_MS  # tidak selaras bucket
+
+
+def minute_bars(n, seed=0, gaps=True):
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(n * 2 if gaps else n)
+    if gaps:
+        minutes = np.sort(rng.choice(minutes, n, replace=False))  # menit kosong di tengah data
+    close = 100 + np.cumsum(rng.normal(0, 0.3, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.2, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.2, n)
+    volume = rng.uniform(1, 50, n)
+    return np.column_stack([START_MS + minutes * BASE_INTERVAL_MS, open_, high, low, close, volume, volume * close])
+
+
+def pandas_resample(bars, interval):
+    df = pd.DataFrame(bars[:, 1:], columns=COLUMNS[1:],
+                      index=pd.to_datetime(bars[:, 0].astype(np.int64), unit='ms'))
+    out = df.resample(f"{int(interval)}min", origin='epoch').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'turnover': 'sum'})
+    out = out[df['open'].resample(f"{int(interval)}min", origin='epoch').count() > 0]  # bucket kosong dilewati
+    timestamps = out.index.as_unit('ms').asi8.astype(np.float64)
+    return np.column_stack([timestamps, out[COLUMNS[1:]].to_numpy()])
+
+
+@pytest.mark.parametrize("interval", ['3', '5', '15', '60', '240'])
+@pytest.mark.parametrize("gaps", [False, True])
+def test_resample_bars_matches_pandas(interval, gaps):
+    bars = minute_bars(3000, seed=int(interval), gaps=gaps)
+    np.testing.assert_allclose(resample_bars(bars, interval), pandas_resample(bars, interval), rtol=1e-12)
+
+
+@pytest.mark.parametrize("interval", ['5', '15', '60'])
+def test_bar_aggregate_incremental_matches_pandas(interval):
+    bars = minute_bars(1500, seed=7)
+    rng = np.random.default_rng(1)
+    aggregate = BarAggregate(interval)
+    cursor = 0
+    while cursor < len(bars):
+        step = int(rng.integers(1, 40))
+        chunk = bars[cursor:cursor + step]
+        if cursor and rng.random() < 0.3:
+            chunk = np.concatenate([bars[cursor - 1:cursor], chunk])  # bar 1m terakhir dikirim ulang
+        aggregate.extend(chunk)
+        cursor += step
+        # Bucket berjalan (parsial) ikut dibandingkan dengan resample atas data sejauh ini
+        np.testing.assert_allclose(aggregate.view(), pandas_resample(bars[:cursor], interval), rtol=1e-12)
+
+    expected = pandas_resample(bars, interval)
+    np.testing.assert_allclose(aggregate.view(include_partial=False), expected[:-1], rtol=1e-12)
+
+
+def test_running_minute_update_replaces_partial_bucket():
+    bars = minute_bars(12, gaps=False)
+    aggregate = BarAggregate('5')
+    aggregate.extend(bars)
+    updated = bars[-1].copy()
+    updated[2] += 5.0  # high bar 1m berjalan naik, volume bertambah
+    updated[5] += 3.0
+    aggregate.extend(updated[None, :])
+    final = np.concatenate([bars[:-1], updated[None, :]])
+    np.testing.assert_allclose(aggregate.view(), pandas_resample(final, '5'), rtol=1e-12)
+
+
+def test_bar_service_ingest_matches_pandas_and_resets_after_gap():
+    bars = minute_bars(600, seed=3, gaps=False)
+    service = BarService(max_bars=1000)
+    service.seed("BTCUSDT", '15', bars[:200])
+    for i in range(200, 600, 25):
+        service.ingest("BTCUSDT", bars[i:i + 25])
+    np.testing.assert_allclose(service.bars("BTCUSDT", '15'), pandas_resample(bars, '15'), rtol=1e-12)
+
+    # Menit yang hilang sebelum bar baru: agregat dikosongkan agar diisi ulang lewat seed()
+    service.ingest("BTCUSDT", bars[-1:] + np.r_[10 * BASE_INTERVAL_MS, np.zeros(len(COLUMNS) - 1)])
+    assert service.aggregate("BTCUSDT", '15').last_timestamp is None
+
+
+def test_get_resampled_data_matches_pandas_on_live_path():
+    exchange = MockExchange(synthetic_fixture(n_symbols=1, n_bars=300, seed=5))
+    config.set_bybit_session(exchange)
+    api_clients._kline_buffers.clear()
+    api_clients.LIVE_BARS.forget("BENCH000USDT")
+    try:
+        data = api_clients.get_resampled_data("BENCH000USDT", '5', 20)
+        minute = api_clients._kline_list_to_array(exchange.get_kline(symbol="BENCH000USDT", limit=1000)['result']['list'])
+    finally:
+        api_clients._kline_buffers.clear()
+        api_clients.LIVE_BARS.forget("BENCH000USDT")
+        config.set_bybit_session(None)
+    timestamps = data['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    actual = np.column_stack([timestamps, data[COLUMNS[1:]].to_numpy()])
+    np.testing.assert_allclose(actual, pandas_resample(minute, '5')[-20:], rtol=1e-12)
@@ -0,0 +1,112 @@
+# tests/test_market_replay.py — Rekam sesi terhadap MockExchange lalu putar ulang dengan jam virtual
+import numpy as np
+import pandas as pd
+import pytest
+
+import api_clients
+import clock
+import config
+from api_clients import PriceSnapshot
+from benchmark import MockExchange, synthetic_fixture
+from candle_scheduler import CandleScheduler
+from market_replay import MarketRecorder, ReplayExchange, read_records
+
+FIXTURE = synthetic_fixture(n_symbols=4, n_bars=400, seed=11)
+SYMBOLS = [t['symbol'] for t in FIXTURE['tickers']]
+CYCLE_SECONDS = 20
+CYCLES = 30
+
+
+class ClockedExchange(MockExchange):
+    """MockExchange yang hanya menampilkan bar sampai clock.time(): pasar bergerak mengikuti jam virtual."""
+
+    def _visible(self, symbol):
+        bars = self.klines[symbol]
+        return bars[bars[:, 0] <= clock.time() * 1000]
+
+    def get_tickers(self, category="linear", symbol=None, **_):
+        tickers = []
+        for t in self.tickers:
+            close = float(self._visible(t['symbol'])[-1, 4])
+            tickers.append(dict(t, lastPrice=repr(close), bid1Price=repr(close * 0.9999),
+                                ask1Price=repr(close * 1.0001)))
+        return self._response([t for t in tickers if symbol is None or t['symbol'] == symbol])
+
+    def get_kline(self, end=None, **params):
+        now_ms = int(clock.time() * 1000)
+        return super().get_kline(end=now_ms if end is None else min(end, now_ms), **params)
+
+
+@pytest.fixture(autouse=True)
+def isolated_session():
+    api_clients._kline_buffers.clear()
+    yield
+    api_clients._kline_buffers.clear()
+    config.set_bybit_session(None)
+    clock.set_clock(None)
+
+
+def run_session():
+    """Siklus seperti engine thread: snapshot ticker, k-line dari ring buffer, keputusan CandleScheduler."""
+    scheduler = CandleScheduler()
+    log = []
+    for cycle in range(CYCLES):
+        if cycle:
+            clock.sleep(CYCLE_SECONDS)
+        snapshot = PriceSnapshot.capture()
+        for symbol in SYMBOLS:
+            data = api_clients.get_cached_historical_data(symbol, '1', 50)
+            decision, msg = scheduler.decide(symbol, (), data)
+            log.append((clock.time(), symbol, snapshot.get_price(symbol), str(data['timestamp'].iat[-1]),
+                        float(data['close'].iat[-1]), decision, msg))
+    return log
+
+
+def test_recorded_session_replays_identically(tmp_path):
+    exchange = ClockedExchange(FIXTURE)
+    start = exchange.klines[SYMBOLS[0]][-150, 0] / 1000 + 7.5  # di tengah candle, 150 menit sebelum bar terakhir
+    path = str(tmp_path / "session.bin")
+
+    clock.set_clock(clock.VirtualClock(start))
+    recorder = MarketRecorder(path, exchange)
+    config.set_bybit_session(recorder)
+    recorded = run_session()
+    recorder.close()
+    assert recorder.records == len(list(read_records(path)))
+
+    api_clients._kline_buffers.clear()
+    replay = ReplayExchange.load(path)
+    assert (replay.start_time, replay.end_time) == (start, start + (CYCLES - 1) * CYCLE_SECONDS)
+    clock.set_clock(clock.VirtualClock(replay.start_time, replay.end_time))
+    config.set_bybit_session(replay)
+    replayed = run_session()
+
+    assert replayed == recorded
+    # Jam virtual maju tepat satu jeda per siklus, dan berhenti di akhir rekaman
+    times = np.array(sorted({entry[0] for entry in replayed}))
+    np.testing.assert_array_equal(times, start + CYCLE_SECONDS * np.arange(CYCLES))
+    minutes = {int(t // 60) for t in times}
+    assert len({entry[3] for entry in replayed}) == len(minutes)  # satu bar baru per menit virtual
+    with pytest.raises(clock.ReplayFinished):
+        clock.sleep(CYCLE_SECONDS)
+
+
+def test_replay_never_serves_future_bars(tmp_path):
+    exchange = ClockedExchange(FIXTURE)
+    start = exchange.klines[SYMBOLS[0]][-100, 0] / 1000 + 30
+    path = str(tmp_path / "session.bin")
+    clock.set_clock(clock.VirtualClock(start))
+    recorder = MarketRecorder(path, exchange)
+    config.set_bybit_session(recorder)
+    recorded = run_session()
+    recorder.close()
+
+    # Di antara dua siklus rekaman, replay hanya boleh melayani versi bar yang sudah terekam
+    replay = ReplayExchange.load(path)
+    clock.set_clock(clock.VirtualClock(start + 95))
+    bars = replay.get_kline(symbol=SYMBOLS[0], interval='1', limit=10)['result']['list']
+    _, _, _, last_bar, last_close, _, _ = next(entry for entry in recorded
+                                               if entry[0] == start + 80 and entry[1] == SYMBOLS[0])
+    assert int(bars[0][0]) <= (start + 95) * 1000
+    assert str(pd.Timestamp(int(bars[0][0]), unit='ms')) == last_bar
+    assert float(bars[0][4]) == last_close
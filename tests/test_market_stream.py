@@ -0,0 +1,219 @@
+# tests/test_market_stream.py
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+from aiohttp import web
+
+import api_clients
+import config
+from benchmark import MockExchange, synthetic_fixture
+from market_stream import MarketDataStream
+
+SYMBOL = "BENCH000USDT"
+START_MS = 1_700_000_040_000
+
+
+@pytest.fixture
+def exchange():
+    exchange = MockExchange(synthetic_fixture(n_symbols=1, n_bars=200, seed=7))
+    config.set_bybit_session(exchange)
+    api_clients._kline_buffers.clear()
+    yield exchange
+    api_clients._kline_buffers.clear()
+    config.set_bybit_session(None)
+
+
+def test_get_bars_refills_reconnect_gap(exchange):
+    bars = exchange.klines[SYMBOL]
+    # Buffer berisi bar sebelum dan sesudah reconnect 20 menit; bar di tengah hilang
+    buffer = api_clients.get_kline_buffer(SYMBOL, '1')
+    buffer.extend(np.concatenate([bars[-100:-30], bars[-10:]]))
+
+    stream = MarketDataStream()
+    data = stream.get_bars(SYMBOL, limit=50)
+
+    timestamps = data['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    assert len(data) == 50
+    assert np.all(np.diff(timestamps) == 60_000)
+    np.testing.assert_array_equal(timestamps, bars[-50:, 0].astype(np.int64))
+    np.testing.assert_allclose(data['close'].to_numpy(), bars[-50:, 4])
+
+    # Buffer sudah utuh: panggilan berikutnya dilayani dari memori tanpa REST
+    calls = exchange.calls
+    stream.get_bars(SYMBOL, limit=50)
+    assert exchange.calls == calls
+
+
+def test_get_bars_rejects_gap_left_by_rest(exchange):
+    exchange.klines[SYMBOL] = np.delete(exchange.klines[SYMBOL], np.s_[-30:-10], axis=0)
+    assert MarketDataStream().get_bars(SYMBOL, limit=50) is None
+
+
+# --- Replay pesan WebSocket ---
+def kline_message(symbol, start, close, confirm):
+    bar = {"start": start, "end": start + 59_999, "interval": "1", "open": "100", "high": "102", "low": "99",
+           "close": str(close), "volume": "10", "turnover": "1000", "confirm": confirm, "timestamp": start + 30_000}
+    return json.dumps({"topic": f"kline.1.{symbol}", "type": "snapshot", "data": [bar]})
+
+
+def ticker_message(symbol, kind, **fields):
+    return json.dumps({"topic": f"tickers.{symbol}", "type": kind, "data": {"symbol": symbol, **fields}})
+
+
+@pytest.fixture
+def buffers():
+    api_clients._kline_buffers.clear()
+    yield
+    api_clients._kline_buffers.clear()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_kline_update_and_confirmed_close(buffers):
+    closed = []
+    stream = MarketDataStream(on_candle_close=closed.append)
+    stream.handle_message(kline_message(SYMBOL, START_MS, 100.5, confirm=False))
+    stream.handle_message(kline_message(SYMBOL, START_MS, 101.0, confirm=False))
+    assert closed == []
+    bars = api_clients.get_kline_buffer(SYMBOL, '1').view()
+    assert len(bars) == 1 and bars[0, 4] == 101.0  # update candle berjalan menimpa bar yang sama
+
+    stream.handle_message(kline_message(SYMBOL, START_MS, 101.5, confirm=True))
+    stream.handle_message(kline_message(SYMBOL, START_MS + 60_000, 101.7, confirm=False))
+    assert closed == [SYMBOL]
+    bars = api_clients.get_kline_buffer(SYMBOL, '1').view()
+    np.testing.assert_array_equal(bars[:, 0], [START_MS, START_MS + 60_000])
+    np.testing.assert_array_equal(bars[:, 4], [101.5, 101.7])
+
+
+def test_ticker_snapshot_and_delta():
+    ticks = []
+    stream = MarketDataStream(on_tick=lambda symbol, price: ticks.append((symbol, price)))
+    stream.handle_message(ticker_message(SYMBOL, "snapshot", lastPrice="100.5", bid1Price="100.4", ask1Price="100.6"))
+    stream.handle_message(ticker_message(SYMBOL, "delta", bid1Price="100.45"))  # tanpa lastPrice: bukan tick
+    stream.handle_message(ticker_message(SYMBOL, "delta", lastPrice="100.7"))
+    stream.handle_message("not json")
+    assert ticks == [(SYMBOL, 100.5), (SYMBOL, 100.7)]
+    assert stream.last_price(SYMBOL) == 100.7
+    assert stream.snapshot().get_price(SYMBOL) == 100.7
+    assert stream.last_price("OTHERUSDT") is None
+
+
+class ReplayServer:
+    """
+    Server WebSocket lokal (aiohttp, thread terpisah) pengganti Bybit: mencatat pesan
+    subscribe per koneksi, memutar pesan rekaman setelah subscribe, dan menjawab
+    ping dengan pong kecuali pong=False.
+    """
+
+    def __init__(self, messages=(), pong=True):
+        self.messages = list(messages)
+        self.pong = pong
+        self.subscriptions = []  # (nomor koneksi, topik)
+        self.connections = 0
+        self._sockets = []
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        connection = self.connections
+        self._sockets.append(ws)
+        async for msg in ws:
+            data = json.loads(msg.data)
+            if data.get("op") == "subscribe":
+                self.subscriptions += [(connection, topic) for topic in data["args"]]
+                await ws.send_str(json.dumps({"success": True, "op": "subscribe"}))
+                for message in self.messages:
+                    await ws.send_str(message)
+            elif data.get("op") == "ping" and self.pong:
+                await ws.send_str(json.dumps({"success": True, "ret_msg": "pong", "op": "ping"}))
+        return ws
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.url = f"ws://127.0.0.1:{self._runner.addresses[0][1]}/"
+        self._started.set()
+        self._loop.run_forever()
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def drop_connections(self):
+        async def close_all():
+            for ws in self._sockets:
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(close_all(), self._loop).result(5)
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def topics(self, connection):
+        return sorted(topic for conn, topic in self.subscriptions if conn == connection)
+
+
+def test_resubscribes_after_reconnect(buffers):
+    closed = []
+    replay = [kline_message(SYMBOL, START_MS, 101.5, confirm=True)]
+    with ReplayServer(replay) as server:
+        stream = MarketDataStream(on_candle_close=closed.append, url=server.url, reconnect_delay=0.05)
+        stream.set_symbols([SYMBOL, "BENCH001USDT"])
+        stream.start()
+        try:
+            assert wait_for(lambda: len(server.topics(1)) == 4 and closed)
+            stream.set_symbols([SYMBOL])  # unsubscribe saat tersambung; reconnect hanya subscribe sisanya
+            server.drop_connections()
+            assert wait_for(lambda: server.connections == 2 and server.topics(2))
+            assert server.topics(2) == [f"kline.1.{SYMBOL}", f"tickers.{SYMBOL}"]
+            assert wait_for(lambda: len(closed) == 2)  # pesan rekaman diputar lagi di koneksi baru
+        finally:
+            stream.stop()
+
+
+def test_heartbeat_timeout_reconnects_silent_connection():
+    with ReplayServer(pong=False) as server:
+        stream = MarketDataStream(url=server.url, heartbeat_interval=0.05, heartbeat_timeout=0.3,
+                                  reconnect_delay=0.05)
+        stream.set_symbols([SYMBOL])
+        stream.start()
+        try:
+            # Server tidak mengirim apa pun setelah ack subscribe -> koneksi ditutup dan dibuka ulang
+            assert wait_for(lambda: server.connections >= 2 and server.topics(2))
+        finally:
+            stream.stop()
+
+
+def test_heartbeat_pong_keeps_connection_alive():
+    with ReplayServer(pong=True) as server:
+        stream = MarketDataStream(url=server.url, heartbeat_interval=0.05, heartbeat_timeout=0.3)
+        stream.start()
+        try:
+            assert stream.wait_connected(5)
+            time.sleep(1.0)
+            assert server.connections == 1
+        finally:
+            stream.stop()
@@ -0,0 +1,135 @@
+# tests/test_position_book.py — Snapshot PositionBook immutable dan batas posisi memakai book terkini
+import threading
+
+import pytest
+
+import main
+from position_book import Position, PositionBook
+from state_journal import StateJournal
+
+
+def position(symbol, side="LONG", price=100.0):
+    return Position(symbol, side, price, 0.1, 1.0, price * 0.99, price * 1.02)
+
+
+def test_snapshot_is_unchanged_by_later_add_and_pop():
+    book = PositionBook([position("AUSDT"), position("BUSDT")])
+    before = book.snapshot()
+    rows_before = before.to_rows()
+
+    assert book.add(position("CUSDT"))
+    assert book.pop("AUSDT").symbol == "AUSDT"
+    after = book.snapshot()
+
+    assert before.version == 0 and after.version == 2
+    assert sorted(before) == ["AUSDT", "BUSDT"] and len(before) == 2
+    assert "CUSDT" not in before and before.get("AUSDT") is not None
+    assert before.to_rows() == rows_before
+    assert sorted(after) == ["BUSDT", "CUSDT"]
+    assert after["BUSDT"] is before["BUSDT"]  # record yang tidak berubah dipakai bersama, bukan disalin
+
+
+def test_rejected_writes_do_not_publish_a_new_version():
+    book = PositionBook([position("AUSDT")])
+    snapshot = book.snapshot()
+    assert not book.add(position("AUSDT", side="SHORT"))
+    assert book.pop("ZUSDT") is None
+    assert book.snapshot() is snapshot
+    assert book.get("AUSDT").side == "LONG"
+
+
+def test_load_replaces_book_without_touching_old_snapshot():
+    book = PositionBook([position("AUSDT")])
+    before = book.snapshot()
+    book.load({"BUSDT": {**position("BUSDT").to_dict(), "entry_price": "101.5"}})
+    assert list(before) == ["AUSDT"]
+    assert list(book.snapshot()) == ["BUSDT"]
+    assert book.get("BUSDT").entry_price == 101.5
+    assert book.version == before.version + 1
+
+
+def test_snapshots_stay_consistent_under_concurrent_writers():
+    book = PositionBook()
+    stop = threading.Event()
+    errors = []
+
+    def writer(offset):
+        i = 0
+        while not stop.is_set():
+            symbol = f"S{offset}_{i % 20}USDT"
+            if not book.add(position(symbol)):
+                book.pop(symbol)
+            i += 1
+
+    def reader():
+        for _ in range(2000):
+            snapshot = book.snapshot()
+            symbols = list(snapshot)
+            # Isi dan ukuran satu snapshot tidak boleh berubah selama dibaca
+            if len(symbols) != len(snapshot) or list(snapshot) != symbols or len(snapshot.to_dicts()) != len(symbols):
+                errors.append(snapshot.version)
+
+    writers = [threading.Thread(target=writer, args=(k,)) for k in range(3)]
+    for thread in writers:
+        thread.start()
+    try:
+        reader()
+    finally:
+        stop.set()
+        for thread in writers:
+            thread.join()
+    assert not errors
+
+
+@pytest.fixture
+def engine_state(tmp_path, monkeypatch):
+    """State trading main.py yang terisolasi: book kosong, saldo cukup, jurnal di direktori sementara."""
+    journal = StateJournal(str(tmp_path))
+    journal.recover()
+    book = PositionBook()
+    monkeypatch.setattr(main, "JOURNAL", journal)
+    monkeypatch.setattr(main, "OPEN_POSITIONS", book)
+    monkeypatch.setattr(main, "MARGIN_BALANCE", 100.0)
+    monkeypatch.setattr(main, "LAST_TRADE_TIME", {})
+    yield book
+    journal.close()
+
+
+def test_position_cap_uses_current_book_not_stale_snapshot(engine_state):
+    for i in range(7):
+        main.open_position(f"P{i}USDT", "LONG", 10.0, max_positions=8)
+    stale = engine_state.snapshot()
+    main.open_position("LASTUSDT", "LONG", 10.0, max_positions=8)
+
+    # Keputusan yang dibuat dari snapshot lama (7 posisi) tetap ditolak karena book sudah penuh
+    assert len(stale) == 7
+    main.open_position("LATEUSDT", "SHORT", 10.0, max_positions=8)
+    assert len(engine_state) == 8 and "LATEUSDT" not in engine_state
+    assert "LATEUSDT" not in stale
+
+
+def test_concurrent_entries_respect_position_cap(engine_state, monkeypatch):
+    n_entries, cap = 16, 5
+    barrier = threading.Barrier(n_entries)
+    seen = []
+
+    class GoLongScheduler:
+        def decide(self, symbol, open_positions, data):
+            seen.append(len(open_positions))
+            barrier.wait(timeout=10)  # semua thread sudah memutuskan sebelum entry pertama dibuka
+            return "GO_LONG", f"🚀 {symbol}"
+
+    monkeypatch.setattr(main, "SCHEDULER", GoLongScheduler())
+    threads = [threading.Thread(target=main.decide_and_trade, args=(f"C{i}USDT", 10.0, object(), cap))
+               for i in range(n_entries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == [0] * n_entries  # semua keputusan dari snapshot kosong yang sama
+    assert len(engine_state) == cap
+    assert main.MARGIN_BALANCE == pytest.approx(100.0 - cap * main.MARGIN_PER_TRADE)
+    main.JOURNAL.commit()
+    _, recovered = StateJournal(main.JOURNAL.directory).recover()
+    assert sorted(recovered) == sorted(engine_state.symbols())
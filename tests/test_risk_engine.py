@@ -0,0 +1,98 @@
+# tests/test_risk_engine.py — RiskEngine dengan aliran harga sintetis
+import numpy as np
+import pytest
+
+from position_book import Position, PositionBook
+from risk_engine import STOP_LOSS, TAKE_PROFIT, RiskEngine
+
+
+def make_position(symbol, side, entry=100.0, sl_pct=0.01, tp_pct=0.02):
+    if side == 'LONG':
+        return Position(symbol, side, entry, 1.0, 1.0, entry * (1 - sl_pct), entry * (1 + tp_pct))
+    return Position(symbol, side, entry, 1.0, 1.0, entry * (1 + sl_pct), entry * (1 - tp_pct))
+
+
+@pytest.fixture
+def book():
+    return PositionBook([make_position("LONGUSDT", 'LONG'), make_position("SHORTUSDT", 'SHORT')])
+
+
+@pytest.mark.parametrize("symbol, price, reason", [
+    ("LONGUSDT", 99.0, STOP_LOSS),     # SL LONG = 99
+    ("LONGUSDT", 102.0, TAKE_PROFIT),  # TP LONG = 102
+    ("SHORTUSDT", 101.0, STOP_LOSS),   # SL SHORT = 101
+    ("SHORTUSDT", 98.0, TAKE_PROFIT),  # TP SHORT = 98
+])
+def test_stop_loss_and_take_profit(book, symbol, price, reason):
+    engine = RiskEngine(book)
+    assert engine.update_prices([symbol], [100.0]) == []
+    assert engine.update_prices([symbol], [price]) == [(symbol, price, reason)]
+
+
+def test_stop_loss_wins_when_both_levels_are_hit():
+    # SL di atas TP (konfigurasi aneh) -> satu harga menyentuh keduanya
+    engine = RiskEngine(PositionBook([Position("AUSDT", 'LONG', 100.0, 1.0, 1.0, 105.0, 104.0)]))
+    assert engine.update_prices(["AUSDT"], [104.5]) == [("AUSDT", 104.5, STOP_LOSS)]
+
+
+def test_each_position_fires_once(book):
+    exits = []
+    engine = RiskEngine(book, on_exit=lambda *event: exits.append(event))
+    for price in (99.5, 98.9, 98.0, 97.0):
+        engine.update_prices(["LONGUSDT"], [price])
+        engine.on_tick("LONGUSDT", price)
+    engine.check_prices({"LONGUSDT": 90.0, "SHORTUSDT": 100.0})
+    assert exits == [("LONGUSDT", 98.9, STOP_LOSS)]
+
+    # Posisi baru untuk simbol yang sama (record berbeda) bisa memicu lagi
+    book.pop("LONGUSDT")
+    book.add(make_position("LONGUSDT", 'LONG', entry=90.0))
+    assert engine.update_prices(["LONGUSDT"], [85.0]) == [("LONGUSDT", 85.0, STOP_LOSS)]
+
+
+def test_duplicate_symbols_in_one_batch(book):
+    engine = RiskEngine(book)
+    events = engine.update_prices(["LONGUSDT", "SHORTUSDT", "LONGUSDT", "LONGUSDT"], [100.0, 100.0, 98.5, 97.0])
+    assert events == [("LONGUSDT", 98.5, STOP_LOSS)]
+    events = engine.update_prices(["SHORTUSDT", "SHORTUSDT"], [97.5, 102.0])
+    assert events == [("SHORTUSDT", 97.5, TAKE_PROFIT)]
+
+
+def test_ignores_unknown_symbols_and_missing_prices(book):
+    engine = RiskEngine(book)
+    assert engine.update_prices(["OTHERUSDT", "LONGUSDT"], [1.0, 0.0]) == []
+    assert engine.on_tick("OTHERUSDT", 1.0) == []
+    assert engine.check_prices({"LONGUSDT": None, "SHORTUSDT": float('nan')}) == []
+
+
+def test_matches_per_position_rule_on_random_stream():
+    rng = np.random.default_rng(7)
+    positions = [make_position(f"S{i:03d}USDT", 'LONG' if i % 2 else 'SHORT', entry=100.0,
+                               sl_pct=rng.uniform(0.002, 0.01), tp_pct=rng.uniform(0.002, 0.02))
+                 for i in range(200)]
+    book = PositionBook(positions)
+    closed = []
+
+    def on_exit(symbol, price, reason):
+        book.pop(symbol)
+        closed.append((symbol, price, reason))
+
+    engine = RiskEngine(book, on_exit=on_exit)
+    expected, done = [], set()
+    for _ in range(300):
+        symbols = list(rng.choice([pos.symbol for pos in positions], 50))
+        prices = list(100.0 * (1 + rng.normal(0, 0.004, 50)))
+        engine.update_prices(symbols, prices)
+        for symbol, price in zip(symbols, prices):
+            pos = next(p for p in positions if p.symbol == symbol)
+            if symbol in done:
+                continue
+            if pos.side == 'LONG':
+                reason = STOP_LOSS if price <= pos.stop_loss_price else TAKE_PROFIT if price >= pos.take_profit_price else None
+            else:
+                reason = STOP_LOSS if price >= pos.stop_loss_price else TAKE_PROFIT if price <= pos.take_profit_price else None
+            if reason:
+                done.add(symbol)
+                expected.append((symbol, price, reason))
+    assert sorted(closed) == sorted(expected)
+    assert len(book) == len(positions) - len(expected)
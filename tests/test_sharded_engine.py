@@ -0,0 +1,115 @@
+# tests/test_sharded_engine.py — Coordinator tidak boleh menunggu worker tanpa batas
+import time
+
+import pytest
+
+import config
+from benchmark import MockExchange, synthetic_fixture
+from sharded_engine import ShardCoordinator, shard_for
+from strategy import REASON_HAS_POSITION, REASON_TEMPLATES
+
+FIXTURE = synthetic_fixture(n_symbols=8, n_bars=60, seed=5)
+PRICES = {t['symbol']: float(t['lastPrice']) for t in FIXTURE['tickers']}
+
+
+# Factory sesi harus berada di level modul agar bisa di-pickle ke proses spawn
+def mock_session():
+    return MockExchange(FIXTURE)
+
+
+def failing_session():
+    raise RuntimeError("kredensial tidak valid")
+
+
+class HangingExchange(MockExchange):
+    def get_kline(self, **params):
+        time.sleep(3600)
+
+
+def hanging_session():
+    return HangingExchange(FIXTURE)
+
+
+def make_coordinator(session_factory, workers=2):
+    return ShardCoordinator(workers, config.get_settings(), threads_per_worker=2, use_scheduler=False,
+                            session_factory=session_factory, connect_timeout=10.0, scan_timeout=2.0)
+
+
+def scan(coordinator):
+    return coordinator.scan(list(PRICES), PRICES, [], time.time())
+
+
+def test_scan_returns_all_symbols():
+    coordinator = make_coordinator(mock_session)
+    coordinator.start()
+    try:
+        results = scan(coordinator)
+        assert [r[0] for r in results] == list(PRICES)
+        assert all(r[1] != "ERROR" for r in results)
+    finally:
+        coordinator.stop()
+
+
+def test_worker_crashing_before_connect_does_not_block():
+    coordinator = make_coordinator(failing_session)
+    started = time.monotonic()
+    coordinator.start()
+    try:
+        results = scan(coordinator)
+        assert all(r[1] == "ERROR" for r in results)
+        assert not coordinator._conns
+    finally:
+        coordinator.stop()
+    # Proses yang crash terdeteksi lewat is_alive(), jauh sebelum connect_timeout
+    assert time.monotonic() - started < 10.0
+
+
+def test_hanging_worker_times_out_and_is_restarted_without_blocking():
+    coordinator = make_coordinator(hanging_session, workers=1)
+    coordinator.start()
+    try:
+        pid = coordinator._processes[0].pid
+        started = time.monotonic()
+        results = scan(coordinator)
+        # Hanya scan_timeout; worker pengganti tidak ditunggu di dalam siklus
+        assert time.monotonic() - started < 2.0 + 1.0
+        assert all(r[1] == "ERROR" for r in results)
+        assert 0 not in coordinator._processes
+        assert coordinator._collect(0, timeout=10.0)
+        assert coordinator._processes[0].pid != pid
+    finally:
+        coordinator.stop()
+
+
+def test_dead_worker_is_replaced_between_cycles():
+    coordinator = make_coordinator(mock_session)
+    coordinator.start()
+    try:
+        coordinator._processes[0].kill()
+        coordinator._processes[0].join()
+        started = time.monotonic()
+        results = scan(coordinator)
+        assert time.monotonic() - started < 2.0
+        errors = {symbol for symbol, decision, _ in results if decision == "ERROR"}
+        assert errors == {s for s in PRICES if shard_for(s, 2) == 0}
+
+        assert coordinator._collect(0, timeout=10.0)
+        assert all(r[1] != "ERROR" for r in scan(coordinator))
+    finally:
+        coordinator.stop()
+
+
+def test_stale_reply_from_previous_cycle_is_discarded():
+    coordinator = make_coordinator(mock_session, workers=1)
+    coordinator.start()
+    try:
+        # Request tertinggal dari siklus lama (semua simbol dianggap punya posisi) dibalas lebih dulu
+        coordinator._conns[0].send({"type": "scan", "cycle": coordinator._cycle - 1, "symbols": list(PRICES),
+                                    "now": time.time(), "prices": PRICES, "open_symbols": list(PRICES)})
+        results = scan(coordinator)
+        assert [r[0] for r in results] == list(PRICES)
+        assert all(r[1] != "ERROR" for r in results)
+        assert all(r[2] != REASON_TEMPLATES[REASON_HAS_POSITION].format(symbol=r[0]) for r in results)
+        assert 0 in coordinator._conns
+    finally:
+        coordinator.stop()
@@ -0,0 +1,117 @@
+# tests/test_state_journal.py — Pemulihan StateJournal setelah crash
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import state_journal
+from state_journal import StateJournal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def position(symbol, price=100.0):
+    return {"symbol": symbol, "side": "LONG", "entry_price": price, "size": 1.0, "margin": 1.0,
+            "stop_loss_price": price * 0.99, "take_profit_price": price * 1.02}
+
+
+def open_journal(directory, compact_every=1000):
+    journal = StateJournal(str(directory), compact_every=compact_every)
+    journal.recover()
+    return journal
+
+
+def test_torn_final_line_is_truncated(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record('open', 9.0, "AUSDT", position("AUSDT"))
+    journal.record('open', 8.0, "BUSDT", position("BUSDT"))
+    journal.commit()
+    journal._file.close()
+    committed_size = os.path.getsize(journal.journal_path)
+    # Crash di tengah penulisan event berikutnya: separuh baris tanpa newline
+    line = json.dumps({"seq": 3, "ts": "x", "type": "close", "balance": 9.5, "symbol": "AUSDT"})
+    with open(journal.journal_path, "a") as f:
+        f.write(line[:len(line) // 2])
+
+    recovered = StateJournal(str(tmp_path))
+    balance, positions = recovered.recover()
+    assert balance == 8.0
+    assert sorted(positions) == ["AUSDT", "BUSDT"]
+    assert os.path.getsize(recovered.journal_path) == committed_size
+
+    # Event baru ditulis setelah ekor yang dibuang dan ikut terbaca pada pemulihan berikutnya
+    recovered.record('close', 9.4, "AUSDT")
+    recovered.commit()
+    recovered._file.close()
+    assert StateJournal(str(tmp_path)).recover() == (9.4, {"BUSDT": position("BUSDT")})
+
+
+def test_complete_json_without_newline_is_dropped(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record('balance', 7.0)
+    journal.commit()
+    journal._file.close()
+    with open(journal.journal_path, "a") as f:
+        f.write(json.dumps({"seq": 2, "ts": "x", "type": "balance", "balance": 6.0}))
+    assert StateJournal(str(tmp_path)).recover() == (7.0, {})
+
+
+@pytest.mark.parametrize("crash_path", [state_journal.SNAPSHOT_FILE, state_journal.JOURNAL_FILE])
+def test_replay_after_crash_during_compaction(tmp_path, monkeypatch, crash_path):
+    journal = open_journal(tmp_path, compact_every=3)
+    journal.record('open', 9.0, "AUSDT", position("AUSDT"))
+    journal.commit()
+    journal.record('open', 8.0, "BUSDT", position("BUSDT"))
+    journal.record('close', 9.1, "AUSDT")
+
+    replace = os.replace
+
+    def crash_on_replace(src, dst):
+        if os.path.basename(dst) == crash_path:
+            raise KeyboardInterrupt("crash")  # proses mati setelah file .tmp ditulis, sebelum rename
+        replace(src, dst)
+
+    monkeypatch.setattr(state_journal.os, "replace", crash_on_replace)
+    with pytest.raises(KeyboardInterrupt):
+        journal.commit()  # fsync event lalu pemadatan (seq 3 >= compact_every)
+    monkeypatch.setattr(state_journal.os, "replace", replace)
+    assert os.path.exists(os.path.join(tmp_path, crash_path + ".tmp"))
+
+    recovered = StateJournal(str(tmp_path), compact_every=3)
+    assert recovered.recover() == (9.1, {"BUSDT": position("BUSDT")})
+    assert not os.path.exists(os.path.join(tmp_path, crash_path + ".tmp"))
+    # Seq berlanjut tanpa tabrakan dengan event yang sudah ada di snapshot/jurnal
+    recovered.record('close', 10.0, "BUSDT")
+    recovered.commit()
+    recovered._file.close()
+    assert StateJournal(str(tmp_path)).recover() == (10.0, {})
+
+
+def test_batched_fsync_keeps_acknowledged_records(tmp_path):
+    # Proses anak dimatikan dengan os._exit (tanpa flush buffer Python), seperti crash/kill -9
+    script = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {ROOT!r})
+        from state_journal import StateJournal
+        journal = StateJournal({str(tmp_path)!r}, compact_every=50)
+        journal.recover()
+        balance = 10.0
+        for i in range(120):
+            balance -= 0.01
+            journal.record('open', balance, f"S{{i:03d}}USDT", {{"symbol": f"S{{i:03d}}USDT", "entry_price": 1.0}})
+            if i % 7 == 6:
+                journal.commit()
+                print(i, balance, flush=True)
+        journal.record('balance', 0.0)  # belum di-commit: boleh hilang
+        os._exit(0)
+    """)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    acknowledged = [line.split() for line in output.splitlines() if line[:1].isdigit()]
+    last_index, last_balance = int(acknowledged[-1][0]), float(acknowledged[-1][1])
+
+    balance, positions = StateJournal(str(tmp_path)).recover()
+    assert balance == last_balance
+    assert sorted(positions) == [f"S{i:03d}USDT" for i in range(last_index + 1)]
@@ -0,0 +1,126 @@
+# tests/test_strategy.py — Paritas make_decision / make_decisions / decision_codes dengan logika TA-Lib asli
+import numpy as np
+import pandas as pd
+import pytest
+
+talib = pytest.importorskip("talib")
+
+from candle_scheduler import CandleScheduler
+from strategy import (DECISION_NAMES, OHLCV_COLUMNS, REASON_TEMPLATES, decision_codes, frames_to_batch,
+                      make_decision, make_decisions)
+
+WINDOW = 50
+N_WINDOWS = 4000
+
+
+def reference_decision(symbol, open_positions, data):
+    """make_decision sebelum versi vektor (talib.EMA + pandas), sebagai acuan paritas."""
+    if data is None or len(data) < 30:
+        return "HOLD", f"🟡 Data tidak cukup untuk {symbol}"
+    close, high, low, opn, volume = (pd.to_numeric(data[col]) for col in ('close', 'high', 'low', 'open', 'volume'))
+    ema8 = talib.EMA(close, timeperiod=8).iloc[-1]
+    ema21 = talib.EMA(close, timeperiod=21).iloc[-1]
+    is_uptrend = ema8 > ema21
+    is_downtrend = ema8 < ema21
+    if not (is_uptrend or is_downtrend):
+        return "HOLD", f"⏸️ {symbol} | Tren tidak jelas"
+    if symbol in open_positions:
+        return "HOLD", f"🔒 {symbol} | Sudah ada posisi"
+    if volume.iloc[-1] < 0.8 * volume.iloc[-10:-1].mean():
+        return "HOLD", f"🔇 {symbol} | Volume rendah"
+    c0_open, c0_close, c0_high, c0_low = opn.iloc[-1], close.iloc[-1], high.iloc[-1], low.iloc[-1]
+    c0_range = c0_high - c0_low
+    if is_uptrend and c0_close > c0_open and (c0_close - c0_open) > 0.6 * c0_range:
+        if c0_low <= low.iloc[-10:].min() * 1.001:
+            return "GO_LONG", f"✅ {symbol} | BULLISH REVERSAL DI TREN NAIK"
+    if is_downtrend and c0_close < c0_open and (c0_open - c0_close) > 0.6 * c0_range:
+        if c0_high >= high.iloc[-10:].max() * 0.999:
+            return "GO_SHORT", f"✅ {symbol} | BEARISH REVERSAL DI TREN TURUN"
+    return "HOLD", f"⏸️ {symbol} | Tidak ada setup valid"
+
+
+def synthetic_windows(n_windows=N_WINDOWS, seed=0):
+    """Jendela k-line acak (panjang 25..50 bar) dengan badan candle lebar agar setup entry sering muncul."""
+    rng = np.random.default_rng(seed)
+    n = n_windows + WINDOW
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    opn = close * np.exp(rng.normal(0, 0.004, n))
+    high = np.maximum(opn, close) * (1 + rng.random(n) * 0.0005)
+    low = np.minimum(opn, close) * (1 - rng.random(n) * 0.0005)
+    volume = rng.lognormal(10, 1, n)
+    timestamps = pd.to_datetime(1_700_000_000_000 + 60_000 * np.arange(n), unit='ms')
+    frame = pd.DataFrame({'timestamp': timestamps, 'open': opn, 'high': high, 'low': low,
+                          'close': close, 'volume': volume})
+    lengths = rng.integers(25, WINDOW + 1, n_windows)
+    return [frame.iloc[i + WINDOW - length:i + WINDOW].reset_index(drop=True)
+            for i, length in enumerate(lengths)]
+
+
+@pytest.fixture(scope="module")
+def windows():
+    return synthetic_windows()
+
+
+@pytest.fixture(scope="module")
+def expected(windows):
+    open_positions = {f"SYM{i}" for i in range(0, len(windows), 7)}
+    return open_positions, [reference_decision(f"SYM{i}", open_positions, df) for i, df in enumerate(windows)]
+
+
+def test_reference_windows_cover_every_outcome(expected):
+    decisions = {decision for decision, _ in expected[1]}
+    assert decisions == set(DECISION_NAMES)
+
+
+def test_make_decision_matches_reference(windows, expected):
+    open_positions, reference = expected
+    for i, df in enumerate(windows):
+        decision, msg, _ = make_decision(f"SYM{i}", open_positions, float(df['close'].iloc[-1]), df)
+        assert (decision, msg) == reference[i], i
+
+
+def test_make_decisions_matches_reference(windows, expected):
+    open_positions, reference = expected
+    symbols = [f"SYM{i}" for i in range(len(windows))]
+    codes, messages = make_decisions(symbols, frames_to_batch(windows, WINDOW), open_positions)
+    assert [(DECISION_NAMES[c], m) for c, m in zip(codes, messages)] == reference
+
+
+def test_decision_codes_without_positions(windows):
+    codes, reasons = decision_codes(frames_to_batch(windows, WINDOW))
+    reference = [reference_decision("X", (), df) for df in windows]
+    assert [DECISION_NAMES[c] for c in codes] == [decision for decision, _ in reference]
+    assert [REASON_TEMPLATES[r].format(symbol="X") for r in reasons] == [msg for _, msg in reference]
+
+
+def test_candle_scheduler_matches_reference(windows, expected):
+    open_positions, reference = expected
+    scheduler = CandleScheduler()
+    for i, df in enumerate(windows):
+        assert scheduler.decide(f"SYM{i}", open_positions, df) == reference[i]
+
+
+def test_candle_scheduler_reuses_memo_within_candle():
+    # Satu simbol: bar berjalan diperbarui beberapa kali per candle, lalu candle berikutnya dimulai
+    frame = pd.concat(synthetic_windows(60, seed=3)).drop_duplicates('timestamp')
+    frame = frame.sort_values('timestamp').reset_index(drop=True)
+    rng = np.random.default_rng(5)
+    scheduler = CandleScheduler()
+    states = []
+    for end in range(WINDOW, len(frame) + 1):
+        window = frame.iloc[end - WINDOW:end].reset_index(drop=True)
+        for _ in range(3):
+            live = window.copy()
+            live.loc[WINDOW - 1, 'close'] *= 1 + rng.normal(0, 0.002)
+            live.loc[WINDOW - 1, 'volume'] *= rng.uniform(0.5, 1.5)
+            assert scheduler.decide("SYM", (), live) == reference_decision("SYM", (), live)
+            states.append(scheduler._states["SYM"])
+    # Satu ClosedBarState per candle, dipakai ulang untuk semua update bar berjalan
+    assert len({id(state) for state in states}) == len(frame) - WINDOW + 1
+
+
+def test_short_window_holds():
+    short = synthetic_windows(1)[0].iloc[-10:]
+    assert make_decision("X", (), 1.0, short)[0] == "HOLD"
+    assert np.all(decision_codes(frames_to_batch([short], WINDOW))[0] == 0)
+    assert list(short.columns[1:]) == OHLCV_COLUMNS
@@ -0,0 +1,124 @@
+# trade_log.py — Pembacaan trade_log.csv secara inkremental dengan agregat berjalan
+import csv
+import io
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import pandas as pd
+
+LOG_FILE = "trade_log.csv"
+RECENT_TRADES_CAPACITY = 1000  # jumlah trade terbaru yang disimpan untuk ditampilkan
+
+
+class TradeLogTail:
+    """
+    Mengikuti trade_log.csv seperti `tail -f`: setiap refresh() hanya membaca byte
+    yang ditambahkan sejak offset terakhir, lalu memperbarui agregat berjalan
+    (PnL terealisasi, jumlah menang, rekap per simbol dan per hari) dan jendela
+    trade terbaru. Baris yang belum lengkap ditunda sampai baris barunya tertulis.
+    Jika file terpotong atau diganti (ukuran mengecil / inode berubah), semua
+    agregat dihitung ulang dari awal. Aman dipakai bersama oleh beberapa sesi
+    dashboard (satu lock untuk baca dan tulis).
+    """
+
+    def __init__(self, path: str = LOG_FILE, capacity: int = RECENT_TRADES_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self._inode: Optional[int] = None
+        self.columns: List[str] = []
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=self.capacity)
+        self.total_rows = 0
+        self.closed_trades = 0
+        self.wins = 0
+        self.realized_pnl = 0.0
+        self.by_symbol: Dict[str, Dict[str, float]] = {}
+        self.by_day: Dict[str, Dict[str, float]] = {}
+
+    def refresh(self) -> int:
+        """Membaca baris baru; mengembalikan jumlah baris yang diproses."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self.offset:
+                self._reset()
+            return 0
+        if stat.st_size < self.offset or (self._inode is not None and stat.st_ino != self._inode):
+            self._reset()
+        self._inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(stat.st_size - self.offset)
+        complete = chunk.rfind(b"\n") + 1
+        if not complete:
+            return 0
+        self.offset += complete
+
+        rows = csv.reader(io.StringIO(chunk[:complete].decode("utf-8")))
+        if not self.columns:
+            self.columns = next(rows, [])
+        processed = 0
+        for values in rows:
+            if values:
+                self._add(dict(zip(self.columns, values)))
+                processed += 1
+        return processed
+
+    def _add(self, row: Dict[str, Any]):
+        try:
+            pnl = float(row.get('pnl', ''))
+        except ValueError:
+            pnl = None
+        row['pnl'] = pnl
+        self.recent.append(row)
+        self.total_rows += 1
+        if pnl is None or row.get('action') != 'CLOSE':
+            return
+
+        win = pnl > 0
+        self.closed_trades += 1
+        self.wins += win
+        self.realized_pnl += pnl
+        for rollups, key in ((self.by_symbol, row.get('symbol', '')), (self.by_day, row.get('timestamp', '')[:10])):
+            stats = rollups.setdefault(key, {"trades": 0, "wins": 0, "pnl": 0.0})
+            stats['trades'] += 1
+            stats['wins'] += win
+            stats['pnl'] += pnl
+
+    # --- Tampilan ---
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.closed_trades * 100 if self.closed_trades else 0.0
+
+    def page(self, page: int = 0, page_size: int = 50) -> pd.DataFrame:
+        """Satu halaman trade terbaru (halaman 0 = paling baru), terurut dari yang terbaru."""
+        with self._lock:
+            end = len(self.recent) - page * page_size
+            start = max(0, end - page_size)
+            rows = [self.recent[i] for i in range(end - 1, start - 1, -1)]
+            return pd.DataFrame(rows, columns=self.columns)
+
+    def page_count(self, page_size: int = 50) -> int:
+        return max(1, -(-len(self.recent) // page_size))
+
+    def rollup_frame(self, by: str = "symbol") -> pd.DataFrame:
+        """Rekap per 'symbol' atau per 'day': jumlah trade, menang, PnL, win rate."""
+        with self._lock:
+            rollups = self.by_symbol if by == "symbol" else self.by_day
+            df = pd.DataFrame.from_dict(rollups, orient='index', columns=['trades', 'wins', 'pnl'])
+        df.index.name = by
+        df['win_rate'] = df['wins'] / df['trades'] * 100 if len(df) else []
+        return df.sort_index(ascending=by != "day").reset_index()